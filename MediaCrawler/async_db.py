@@ -13,7 +13,7 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步Aiomysql的增删改查封装
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Sequence, Union
 
 import aiomysql
 
@@ -94,6 +94,31 @@ class AsyncMysqlDB:
                 rows = await cur.execute(sql, values)
                 return rows
 
+    async def bulk_upsert(self, table_name: str, fields: Sequence[str], rows: Sequence[Sequence[Any]],
+                          update_fields: Sequence[str]) -> int:
+        """
+        多行 INSERT ... ON DUPLICATE KEY UPDATE，依赖表上的唯一索引判断记录是否已存在
+        :param table_name: 表名
+        :param fields: 字段名列表
+        :param rows: 每条记录按 fields 顺序排列的值
+        :param update_fields: 记录已存在时需要更新的字段
+        :return: 受影响的行数
+        """
+        fieldstr = ','.join(f'`{field}`' for field in fields)
+        row_placeholder = '(%s)' % ','.join(['%s'] * len(fields))
+        valstr = ','.join([row_placeholder] * len(rows))
+        sql = "INSERT INTO %s (%s) VALUES %s" % (table_name, fieldstr, valstr)
+        if update_fields:
+            sql += " ON DUPLICATE KEY UPDATE " + ','.join(f'`{field}`=VALUES(`{field}`)' for field in update_fields)
+        else:
+            # 没有需要更新的字段时，重复记录保持不变
+            sql = sql.replace("INSERT INTO", "INSERT IGNORE INTO", 1)
+        values = [value for row in rows for value in row]
+        async with self.__pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                rows_affected = await cur.execute(sql, values)
+                return rows_affected
+
     async def execute(self, sql: str, *args: Union[str, int]) -> int:
         """
         需要更新、写入等操作的 excute 执行语句
@@ -9,11 +9,36 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
 
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import TYPE_CHECKING, Dict, List, Optional
 
+import httpx
 from playwright.async_api import BrowserContext, BrowserType
 
+import config
+from tools import utils
+from tools.account_pool import Account, AccountPool
+from tools.rate_limiter import get_rate_limiter
+
+if TYPE_CHECKING:
+    from proxy.proxy_rotator import ProxyRotator
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 说明出口 IP 被封禁的 HTTP 状态码：412(B站)、461/471(小红书验证码)
+BLOCKED_STATUS_CODES = (412, 461, 471)
+# 封禁页和风控错误响应都很小，超过该大小或是媒体类型的响应体（图片、视频下载）不检查内容
+BLOCKED_BODY_MAX_BYTES = 16 * 1024
+MEDIA_CONTENT_TYPES = ("image/", "video/", "audio/", "application/octet-stream")
+
 
 class AbstractCrawler(ABC):
     @abstractmethod
@@ -87,6 +112,19 @@ class AbstractStoreImage(ABC):
 
 
 class AbstractApiClient(ABC):
+    # 按代理缓存的连接池，key 为代理配置序列化后的字符串，按最近使用排序
+    _http_clients: Optional["OrderedDict[str, httpx.AsyncClient]"] = None
+    # 被淘汰的连接池，上面进行中的请求结束后关闭
+    _retired_http_clients: Optional[List[httpx.AsyncClient]] = None
+    # 每个连接池上进行中的请求数
+    _http_client_inflight: Optional[Dict[httpx.AsyncClient, int]] = None
+    # 配置了代理轮换器时，每个请求通过 send_request 从轮换器获取代理
+    proxy_rotator: Optional["ProxyRotator"] = None
+    # 配置了多个账号时，每个协程任务绑定一个账号，请求使用该账号的 cookie
+    account_pool: Optional[AccountPool] = None
+    # 登录后的 cookie，由各平台客户端在 __init__ 和 update_cookies 中设置
+    cookie_dict: Dict[str, str]
+
     @abstractmethod
     async def request(self, method, url, **kwargs):
         pass
@@ -94,3 +132,227 @@ class AbstractApiClient(ABC):
     @abstractmethod
     async def update_cookies(self, browser_context: BrowserContext):
         pass
+
+    def get_http_client(self, proxies: Optional[Dict] = None) -> httpx.AsyncClient:
+        """
+        获取客户端持有的长连接 httpx.AsyncClient，首次调用时按配置创建，之后的请求复用连接池
+        cookie 统一由各平台客户端放在请求头里，这里的 cookie jar 不保存响应下发的 cookie，与每次新建客户端时的行为一致
+        :param proxies: 当前使用的 httpx 代理，每个代理一个连接池，代理轮换时不需要重建连接
+        :return:
+        """
+        if self._http_clients is None:
+            self._http_clients = OrderedDict()
+        if self._retired_http_clients is None:
+            self._retired_http_clients = []
+        key = json.dumps(proxies, sort_keys=True)
+        client = self._http_clients.get(key)
+        if client is not None:
+            self._http_clients.move_to_end(key)
+            return client
+
+        http2 = config.ENABLE_HTTP2 and HTTP2_AVAILABLE
+        if config.ENABLE_HTTP2 and not HTTP2_AVAILABLE:
+            utils.logger.warning(
+                f"[{self.__class__.__name__}.get_http_client] h2 is not installed, fallback to HTTP/1.1")
+        client = httpx.AsyncClient(
+            proxies=proxies,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.HTTPX_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTPX_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.HTTPX_KEEPALIVE_EXPIRY,
+            ),
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        )
+        self._http_clients[key] = client
+        # 代理池里的代理会被替换，只保留最近使用的几个代理的连接池
+        # 被淘汰的连接池上可能还有进行中的请求，先挂起，由 _request_with_client 在请求结束后关闭
+        while len(self._http_clients) > max(1, config.IP_PROXY_POOL_COUNT) * 2:
+            _, retired_client = self._http_clients.popitem(last=False)
+            self._retired_http_clients.append(retired_client)
+        return client
+
+    async def _request_with_client(self, proxies: Optional[Dict], method: str, url: str,
+                                   **kwargs) -> httpx.Response:
+        """
+        用代理对应的连接池发送请求，并记录连接池上进行中的请求数；
+        请求结束后关闭已被淘汰且没有进行中请求的连接池，代理频繁轮换时不会一直占用连接
+        :param proxies: httpx 代理
+        :param method: 请求方法
+        :param url: 请求地址
+        :param kwargs: 透传给 httpx 的参数
+        :return:
+        """
+        if self._http_client_inflight is None:
+            self._http_client_inflight = {}
+        inflight = self._http_client_inflight
+        if self._retired_http_clients is None:
+            self._retired_http_clients = []
+        retired_clients = self._retired_http_clients
+        client = self.get_http_client(proxies)
+        # 取到连接池后立即计数，中间没有 await，不会在发出请求前被关闭
+        inflight[client] = inflight.get(client, 0) + 1
+        try:
+            return await client.request(method, url, **kwargs)
+        finally:
+            inflight[client] -= 1
+            if not inflight[client]:
+                del inflight[client]
+            idle_clients = [retired for retired in retired_clients if retired not in inflight]
+            for retired in idle_clients:
+                retired_clients.remove(retired)
+                await retired.aclose()
+
+    def is_blocked_response(self, response: httpx.Response) -> bool:
+        """
+        判断响应是否说明当前出口 IP 被平台封禁，平台有自己的封禁错误码时在子类中覆盖
+        :param response: 响应
+        :return:
+        """
+        if response.status_code in BLOCKED_STATUS_CODES:
+            return True
+        return self.get_block_check_body(response) == b"blocked"
+
+    @staticmethod
+    def get_block_check_body(response: httpx.Response) -> Optional[bytes]:
+        """
+        取出需要检查封禁内容的响应体，媒体类型和大响应直接跳过，不对整个响应体解码
+        :param response: 响应
+        :return: 不需要检查时返回 None
+        """
+        if response.headers.get("content-type", "").startswith(MEDIA_CONTENT_TYPES):
+            return None
+        content_length = response.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > BLOCKED_BODY_MAX_BYTES:
+            return None
+        content = response.content
+        if len(content) > BLOCKED_BODY_MAX_BYTES:
+            return None
+        return content
+
+    def current_account(self) -> Optional[Account]:
+        """
+        当前协程任务使用的账号，没有配置账号池时返回 None
+        :return:
+        """
+        if self.account_pool is None:
+            return None
+        return self.account_pool.current()
+
+    def get_cookie_dict(self) -> Dict[str, str]:
+        """
+        当前请求使用的 cookie，签名参数依赖 cookie 的平台用它代替 self.cookie_dict
+        :return:
+        """
+        account = self.current_account()
+        return account.cookie_dict if account is not None else self.cookie_dict
+
+    async def send_request(self, method: str, url: str, proxies: Optional[Dict] = None, **kwargs) -> httpx.Response:
+        """
+        通过连接池发送请求
+        配置了账号池时把请求头的 cookie 换成当前任务绑定的账号，最终仍被风控时冷却该账号
+        :param method: 请求方法
+        :param url: 请求地址
+        :param proxies: 没有代理轮换器时使用的 httpx 代理
+        :param kwargs: 透传给 httpx 的参数
+        :return:
+        """
+        account_pool = self.account_pool
+        account = account_pool.current() if account_pool is not None else None
+        if account is not None and kwargs.get("headers") is not None:
+            # 各平台 cookie 请求头的大小写不一致，先去掉原来的
+            headers = {key: value for key, value in kwargs["headers"].items() if key.lower() != "cookie"}
+            headers["Cookie"] = account.cookie_str
+            kwargs["headers"] = headers
+        response = await self._send_with_proxy(method, url, proxies, **kwargs)
+        if account_pool is not None and account is not None:
+            if self.is_blocked_response(response):
+                account_pool.report_risk(account)
+            else:
+                account_pool.report_success(account)
+        return response
+
+    async def _send_with_proxy(self, method: str, url: str, proxies: Optional[Dict] = None,
+                               **kwargs) -> httpx.Response:
+        """
+        配置了代理轮换器时忽略 proxies，由轮换器为每个请求分配代理；响应被判定为封禁或代理连接失败时，
+        把结果回报给代理池，换一个代理重发，最多重发 PROXY_MAX_FAILOVER 次
+        :param method: 请求方法
+        :param url: 请求地址
+        :param proxies: 没有代理轮换器时使用的 httpx 代理
+        :param kwargs: 透传给 httpx 的参数
+        :return:
+        """
+        rotator = self.proxy_rotator
+        if rotator is None:
+            return await self._request_with_client(proxies, method, url, **kwargs)
+
+        max_attempts = config.PROXY_MAX_FAILOVER + 1 if rotator.can_failover else 1
+        attempt = 0
+        # 最后一次尝试一定返回响应或抛出异常
+        while True:
+            attempt += 1
+            if attempt > 1:
+                # 重发的请求同样受限流约束
+                await self.acquire_rate_limit(url)
+            proxy = await rotator.acquire()
+            _, httpx_proxies = utils.format_proxy_info(proxy)
+            start = time.monotonic()
+            try:
+                response = await self._request_with_client(httpx_proxies, method, url, **kwargs)
+            except httpx.TransportError as e:
+                rotator.report(proxy, success=False)
+                if attempt == max_attempts:
+                    raise
+                utils.logger.warning(f"[{self.__class__.__name__}._send_with_proxy] proxy {proxy.ip}:{proxy.port} "
+                                     f"request err: {e}, retry with another proxy")
+                continue
+            if self.is_blocked_response(response):
+                rotator.report(proxy, success=False, blocked=True)
+                if attempt < max_attempts:
+                    utils.logger.warning(f"[{self.__class__.__name__}._send_with_proxy] proxy {proxy.ip}:{proxy.port} "
+                                         f"blocked, status: {response.status_code}, retry with another proxy")
+                    continue
+                return response
+            rotator.report(proxy, success=True, latency=time.monotonic() - start)
+            return response
+
+    async def close(self):
+        """
+        关闭连接池，在 crawler.close() 中调用
+        :return:
+        """
+        for client in self._retired_http_clients or []:
+            await client.aclose()
+        self._retired_http_clients = None
+        for client in (self._http_clients or {}).values():
+            await client.aclose()
+        self._http_clients = None
+
+    async def acquire_rate_limit(self, url: str, endpoint_class: Optional[str] = None):
+        """
+        发出请求前从全局限流器取令牌，所有平台客户端共享同一个限流器，多账号时每个账号分别限流
+        :param url: 请求地址
+        :param endpoint_class: 接口类别，不传时根据 URL 路径推断
+        :return:
+        """
+        account_pool = self.account_pool
+        account = account_pool.current() if account_pool is not None else None
+        if account_pool is not None and account is not None:
+            await account_pool.wait_cooldown(account)
+        await get_rate_limiter().acquire(url, endpoint_class, account.name if account is not None else "")
+
+    def report_rate_limit(self, url: str, status_code: Optional[int] = None, throttled: bool = False,
+                          endpoint_class: Optional[str] = None):
+        """
+        请求完成后把结果回报给全局限流器，被风控时自动退避，成功时逐步恢复速率
+        :param url: 请求地址
+        :param status_code: HTTP 状态码
+        :param throttled: 响应体中返回了平台的风控错误码
+        :param endpoint_class: 接口类别，需与 acquire_rate_limit 时一致
+        :return:
+        """
+        # 请求中账号可能因风控被冷却，这里不重新分配，回报给发出请求的账号
+        account = self.account_pool.bound() if self.account_pool is not None else None
+        get_rate_limiter().feedback(url, status_code, throttled, endpoint_class,
+                                    account.name if account is not None else "")
@@ -16,7 +16,7 @@
 # @Desc    : 抽象类
 
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class AbstractCache(ABC):
@@ -51,3 +51,72 @@ class AbstractCache(ABC):
         :return:
         """
         raise NotImplementedError
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        批量获取键的值，默认逐个调用 get，支持批量读取的缓存应覆盖该方法
+        :param keys: 键列表
+        :return: 与 keys 一一对应的值，不存在的键为 None
+        """
+        return [self.get(key) for key in keys]
+
+    def mset(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        批量设置键的值，默认逐个调用 set，支持批量写入的缓存应覆盖该方法
+        :param mapping: 键值对
+        :param expire_time: 过期时间
+        :return:
+        """
+        for key, value in mapping.items():
+            self.set(key, value, expire_time)
+
+
+class AbstractAsyncCache(ABC):
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值
+        :param key: 键
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中
+        :param key: 键
+        :param value: 值
+        :param expire_time: 过期时间
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的key
+        :param pattern: 匹配模式
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        批量获取键的值
+        :param keys: 键列表
+        :return: 与 keys 一一对应的值，不存在的键为 None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mset(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        批量设置键的值
+        :param mapping: 键值对
+        :param expire_time: 过期时间
+        :return:
+        """
+        raise NotImplementedError
@@ -38,3 +38,21 @@ class CacheFactory:
             return RedisCache()
         else:
             raise ValueError(f'Unknown cache type: {cache_type}')
+
+    @staticmethod
+    def create_async_cache(cache_type: str, *args, **kwargs):
+        """
+        创建在协程中使用的异步缓存对象
+        :param cache_type: 缓存类型
+        :param args: 参数
+        :param kwargs: 关键字参数
+        :return:
+        """
+        if cache_type == 'memory':
+            from .local_cache import AsyncExpiringLocalCache
+            return AsyncExpiringLocalCache(*args, **kwargs)
+        elif cache_type == 'redis':
+            from .redis_cache import AsyncRedisCache
+            return AsyncRedisCache(*args, **kwargs)
+        else:
+            raise ValueError(f'Unknown async cache type: {cache_type}')
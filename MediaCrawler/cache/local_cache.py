@@ -16,22 +16,40 @@
 # @Desc    : 本地缓存
 
 import asyncio
+import heapq
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple
 
-from cache.abs_cache import AbstractCache
+from cache.abs_cache import AbstractAsyncCache, AbstractCache
 
 
 class ExpiringLocalCache(AbstractCache):
 
-    def __init__(self, cron_interval: int = 10):
+    def __init__(self, cron_interval: int = 10, max_entries: int = 10000,
+                 namespace_quotas: Optional[Dict[str, int]] = None, namespace_sep: str = ":"):
         """
         初始化本地缓存
-        :param cron_interval: 定时清楚cache的时间间隔
+        :param cron_interval: 定时清除过期 key 的时间间隔
+        :param max_entries: 最多缓存的 key 数量，超出时淘汰最久未使用的 key，为 0 时不限制
+        :param namespace_quotas: 按命名空间限制 key 数量，如 {"ip_pool": 1000}，命名空间为 key 中第一个分隔符之前的部分
+        :param namespace_sep: 命名空间分隔符
         :return:
         """
         self._cron_interval = cron_interval
-        self._cache_container: Dict[str, Tuple[Any, float]] = {}
+        self._max_entries = max_entries
+        self._namespace_quotas = namespace_quotas or {}
+        self._namespace_sep = namespace_sep
+        # key -> (value, 过期时间)，按最近使用排序，最久未使用的在最前面
+        self._cache_container: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # 命名空间 -> 该命名空间下的 key，同样按最近使用排序，用于前缀查询和配额淘汰
+        self._namespaces: Dict[str, "OrderedDict[str, None]"] = {}
+        # (过期时间, key) 的最小堆，key 被覆盖或删除后留在堆里的旧记录在弹出时跳过
+        self._expire_heap: List[Tuple[float, str]] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
         self._cron_task: Optional[asyncio.Task] = None
         # 开启定时清理任务
         self._schedule_clear()
@@ -50,41 +68,113 @@ class ExpiringLocalCache(AbstractCache):
         :param key:
         :return:
         """
-        value, expire_time = self._cache_container.get(key, (None, 0))
-        if value is None:
+        entry = self._cache_container.get(key)
+        if entry is None:
+            self.misses += 1
             return None
 
         # 如果键已过期，则删除键并返回None
-        if expire_time < time.time():
-            del self._cache_container[key]
+        value, expire_time = entry
+        if expire_time < time.monotonic():
+            self._delete(key)
+            self.expirations += 1
+            self.misses += 1
             return None
 
+        self._cache_container.move_to_end(key)
+        self._namespaces[self._namespace(key)].move_to_end(key)
+        self.hits += 1
         return value
 
     def set(self, key: str, value: Any, expire_time: int) -> None:
         """
-        将键的值设置到缓存中
+        将键的值设置到缓存中，缓存已满时淘汰最久未使用的 key
         :param key:
         :param value:
         :param expire_time:
         :return:
         """
-        self._cache_container[key] = (value, time.time() + expire_time)
+        namespace = self._namespace(key)
+        if key in self._cache_container:
+            self._cache_container.move_to_end(key)
+            self._namespaces[namespace].move_to_end(key)
+        else:
+            self._make_room(namespace)
+            self._namespaces.setdefault(namespace, OrderedDict())[key] = None
+        expire_at = time.monotonic() + expire_time
+        self._cache_container[key] = (value, expire_at)
+        heapq.heappush(self._expire_heap, (expire_at, key))
+        if len(self._expire_heap) > 2 * len(self._cache_container) + 64:
+            # 同一个 key 反复 set 会在堆里留下旧记录，过多时重建
+            self._expire_heap = [(expire_at, key) for key, (_, expire_at) in self._cache_container.items()]
+            heapq.heapify(self._expire_heap)
 
     def keys(self, pattern: str) -> List[str]:
         """
-        获取所有符合pattern的key
-        :param pattern: 匹配模式
+        获取所有符合pattern的key，不包含已过期的key
+        :param pattern: 匹配模式，prefix* 按前缀匹配，其他模式去掉 * 后按子串匹配
         :return:
         """
         if pattern == '*':
-            return list(self._cache_container.keys())
-
-        # 本地缓存通配符暂时将*替换为空
-        if '*' in pattern:
+            candidates = list(self._cache_container.keys())
+        elif pattern.endswith('*') and '*' not in pattern[:-1]:
+            prefix = pattern[:-1]
+            if self._namespace_sep in prefix:
+                # 前缀包含命名空间时只查找该命名空间下的 key
+                candidates = self._namespaces.get(self._namespace(prefix), {}).keys()
+            else:
+                candidates = self._cache_container.keys()
+            candidates = [key for key in candidates if key.startswith(prefix)]
+        else:
+            # 本地缓存通配符暂时将*替换为空
             pattern = pattern.replace('*', '')
+            candidates = [key for key in self._cache_container.keys() if pattern in key]
+
+        now = time.monotonic()
+        return [key for key in candidates if self._cache_container[key][1] >= now]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        缓存命中、淘汰等计数
+        :return:
+        """
+        return {
+            "size": len(self._cache_container),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
 
-        return [key for key in self._cache_container.keys() if pattern in key]
+    def _namespace(self, key: str) -> str:
+        return key.split(self._namespace_sep, 1)[0] if self._namespace_sep in key else ""
+
+    def _delete(self, key: str):
+        del self._cache_container[key]
+        namespace = self._namespace(key)
+        keys_in_namespace = self._namespaces[namespace]
+        del keys_in_namespace[key]
+        if not keys_in_namespace:
+            del self._namespaces[namespace]
+
+    def _make_room(self, namespace: str):
+        """
+        新增 key 前检查命名空间配额和总容量，先清理过期的 key，仍然不够时淘汰最久未使用的 key
+        :param namespace: 新 key 的命名空间
+        :return:
+        """
+        quota = self._namespace_quotas.get(namespace)
+        namespace_full = quota is not None and len(self._namespaces.get(namespace, ())) >= quota
+        cache_full = 0 < self._max_entries <= len(self._cache_container)
+        if not namespace_full and not cache_full:
+            return
+        self._clear()
+        if quota is not None and len(self._namespaces.get(namespace, ())) >= quota:
+            self._delete(next(iter(self._namespaces[namespace])))
+            self.evictions += 1
+        if 0 < self._max_entries <= len(self._cache_container):
+            self._delete(next(iter(self._cache_container)))
+            self.evictions += 1
 
     def _schedule_clear(self):
         """
@@ -102,12 +192,18 @@ class ExpiringLocalCache(AbstractCache):
 
     def _clear(self):
         """
-        根据过期时间清理缓存
+        从过期时间最小堆中弹出已过期的 key，只处理过期的部分，不遍历整个缓存
         :return:
         """
-        for key, (value, expire_time) in self._cache_container.items():
-            if expire_time < time.time():
-                del self._cache_container[key]
+        now = time.monotonic()
+        while self._expire_heap and self._expire_heap[0][0] < now:
+            expire_at, key = heapq.heappop(self._expire_heap)
+            entry = self._cache_container.get(key)
+            # key 已被删除或重新 set 过，这是一条旧记录
+            if entry is None or entry[1] != expire_at:
+                continue
+            self._delete(key)
+            self.expirations += 1
 
     async def _start_clear_cron(self):
         """
@@ -119,6 +215,37 @@ class ExpiringLocalCache(AbstractCache):
             await asyncio.sleep(self._cron_interval)
 
 
+class AsyncExpiringLocalCache(AbstractAsyncCache):
+
+    def __init__(self, *args, **kwargs):
+        """
+        本地缓存的异步接口，读写都在内存中完成、不会阻塞事件循环，直接调用 ExpiringLocalCache，
+        在协程中可以和 AsyncRedisCache 互换使用
+        :param args: 透传给 ExpiringLocalCache
+        :param kwargs: 透传给 ExpiringLocalCache
+        """
+        self.local_cache = ExpiringLocalCache(*args, **kwargs)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.local_cache.get(key)
+
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        self.local_cache.set(key, value, expire_time)
+
+    async def keys(self, pattern: str) -> List[str]:
+        return self.local_cache.keys(pattern)
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        return self.local_cache.mget(keys)
+
+    async def mset(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        self.local_cache.mset(mapping, expire_time)
+
+    async def close(self):
+        if self.local_cache._cron_task is not None:
+            self.local_cache._cron_task.cancel()
+
+
 if __name__ == '__main__':
     cache = ExpiringLocalCache(cron_interval=2)
     cache.set('name', '程序员阿江-Relakkes', 3)
@@ -14,34 +14,79 @@
 # @Name    : 程序员阿江-Relakkes
 # @Time    : 2024/5/29 22:57
 # @Desc    : RedisCache实现
-import pickle
+import asyncio
+import json
 import time
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 
-from redis import Redis
+from redis import ConnectionPool, Redis
+from redis import asyncio as aioredis
 
-from cache.abs_cache import AbstractCache
+from cache.abs_cache import AbstractAsyncCache, AbstractCache
 from config import db_config
+from tools import utils
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    序列化缓存值，json/msgpack 比 pickle 体积小，反序列化时也不会执行任意代码
+    :param value: 需要能被 json（或 msgpack）序列化
+    :return:
+    """
+    if db_config.REDIS_CACHE_SERIALIZER == "msgpack":
+        import msgpack
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_value(value: Optional[bytes]) -> Any:
+    """
+    反序列化缓存值，无法解析的值（如旧版本 pickle 写入的值）按不存在处理
+    :param value:
+    :return:
+    """
+    if value is None:
+        return None
+    try:
+        if db_config.REDIS_CACHE_SERIALIZER == "msgpack":
+            import msgpack
+            return msgpack.unpackb(value, raw=False)
+        return json.loads(value)
+    except Exception as e:
+        utils.logger.warning(f"[redis_cache.decode_value] decode cache value error: {e}")
+        return None
+
+
+def _connection_kwargs() -> Dict[str, Any]:
+    return dict(
+        host=db_config.REDIS_DB_HOST,
+        port=db_config.REDIS_DB_PORT,
+        db=db_config.REDIS_DB_NUM,
+        password=db_config.REDIS_DB_PWD,
+        max_connections=db_config.REDIS_MAX_CONNECTIONS,
+    )
 
 
 class RedisCache(AbstractCache):
+    # 同一进程内的 RedisCache 实例共用一个连接池
+    _connection_pool: Optional[ConnectionPool] = None
 
-    def __init__(self) -> None:
+    def __init__(self, redis_client: Optional[Redis] = None) -> None:
+        """
+        :param redis_client: 指定 redis 客户端（如测试时的 fakeredis），为空时按配置连接
+        """
         # 连接redis, 返回redis客户端
-        self._redis_client = self._connet_redis()
+        self._redis_client = redis_client or self._connet_redis()
 
-    @staticmethod
-    def _connet_redis() -> Redis:
+    @classmethod
+    def _connet_redis(cls) -> Redis:
         """
         连接redis, 返回redis客户端, 这里按需配置redis连接信息
         :return:
         """
-        return Redis(
-            host=db_config.REDIS_DB_HOST,
-            port=db_config.REDIS_DB_PORT,
-            db=db_config.REDIS_DB_NUM,
-            password=db_config.REDIS_DB_PWD,
-        )
+        if cls._connection_pool is None:
+            cls._connection_pool = ConnectionPool(**_connection_kwargs())
+        return Redis(connection_pool=cls._connection_pool)
 
     def get(self, key: str) -> Any:
         """
@@ -49,10 +94,7 @@ class RedisCache(AbstractCache):
         :param key:
         :return:
         """
-        value = self._redis_client.get(key)
-        if value is None:
-            return None
-        return pickle.loads(value)
+        return decode_value(self._redis_client.get(key))
 
     def set(self, key: str, value: Any, expire_time: int) -> None:
         """
@@ -62,13 +104,72 @@ class RedisCache(AbstractCache):
         :param expire_time:
         :return:
         """
-        self._redis_client.set(key, pickle.dumps(value), ex=expire_time)
+        self._redis_client.set(key, encode_value(value), ex=expire_time)
 
     def keys(self, pattern: str) -> List[str]:
         """
-        获取所有符合pattern的key
+        获取所有符合pattern的key，用 SCAN 分批遍历，不会像 KEYS 一样长时间阻塞 redis
         """
-        return [key.decode() for key in self._redis_client.keys(pattern)]
+        keys = self._redis_client.scan_iter(match=pattern, count=db_config.REDIS_SCAN_COUNT)
+        # SCAN 可能返回重复的 key
+        return list(dict.fromkeys(key.decode() for key in keys))
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        一次 MGET 获取多个键的值
+        :param keys:
+        :return:
+        """
+        if not keys:
+            return []
+        return [decode_value(value) for value in self._redis_client.mget(keys)]
+
+    def mset(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        MSET 不支持过期时间，用 pipeline 一次往返发送所有 SET
+        :param mapping:
+        :param expire_time:
+        :return:
+        """
+        pipe = self._redis_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(key, encode_value(value), ex=expire_time)
+        pipe.execute()
+
+
+class AsyncRedisCache(AbstractAsyncCache):
+
+    def __init__(self, redis_client: Optional[aioredis.Redis] = None) -> None:
+        """
+        异步 redis 缓存，在协程中使用，不阻塞事件循环
+        连接池与创建它的事件循环绑定，每个实例一个连接池，用完后调用 close()
+        :param redis_client: 指定 redis 客户端（如测试时的 fakeredis），为空时按配置连接
+        """
+        self._redis_client = redis_client or aioredis.Redis(**_connection_kwargs())
+
+    async def get(self, key: str) -> Any:
+        return decode_value(await self._redis_client.get(key))
+
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        await self._redis_client.set(key, encode_value(value), ex=expire_time)
+
+    async def keys(self, pattern: str) -> List[str]:
+        keys = [key async for key in self._redis_client.scan_iter(match=pattern, count=db_config.REDIS_SCAN_COUNT)]
+        return list(dict.fromkeys(key.decode() for key in keys))
+
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        return [decode_value(value) for value in await self._redis_client.mget(keys)]
+
+    async def mset(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, encode_value(value), ex=expire_time)
+            await pipe.execute()
+
+    async def close(self):
+        await self._redis_client.close()
 
 
 if __name__ == '__main__':
@@ -80,8 +181,20 @@ if __name__ == '__main__':
     time.sleep(2)
     print(redis_cache.get("name"))  # None
 
-    # special python type usage
+    # json type usage
     # list
     redis_cache.set("list", [1, 2, 3], 10)
     _value = redis_cache.get("list")
     print(_value, f"value type:{type(_value)}")  # [1, 2, 3]
+
+    # batch usage
+    redis_cache.mset({"a": 1, "b": {"c": 2}}, 10)
+    print(redis_cache.mget(["a", "b", "missing"]))  # [1, {'c': 2}, None]
+
+    async def async_usage():
+        async_cache = AsyncRedisCache()
+        await async_cache.set("name", "程序员阿江-Relakkes", 10)
+        print(await async_cache.mget(await async_cache.keys("na*")))  # ['程序员阿江-Relakkes']
+        await async_cache.close()
+
+    asyncio.run(async_usage())
@@ -14,6 +14,17 @@ PLATFORM = "xhs"
 KEYWORDS = "编程副业,编程兼职"  # 关键词搜索配置，以英文逗号分隔
 LOGIN_TYPE = "qrcode"  # qrcode or phone or cookie
 COOKIES = ""
+
+# 多账号：除了当前登录的账号外，再配置若干组账号的 cookie 字符串，例如 ["a1=xxx; web_session=xxx", "..."]
+# 配置后每个并发任务分配一个账号，按账号分别限流；被风控的账号冷却 ACCOUNT_COOLDOWN_SEC 秒（连续被风控时翻倍），
+# 连续 ACCOUNT_MAX_STRIKES 次后停用，其余账号继续爬取
+ACCOUNT_COOKIES_LIST = []
+
+# 多账号：同时加载 browser_data 下保存的其他登录态目录（{platform}_user_data_dir_*），每个目录作为一个账号
+ENABLE_ACCOUNT_PROFILES = False
+
+ACCOUNT_COOLDOWN_SEC = 600
+ACCOUNT_MAX_STRIKES = 3
 # 具体值参见media_platform.xxx.field下的枚举值，暂时只支持小红书
 SORT_TYPE = "popularity_descending"
 # 具体值参见media_platform.xxx.field下的枚举值，暂时只支持抖音
@@ -27,15 +38,28 @@ UA = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML,
 # 是否开启 IP 代理
 ENABLE_IP_PROXY = False
 
-# 未启用代理时的最大爬取间隔，单位秒（暂时仅对XHS有效）
-CRAWLER_MAX_SLEEP_SEC = 2
-
 # 代理IP池数量
 IP_PROXY_POOL_COUNT = 2
 
 # 代理IP提供商名称
 IP_PROXY_PROVIDER_NAME = "kuaidaili"
 
+# 代理池后台并发验证代理的最大并发数
+PROXY_VALIDATE_CONCURRENCY = 5
+
+# 代理被平台封禁后的隔离时间（秒），到期后重新验证，通过后再放回代理池
+PROXY_QUARANTINE_SEC = 300
+
+# 代理轮换策略：round_robin 每 PROXY_ROTATE_EVERY_N_REQUESTS 个请求换一个代理，被封禁时立即换；
+# on_block 一直使用当前代理，直到被封禁或连接失败；sticky 整个会话只使用一个代理（与浏览器出口 IP 一致）
+PROXY_ROTATION_POLICY = "round_robin"
+
+# round_robin 策略下每个代理连续使用的请求数
+PROXY_ROTATE_EVERY_N_REQUESTS = 10
+
+# 请求被封禁或代理连接失败时，换代理重发的最大次数
+PROXY_MAX_FAILOVER = 2
+
 # 设置为True不会打开浏览器（无头浏览器）
 # 设置False会打开一个浏览器
 # 小红书如果一直扫码登录不通过，打开浏览器手动过一下滑动验证码
@@ -48,6 +72,19 @@ SAVE_LOGIN_STATE = True
 # 数据保存类型选项配置,支持三种类型：csv、db、json, 最好保存到DB，有排重的功能。
 SAVE_DATA_OPTION = "json"  # csv or db or json
 
+# SAVE_DATA_OPTION 为 json 时的文件格式：jsonl 每条数据追加一行到 .jsonl 文件；json 为旧格式，每条数据都会重写整个 .json 文件
+JSON_STORE_FORMAT = "jsonl"  # jsonl or json
+
+# jsonl 文件定时 fsync 的间隔（秒）
+JSONL_FSYNC_INTERVAL_SEC = 5
+
+# 退出时把 jsonl 文件压实成同名的 JSON 数组文件（.json），供仍然读取旧格式的程序使用
+JSONL_COMPACT_ON_CLOSE = True
+
+# SAVE_DATA_OPTION 为 csv 时，单个文件缓冲达到 CSV_WRITE_BATCH_SIZE 行或距上次写入超过 CSV_FLUSH_INTERVAL_SEC 秒时写入文件
+CSV_WRITE_BATCH_SIZE = 100
+CSV_FLUSH_INTERVAL_SEC = 5
+
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
 
@@ -60,6 +97,42 @@ CRAWLER_MAX_NOTES_COUNT = 200
 # 并发爬虫数量控制
 MAX_CONCURRENCY_NUM = 1
 
+# 全局限流：所有平台客户端共享，每个 (域名, 接口类别) 一个令牌桶，单位为 次/秒
+# key 可以是接口类别(search/comment/default)、域名，或 "域名/接口类别"，越具体的优先级越高
+# 限流器统一负责请求间隔，有空余额度时不再额外等待，提高 MAX_CONCURRENCY_NUM 也不会超过这里的速率
+RATE_LIMIT_RATES = {
+    "default": 1.0,
+    "search": 0.5,
+    "comment": 2.0,
+    "media": 5.0,  # 图片/视频文件下载
+    "m.weibo.cn": 0.5,  # 微博对API的限流比较严重
+}
+
+# 每个令牌桶允许的突发请求数
+RATE_LIMIT_BURST = 3
+
+# 命中 412/429/461/471 或平台风控错误码后的暂停时间（秒），连续命中时翻倍，并同时把该桶速率减半
+RATE_LIMIT_BACKOFF_BASE_SEC = 5
+RATE_LIMIT_BACKOFF_MAX_SEC = 120
+
+# 每个平台客户端持有一个长连接的 httpx.AsyncClient，复用 TCP/TLS 连接
+# 连接池上限：总连接数、保持空闲的 keep-alive 连接数、空闲连接的保留时间（秒）
+HTTPX_MAX_CONNECTIONS = 20
+HTTPX_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTPX_KEEPALIVE_EXPIRY = 30
+
+# 是否启用 HTTP/2（需要安装 h2：pip install httpx[http2]），未安装时自动回退到 HTTP/1.1
+ENABLE_HTTP2 = False
+
+# 抖音 a_bogus、知乎 x-zse-96 签名使用常驻的 node 进程计算，每个签名脚本最多启动的进程数
+SIGN_WORKER_POOL_SIZE = 2
+
+# 小红书签名页面数量，签名需要在浏览器页面中执行，多开几个页面让并发请求可以并行签名
+XHS_SIGN_PAGE_POOL_SIZE = 3
+
+# 抖音 msToken（localStorage 中的 xmst）缓存时间（秒），过期或请求被拒绝时重新从页面读取
+DY_MS_TOKEN_TTL_SEC = 600
+
 # 是否开启爬图片模式, 默认不开启爬图片
 ENABLE_GET_IMAGES = False
 
@@ -171,6 +244,8 @@ ZHIHU_SPECIFIED_ID_LIST = [
 # 词云相关
 # 是否开启生成评论词云图
 ENABLE_GET_WORDCLOUD = False
+# 词云图生成间隔（秒），评论只在保存时分词一次并累加词频，词云按该间隔在后台生成，退出时再生成一次；为 0 时只在退出时生成
+WORDCLOUD_RENDER_INTERVAL_SEC = 300
 # 自定义词语及其分组
 # 添加规则：xx:yy 其中xx为自定义添加的词组，yy为将xx该词组分到的组名。
 CUSTOM_WORDS = {
@@ -192,9 +267,42 @@ END_DAY = '2024-01-01'
 
 # 是否开启按每一天进行爬取的选项，仅支持 bilibili 关键字搜索
 # 若为 False，则忽略 START_DAY 与 END_DAY 设置的值
-# 若为 True，则按照 START_DAY 至 END_DAY 按照每一天进行筛选，这样能够突破 1000 条视频的限制，最大程度爬取该关键词下的所有视频
+# 若为 True，则按照 START_DAY 至 END_DAY 自适应切分发布时间窗口进行筛选：超过 1000 条上限的窗口对半拆分，没有视频的窗口直接跳过，
+# 这样能够突破 1000 条视频的限制，用最少的请求最大程度爬取该关键词下的所有视频（CRAWLER_MAX_NOTES_COUNT 为每个窗口的上限）
 ALL_DAY = False
 
+# B站 wbi 签名 key（img_key/sub_key）的缓存时间（秒），过期后后台刷新，接口返回 -352/-403 时立即重新获取
+BILI_WBI_KEY_TTL_SEC = 3600
+
+# B站无浏览器模式：LOGIN_TYPE 为 cookie 时不启动 Chromium，直接用 COOKIES 创建客户端并通过接口获取 wbi key
+# 启动更快、内存占用更小，适合在一台机器上运行多个 B站 爬虫进程；cookie 失效时需要手动更新 COOKIES
+BILI_BROWSERLESS = False
+
+# 分布式任务队列：开启后 main.py 作为 worker 运行，从队列中批量领取 --platform 和 --type 对应的任务
+# （搜索关键词、内容 id/链接、创作者 id/链接）并写入对应配置项后爬取，任务通过 python -m task_queue.cli 入队
+ENABLE_TASK_QUEUE = False
+
+# 任务队列后端：redis 多台机器共享队列（连接配置与 redis 缓存相同），sqlite 用于单机多进程
+TASK_QUEUE_BACKEND = "sqlite"
+
+# sqlite 任务队列的数据库文件
+TASK_QUEUE_SQLITE_PATH = "data/task_queue.db"
+
+# 每次领取的任务数，一批任务共用一次浏览器启动和登录
+TASK_QUEUE_LEASE_BATCH_SIZE = 5
+
+# 任务的可见性超时（秒），worker 运行期间定时续租，worker 异常退出后超时的任务重新分配给其他 worker
+TASK_QUEUE_VISIBILITY_TIMEOUT_SEC = 600
+
+# 任务最多领取的次数，达到后仍失败或超时的任务进入死信队列，可通过 python -m task_queue.cli dead --requeue 重新入队
+TASK_QUEUE_MAX_ATTEMPTS = 3
+
+# 队列为空时的轮询间隔（秒）
+TASK_QUEUE_POLL_INTERVAL_SEC = 10
+
+# 队列为空时是否退出 worker
+TASK_QUEUE_EXIT_WHEN_EMPTY = False
+
 #!!! 下面仅支持 bilibili creator搜索
 # 爬取评论creator主页还是爬取creator动态和关系列表(True为前者)
 CREATOR_MODE = True
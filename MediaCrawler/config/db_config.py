@@ -18,12 +18,19 @@ RELATION_DB_HOST = os.getenv("RELATION_DB_HOST", "localhost")
 RELATION_DB_PORT = os.getenv("RELATION_DB_PORT", 3306)
 RELATION_DB_NAME = os.getenv("RELATION_DB_NAME", "media_crawler")
 
+# 写入 mysql 时先按表缓冲，攒够 MYSQL_WRITE_BATCH_SIZE 条或距上次写入超过 MYSQL_WRITE_FLUSH_INTERVAL_SEC 秒时批量写入
+MYSQL_WRITE_BATCH_SIZE = 200
+MYSQL_WRITE_FLUSH_INTERVAL_SEC = 2
+
 
 # redis config
 REDIS_DB_HOST = "127.0.0.1"  # your redis host
 REDIS_DB_PWD = os.getenv("REDIS_DB_PWD", "123456")  # your redis password
 REDIS_DB_PORT = os.getenv("REDIS_DB_PORT", 6379)  # your redis port
 REDIS_DB_NUM = os.getenv("REDIS_DB_NUM", 0)  # your redis db num
+REDIS_MAX_CONNECTIONS = 20  # redis 连接池最大连接数
+REDIS_SCAN_COUNT = 1000  # keys() 使用 SCAN 遍历时每次返回的 key 数量
+REDIS_CACHE_SERIALIZER = "json"  # 缓存值的序列化方式：json 或 msgpack（需要 pip install msgpack）
 
 # cache type
 CACHE_TYPE_REDIS = "redis"
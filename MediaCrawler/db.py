@@ -22,6 +22,7 @@ import aiomysql
 
 import config
 from async_db import AsyncMysqlDB
+from store.db_write_buffer import close_db_write_buffer
 from tools import utils
 from var import db_conn_pool_var, media_crawler_db_var
 
@@ -64,6 +65,7 @@ async def close():
     Returns:
 
     """
+    await close_db_write_buffer()
     utils.logger.info("[close] close mediacrawler db pool")
     db_pool: aiomysql.Pool = db_conn_pool_var.get()
     if db_pool is not None:
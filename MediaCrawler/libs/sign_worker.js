@@ -0,0 +1,34 @@
+// 常驻签名进程：启动时加载一次签名脚本，之后通过 stdin/stdout 按行收发 JSON 请求
+// 用法：node libs/sign_worker.js libs/douyin.js
+// 请求：{"id": 1, "fn": "sign_datail", "args": ["a=1", "Mozilla/5.0 ..."]}
+// 响应：{"id": 1, "result": "..."} 或 {"id": 1, "error": "..."}
+
+const fs = require('fs');
+const readline = require('readline');
+
+// 签名脚本里的 console.log 会污染协议输出，统一转到 stderr
+console.log = (...args) => process.stderr.write(args.join(' ') + '\n');
+
+const source = fs.readFileSync(process.argv[2], 'utf-8').replace(/^\uFEFF/, '');
+// 与 execjs 一样把脚本包在函数里执行，脚本中的 require 和顶层函数都可以访问
+// 这里必须用直接 eval 才能按名字取到闭包里的函数
+const callByName = new Function('require', 'module', 'exports',
+    source + '\n;return function (__fn, __args) { return eval(__fn).apply(null, __args); };'
+)(require, module, exports);
+
+const rl = readline.createInterface({input: process.stdin, crlfDelay: Infinity});
+rl.on('line', (line) => {
+    if (!line) {
+        return;
+    }
+    let req;
+    try {
+        req = JSON.parse(line);
+        const result = callByName(req.fn, req.args || []);
+        process.stdout.write(JSON.stringify({id: req.id, result: result === undefined ? null : result}) + '\n');
+    } catch (e) {
+        process.stdout.write(JSON.stringify({id: req ? req.id : null, error: String(e && e.stack || e)}) + '\n');
+    }
+});
+// 父进程退出后 stdin 关闭，跟着退出
+rl.on('close', () => process.exit(0));
@@ -23,6 +23,10 @@ from media_platform.tieba import TieBaCrawler
 from media_platform.weibo import WeiboCrawler
 from media_platform.xhs import XiaoHongShuCrawler
 from media_platform.zhihu import ZhihuCrawler
+from store.csv_store import close_csv_store
+from store.jsonl_store import close_jsonl_store
+from task_queue.worker import run_queue_worker
+from tools.words import close_word_cloud_generator
 
 
 class CrawlerFactory:
@@ -52,17 +56,32 @@ async def main():
     if config.SAVE_DATA_OPTION == "db":
         await db.init_db()
 
-    crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
-
-    if config.SAVE_DATA_OPTION == "db":
-        await db.close()
+    try:
+        if config.ENABLE_TASK_QUEUE:
+            # 每批任务创建一个新的爬虫
+            await run_queue_worker(lambda: CrawlerFactory.create_crawler(platform=config.PLATFORM))
+        else:
+            crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
+            await crawler.start()
+    finally:
+        if config.SAVE_DATA_OPTION == "db":
+            # 写入缓冲中剩余的数据后再关闭连接池
+            await db.close()
+        elif config.SAVE_DATA_OPTION == "json":
+            await close_jsonl_store()
+            await close_word_cloud_generator()
+        elif config.SAVE_DATA_OPTION == "csv":
+            await close_csv_store()
 
-    
 
 if __name__ == '__main__':
+    loop = asyncio.get_event_loop()
+    main_task = loop.create_task(main())
     try:
         # asyncio.run(main())
-        asyncio.get_event_loop().run_until_complete(main())
+        loop.run_until_complete(main_task)
     except KeyboardInterrupt:
+        # 取消主任务，让 main 中的 finally 把缓冲的数据写入数据库或文件
+        main_task.cancel()
+        loop.run_until_complete(asyncio.gather(main_task, return_exceptions=True))
         sys.exit()
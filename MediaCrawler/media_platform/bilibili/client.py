@@ -18,7 +18,6 @@ import json
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 
 import config
@@ -27,7 +26,7 @@ from tools import utils
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
-from .help import BilibiliSign
+from .help import WBI_RISK_CONTROL_CODES, WbiKeyManager
 
 
 class BilibiliClient(AbstractApiClient):
@@ -37,7 +36,7 @@ class BilibiliClient(AbstractApiClient):
             proxies=None,
             *,
             headers: Dict[str, str],
-            playwright_page: Page,
+            playwright_page: Optional[Page],
             cookie_dict: Dict[str, str],
     ):
         self.proxies = proxies
@@ -46,14 +45,39 @@ class BilibiliClient(AbstractApiClient):
         self._host = "https://api.bilibili.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self.wbi_key_manager = WbiKeyManager(self.get_wbi_keys, config.BILI_WBI_KEY_TTL_SEC)
 
-    async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+    def is_blocked_response(self, response) -> bool:
+        """
+        风控时 B站 可能返回 HTTP 412，也可能返回 HTTP 200 + code -412
+        :param response:
+        :return:
+        """
+        if super().is_blocked_response(response):
+            return True
+        body = self.get_block_check_body(response)
+        if body is None or b"-412" not in body:
+            return False
+        try:
+            return response.json().get("code") == -412
+        except ValueError:
+            return False
+
+    async def request(self, method, url, enable_return_response: bool = False, **kwargs) -> Any:
+        await self.acquire_rate_limit(url)
+        response = await self.send_request(
+            method, url, proxies=self.proxies, timeout=self.timeout,
+            **kwargs
+        )
+        self.report_rate_limit(url, response.status_code)
+        if enable_return_response:
+            return response
         data: Dict = response.json()
+        if data.get("code") == -412:
+            # 风控时 B站 也可能返回 HTTP 200 + code -412
+            self.report_rate_limit(url, throttled=True)
+        if data.get("code") in WBI_RISK_CONTROL_CODES:
+            self.wbi_key_manager.invalidate()
         if data.get("code") != 0:
             raise DataFetchError(data.get("message", "unkonw error"))
         else:
@@ -64,28 +88,34 @@ class BilibiliClient(AbstractApiClient):
         发送请求进行请求参数签名
         需要从 localStorage 拿 wbi_img_urls 这参数，值如下：
         https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png-https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png
+        img_key/sub_key 由 wbi_key_manager 缓存，只在过期或被风控时重新获取
         :param req_data:
         :return:
         """
         if not req_data:
             return {}
-        img_key, sub_key = await self.get_wbi_keys()
-        return BilibiliSign(img_key, sub_key).sign(req_data)
+        return await self.wbi_key_manager.sign(req_data)
 
     async def get_wbi_keys(self) -> Tuple[str, str]:
         """
         获取最新的 img_key 和 sub_key
+        有浏览器时优先从 localStorage 读取，无浏览器模式或读取不到时请求 /x/web-interface/nav
         :return:
         """
-        local_storage = await self.playwright_page.evaluate("() => window.localStorage")
-        wbi_img_urls = local_storage.get("wbi_img_urls", "") or local_storage.get(
-            "wbi_img_url") + "-" + local_storage.get("wbi_sub_url")
+        wbi_img_urls = ""
+        if self.playwright_page:
+            local_storage = await self.playwright_page.evaluate("() => window.localStorage")
+            wbi_img_urls = local_storage.get("wbi_img_urls", "") or local_storage.get(
+                "wbi_img_url") + "-" + local_storage.get("wbi_sub_url")
         if wbi_img_urls and "-" in wbi_img_urls:
             img_url, sub_url = wbi_img_urls.split("-")
         else:
-            resp = await self.request(method="GET", url=self._host + "/x/web-interface/nav")
-            img_url: str = resp['wbi_img']['img_url']
-            sub_url: str = resp['wbi_img']['sub_url']
+            # 未登录时 nav 接口返回 code -101，但 data 中仍然带有 wbi_img
+            response = await self.request(method="GET", url=self._host + "/x/web-interface/nav",
+                                          headers=self.headers, enable_return_response=True)
+            wbi_img: Dict = response.json().get("data", {}).get("wbi_img", {})
+            img_url: str = wbi_img['img_url']
+            sub_url: str = wbi_img['sub_url']
         img_key = img_url.rsplit('/', 1)[1].split('.')[0]
         sub_key = sub_url.rsplit('/', 1)[1].split('.')[0]
         return img_key, sub_key
@@ -193,13 +223,14 @@ class BilibiliClient(AbstractApiClient):
         return await self.get(uri, params, enable_params_sign=True)
 
     async def get_video_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
-                return None
-            else:
-                return response.content
+        await self.acquire_rate_limit(url, "media")
+        response = await self.send_request("GET", url, proxies=self.proxies, timeout=self.timeout, headers=self.headers)
+        self.report_rate_limit(url, response.status_code, endpoint_class="media")
+        if not response.reason_phrase == "OK":
+            utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
+            return None
+        else:
+            return response.content
 
     async def get_video_comments(self,
                                  video_id: str,
@@ -16,24 +16,26 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
-import pandas as pd
 
 from playwright.async_api import (BrowserContext, BrowserType, Page, async_playwright)
 
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import ProxyRotator, create_proxy_rotator
 from store import bilibili as bilibili_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
+from tools.account_pool import create_account_pool
 from var import crawler_type_var, source_keyword_var
 
 from .client import BilibiliClient
 from .exception import DataFetchError
 from .field import SearchOrderType
+from .help import split_search_windows
 from .login import BilibiliLogin
 
 
@@ -45,15 +47,22 @@ class BilibiliCrawler(AbstractCrawler):
     def __init__(self):
         self.index_url = "https://www.bilibili.com"
         self.user_agent = utils.get_user_agent()
+        self.browser_context: Optional[BrowserContext] = None
+        self.context_page: Optional[Page] = None
 
     async def start(self):
-        playwright_proxy_format, httpx_proxy_format = None, None
+        playwright_proxy_format, httpx_proxy_format, proxy_rotator = None, None, None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info)
 
+        if config.BILI_BROWSERLESS and config.LOGIN_TYPE == "cookie":
+            await self.start_browserless(httpx_proxy_format, proxy_rotator)
+            return
+
         async with async_playwright() as playwright:
             # Launch a browser context.
             chromium = playwright.chromium
@@ -70,6 +79,7 @@ class BilibiliCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.bili_client = await self.create_bilibili_client(httpx_proxy_format)
+            self.bili_client.proxy_rotator = proxy_rotator
             if not await self.bili_client.pong():
                 login_obj = BilibiliLogin(
                     login_type=config.LOGIN_TYPE,
@@ -81,23 +91,59 @@ class BilibiliCrawler(AbstractCrawler):
                 await login_obj.begin()
                 await self.bili_client.update_cookies(browser_context=self.browser_context)
 
-            crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
-                # Search for video and retrieve their comment information.
-                await self.search()
-            elif config.CRAWLER_TYPE == "detail":
-                # Get the information and comments of the specified post
-                await self.get_specified_videos(config.BILI_SPECIFIED_ID_LIST)
-            elif config.CRAWLER_TYPE == "creator":
-                if config.CREATOR_MODE:
-                    for creator_id in config.BILI_CREATOR_ID_LIST:
-                        await self.get_creator_videos(int(creator_id))
-                else:
-                    await self.get_all_creator_details(config.BILI_CREATOR_ID_LIST)
-            else:
-                pass
+            # 配置了多个账号时，并发任务分摊到各个账号上
+            cookie_str, _ = utils.convert_cookies(await self.browser_context.cookies())
+            self.bili_client.account_pool = await create_account_pool(
+                cookie_str, self.bili_client.pong, chromium, self.user_agent)
+            await self.run_crawler_tasks()
             utils.logger.info(
                 "[BilibiliCrawler.start] Bilibili Crawler finished ...")
+            await self.close()
+
+    async def start_browserless(self, httpx_proxy: Optional[Dict], proxy_rotator: Optional[ProxyRotator] = None):
+        """
+        不启动浏览器，直接用配置中的 cookie 创建客户端，wbi key 通过 /x/web-interface/nav 获取
+        需要 LOGIN_TYPE 为 cookie 并开启 BILI_BROWSERLESS
+        :param httpx_proxy: httpx proxy
+        :param proxy_rotator: 开启代理时的代理轮换器
+        :return:
+        """
+        utils.logger.info("[BilibiliCrawler.start_browserless] Start bilibili crawler without browser ...")
+        self.bili_client = await self.create_bilibili_client(httpx_proxy)
+        self.bili_client.proxy_rotator = proxy_rotator
+        try:
+            if not await self.bili_client.pong():
+                # 没有浏览器无法走登录流程，cookie 失效时直接退出
+                utils.logger.error(
+                    "[BilibiliCrawler.start_browserless] Cookie login state is invalid, please update COOKIES in config")
+                return
+            self.bili_client.account_pool = await create_account_pool(config.COOKIES.strip(), self.bili_client.pong)
+            await self.run_crawler_tasks()
+            utils.logger.info(
+                "[BilibiliCrawler.start_browserless] Bilibili Crawler finished ...")
+        finally:
+            await self.close()
+
+    async def run_crawler_tasks(self):
+        """
+        按 CRAWLER_TYPE 执行爬取任务
+        :return:
+        """
+        crawler_type_var.set(config.CRAWLER_TYPE)
+        if config.CRAWLER_TYPE == "search":
+            # Search for video and retrieve their comment information.
+            await self.search()
+        elif config.CRAWLER_TYPE == "detail":
+            # Get the information and comments of the specified post
+            await self.get_specified_videos(config.BILI_SPECIFIED_ID_LIST)
+        elif config.CRAWLER_TYPE == "creator":
+            if config.CREATOR_MODE:
+                for creator_id in config.BILI_CREATOR_ID_LIST:
+                    await self.get_creator_videos(int(creator_id))
+            else:
+                await self.get_all_creator_details(config.BILI_CREATOR_ID_LIST)
+        else:
+            pass
 
     @staticmethod
     async def get_pubtime_datetime(start: str = config.START_DAY, end: str = config.END_DAY) -> Tuple[str, str]:
@@ -176,54 +222,75 @@ class BilibiliCrawler(AbstractCrawler):
                             await bilibili_store.update_bilibili_video(video_item)
                             await bilibili_store.update_up_info(video_item)
                             await self.get_bilibili_video(video_item, semaphore)
+                            mark_target_crawled(keyword)
                     page += 1
                     await self.batch_get_video_comments(video_id_list)
-            # 按照 START_DAY 至 END_DAY 按照每一天进行筛选，这样能够突破 1000 条视频的限制，最大程度爬取该关键词下每一天的所有视频
+            # 按照 START_DAY 至 END_DAY 自适应切分发布时间窗口：超过 1000 条上限的窗口对半拆分，空窗口直接跳过，
+            # 这样既能突破 1000 条视频的限制，又不会在没有视频的日期上浪费请求
             else:
-                for day in pd.date_range(start=config.START_DAY, end=config.END_DAY, freq='D'):
-                    # 按照每一天进行爬取的时间戳参数
-                    pubtime_begin_s, pubtime_end_s = await self.get_pubtime_datetime(start=day.strftime('%Y-%m-%d'), end=day.strftime('%Y-%m-%d'))
+                pubtime_begin_s, pubtime_end_s = await self.get_pubtime_datetime(start=config.START_DAY, end=config.END_DAY)
+
+                async def probe_window(begin_s: int, end_s: int) -> Dict:
+                    return await self.bili_client.search_video_by_keyword(
+                        keyword=keyword,
+                        page=1,
+                        page_size=bili_limit_count,
+                        order=SearchOrderType.DEFAULT,
+                        pubtime_begin_s=begin_s,  # 作品发布日期起始时间戳
+                        pubtime_end_s=end_s  # 作品发布日期结束日期时间戳
+                    )
+
+                # 窗口探测重试后仍失败时抛出异常，由上层处理（断点续跑、任务队列重投），不会静默跳过整个时间窗口
+                async for begin_s, end_s, first_page in split_search_windows(probe_window, int(pubtime_begin_s), int(pubtime_end_s)):
+                    num_pages = int(first_page.get("numPages") or 1)
+                    utils.logger.info(
+                        f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, window: "
+                        f"{datetime.fromtimestamp(begin_s)} - {datetime.fromtimestamp(end_s)}, "
+                        f"results: {first_page.get('numResults')}, pages: {num_pages}")
                     page = 1
-                    #!该段 while 语句在发生异常时（通常情况下为当天数据为空时）会自动跳转到下一天，以实现最大程度爬取该关键词下当天的所有视频
-                    #!除了仅保留现在原有的 try, except Exception 语句外，不要再添加其他的异常处理！！！否则将使该段代码失效，使其仅能爬取当天一天数据而无法跳转到下一天
-                    #!除非将该段代码的逻辑进行重构以实现相同的功能，否则不要进行修改！！！
-                    while (page - start_page + 1) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                        #! Catch any error if response return nothing, go to next day
+                    videos_res = first_page
+                    while page <= num_pages and (page - start_page + 1) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+                        # 请求出错时跳到下一个时间窗口
                         try:
-                            #! Don't skip any page, to make sure gather all video in one day
-                            # if page < start_page:
-                            #     utils.logger.info(f"[BilibiliCrawler.search] Skip page: {page}")
-                            #     page += 1
-                            #     continue
-
-                            utils.logger.info(f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, date: {day.ctime()}, page: {page}")
-                            video_id_list: List[str] = []
-                            videos_res = await self.bili_client.search_video_by_keyword(
-                                keyword=keyword,
-                                page=page,
-                                page_size=bili_limit_count,
-                                order=SearchOrderType.DEFAULT,
-                                pubtime_begin_s=pubtime_begin_s,  # 作品发布日期起始时间戳
-                                pubtime_end_s=pubtime_end_s  # 作品发布日期结束日期时间戳
-                            )
-                            video_list: List[Dict] = videos_res.get("result")
-
-                            semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                            task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
-                            video_items = await asyncio.gather(*task_list)
-                            for video_item in video_items:
-                                if video_item:
-                                    video_id_list.append(video_item.get("View").get("aid"))
-                                    await bilibili_store.update_bilibili_video(video_item)
-                                    await bilibili_store.update_up_info(video_item)
-                                    await self.get_bilibili_video(video_item, semaphore)
+                            if page > 1:
+                                utils.logger.info(f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, window page: {page}")
+                                videos_res = await self.bili_client.search_video_by_keyword(
+                                    keyword=keyword,
+                                    page=page,
+                                    page_size=bili_limit_count,
+                                    order=SearchOrderType.DEFAULT,
+                                    pubtime_begin_s=begin_s,
+                                    pubtime_end_s=end_s
+                                )
+                            video_list: List[Dict] = videos_res.get("result") or []
+                            if not video_list:
+                                break
+                            if await self.process_search_page(video_list):
+                                mark_target_crawled(keyword)
                             page += 1
-                            await self.batch_get_video_comments(video_id_list)
-                        # go to next day
                         except Exception as e:
-                            print(e)
+                            utils.logger.error(f"[BilibiliCrawler.search] search window {begin_s}-{end_s} page {page} error: {e}")
                             break
 
+    async def process_search_page(self, video_list: List[Dict]) -> int:
+        """
+        获取一页搜索结果中每个视频的详情并存储，然后批量获取评论
+        :param video_list: 搜索接口返回的视频列表
+        :return: 存储的视频数
+        """
+        video_id_list: List[str] = []
+        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
+        video_items = await asyncio.gather(*task_list)
+        for video_item in video_items:
+            if video_item:
+                video_id_list.append(video_item.get("View").get("aid"))
+                await bilibili_store.update_bilibili_video(video_item)
+                await bilibili_store.update_up_info(video_item)
+                await self.get_bilibili_video(video_item, semaphore)
+        await self.batch_get_video_comments(video_id_list)
+        return len(video_id_list)
+
     async def batch_get_video_comments(self, video_id_list: List[str]):
         """
         batch get video comments
@@ -258,7 +325,7 @@ class BilibiliCrawler(AbstractCrawler):
                     f"[BilibiliCrawler.get_comments] begin get video_id: {video_id} comments ...")
                 await self.bili_client.get_video_all_comments(
                     video_id=video_id,
-                    crawl_interval=random.random(),
+                    crawl_interval=0,
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=bilibili_store.batch_update_bilibili_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
@@ -285,8 +352,9 @@ class BilibiliCrawler(AbstractCrawler):
                 video_bvids_list.append(video["bvid"])
             if (int(result["page"]["count"]) <= pn * ps):
                 break
-            await asyncio.sleep(random.random())
             pn += 1
+        if video_bvids_list:
+            mark_target_crawled(creator_id)
         await self.get_specified_videos(video_bvids_list)
 
     async def get_specified_videos(self, bvids_list: List[str]):
@@ -301,8 +369,9 @@ class BilibiliCrawler(AbstractCrawler):
         ]
         video_details = await asyncio.gather(*task_list)
         video_aids_list = []
-        for video_detail in video_details:
+        for video_id, video_detail in zip(bvids_list, video_details):
             if video_detail is not None:
+                mark_target_crawled(video_id)
                 video_item_view: Dict = video_detail.get("View")
                 video_aid: str = video_item_view.get("aid")
                 if video_aid:
@@ -362,7 +431,11 @@ class BilibiliCrawler(AbstractCrawler):
         """
         utils.logger.info(
             "[BilibiliCrawler.create_bilibili_client] Begin create bilibili API client ...")
-        cookie_str, cookie_dict = utils.convert_cookies(await self.browser_context.cookies())
+        if self.browser_context:
+            cookie_str, cookie_dict = utils.convert_cookies(await self.browser_context.cookies())
+        else:
+            # 无浏览器模式直接使用配置中的 cookie 字符串
+            cookie_str, cookie_dict = config.COOKIES.strip(), utils.convert_str_cookie_to_dict(config.COOKIES)
         bilibili_client_obj = BilibiliClient(
             proxies=httpx_proxy,
             headers={
@@ -500,6 +573,8 @@ class BilibiliCrawler(AbstractCrawler):
         """
         async with semaphore:
             creator_unhandled_info: Dict = await self.bili_client.get_creator_info(creator_id)
+            if creator_unhandled_info:
+                mark_target_crawled(creator_id)
             creator_info: Dict = {
                 "id": creator_id,
                 "name": creator_unhandled_info.get("name"),
@@ -524,7 +599,7 @@ class BilibiliCrawler(AbstractCrawler):
                     f"[BilibiliCrawler.get_fans] begin get creator_id: {creator_id} fans ...")
                 await self.bili_client.get_creator_all_fans(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=0,
                     callback=bilibili_store.batch_update_bilibili_creator_fans,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -550,7 +625,7 @@ class BilibiliCrawler(AbstractCrawler):
                     f"[BilibiliCrawler.get_followings] begin get creator_id: {creator_id} followings ...")
                 await self.bili_client.get_creator_all_followings(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=0,
                     callback=bilibili_store.batch_update_bilibili_creator_followings,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -576,7 +651,7 @@ class BilibiliCrawler(AbstractCrawler):
                     f"[BilibiliCrawler.get_dynamics] begin get creator_id: {creator_id} dynamics ...")
                 await self.bili_client.get_creator_all_dynamics(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=0,
                     callback=bilibili_store.batch_update_bilibili_creator_dynamics,
                     max_count=config.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
                 )
@@ -587,3 +662,10 @@ class BilibiliCrawler(AbstractCrawler):
             except Exception as e:
                 utils.logger.error(
                     f"[BilibiliCrawler.get_dynamics] may be been blocked, err:{e}")
+
+    async def close(self):
+        """Close api client and browser context"""
+        await self.bili_client.close()
+        if self.browser_context:
+            await self.browser_context.close()
+            utils.logger.info("[BilibiliCrawler.close] Browser context closed ...")
@@ -14,9 +14,11 @@
 # @Time    : 2023/12/2 23:26
 # @Desc    : bilibili 请求参数签名
 # 逆向实现参考：https://socialsisteryi.github.io/bilibili-API-collect/docs/misc/sign/wbi.html#wbi%E7%AD%BE%E5%90%8D%E7%AE%97%E6%B3%95
+import asyncio
+import time
 import urllib.parse
 from hashlib import md5
-from typing import Dict
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 
 from tools import utils
 
@@ -31,17 +33,17 @@ class BilibiliSign:
             61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
             36, 20, 34, 44, 52
         ]
+        self._salt: Optional[str] = None
 
     def get_salt(self) -> str:
         """
-        获取加盐的 key
+        获取加盐的 key，只和 img_key/sub_key 有关，计算一次后缓存
         :return:
         """
-        salt = ""
-        mixin_key = self.img_key + self.sub_key
-        for mt in self.map_table:
-            salt += mixin_key[mt]
-        return salt[:32]
+        if self._salt is None:
+            mixin_key = self.img_key + self.sub_key
+            self._salt = "".join(mixin_key[mt] for mt in self.map_table)[:32]
+        return self._salt
 
     def sign(self, req_data: Dict) -> Dict:
         """
@@ -66,6 +68,143 @@ class BilibiliSign:
         return req_data
 
 
+# 返回这些错误码说明 wbi 签名可能已失效（风控校验失败），需要重新获取 img_key/sub_key
+WBI_RISK_CONTROL_CODES = (-352, -403)
+
+
+class WbiKeyManager:
+    def __init__(self, fetch_keys: Callable[[], Awaitable[Tuple[str, str]]], ttl_s: float):
+        """
+        缓存 wbi 签名用的 img_key/sub_key 以及由它们算出的 32 位 mixin key
+        过期后先继续用旧 key 签名，同时在后台刷新；被风控时立即作废，下一次签名等待新 key
+        这样除了首次获取和作废后的第一次，签名都是纯内存操作
+        :param fetch_keys: 获取最新 (img_key, sub_key) 的协程函数
+        :param ttl_s: key 的缓存时间（秒）
+        """
+        self.fetch_keys = fetch_keys
+        self.ttl_s = ttl_s
+        self._signer: Optional[BilibiliSign] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _refresh(self) -> BilibiliSign:
+        try:
+            img_key, sub_key = await self.fetch_keys()
+        except Exception as e:
+            if self._signer is None:
+                raise
+            # 后台刷新失败时继续用旧 key，一分钟后再试
+            utils.logger.error(f"[WbiKeyManager._refresh] refresh wbi keys failed, keep the old keys: {e}")
+            self._expires_at = time.monotonic() + 60
+            return self._signer
+        signer = BilibiliSign(img_key, sub_key)
+        signer.get_salt()
+        self._signer = signer
+        self._expires_at = time.monotonic() + self.ttl_s
+        return signer
+
+    def _ensure_refresh_task(self) -> asyncio.Task:
+        # 同一时间只有一个刷新任务，并发的签名请求共享它的结果
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def get_signer(self) -> BilibiliSign:
+        """
+        获取当前可用的签名器
+        :return:
+        """
+        if self._signer is None:
+            return await asyncio.shield(self._ensure_refresh_task())
+        if time.monotonic() >= self._expires_at:
+            self._ensure_refresh_task()
+        return self._signer
+
+    async def sign(self, req_data: Dict) -> Dict:
+        """
+        对请求参数进行 wbi 签名
+        :param req_data:
+        :return:
+        """
+        return (await self.get_signer()).sign(req_data)
+
+    def invalidate(self):
+        """
+        作废缓存的 key，在接口返回风控错误码时调用
+        :return:
+        """
+        if self._signer is not None:
+            utils.logger.info("[WbiKeyManager.invalidate] wbi keys invalidated, fetch new keys on next sign")
+        self._signer = None
+        self._expires_at = 0.0
+
+
+# B站搜索接口对任意查询最多返回 1000 条结果（50 页）
+BILI_SEARCH_RESULT_CAP = 1000
+
+
+async def split_search_windows(
+        probe: Callable[[int, int], Awaitable[Dict]],
+        pubtime_begin_s: int,
+        pubtime_end_s: int,
+        result_cap: int = BILI_SEARCH_RESULT_CAP,
+        min_window_s: int = 60,
+        probe_retry_times: int = 3,
+        probe_retry_wait_s: float = 1.0,
+) -> AsyncIterator[Tuple[int, int, Dict]]:
+    """
+    自适应切分搜索的发布时间窗口，按时间先后产出 (窗口开始时间戳, 窗口结束时间戳, 该窗口第一页的搜索结果)
+    从整个时间范围开始探测第一页的 numResults：
+    - 结果为空的窗口直接跳过
+    - 达到 result_cap 的窗口对半拆分后继续探测，直到不超限或窗口短于 min_window_s
+    - 其余窗口原样产出，稀疏的时间段始终保持为一个大窗口，不会被切成多个空请求
+    产出的第一页结果可以直接作为该窗口的第 1 页使用，无需重复请求
+    :param probe: 请求某个时间窗口第一页的协程函数，参数为 (pubtime_begin_s, pubtime_end_s)
+    :param pubtime_begin_s: 发布时间开始时间戳
+    :param pubtime_end_s: 发布时间结束时间戳
+    :param result_cap: 单次查询可获取的结果上限
+    :param min_window_s: 最小窗口长度（秒），低于该长度不再拆分
+    :param probe_retry_times: 探测失败时的最大尝试次数，仍然失败则抛出异常，不会静默丢掉整个时间窗口
+    :param probe_retry_wait_s: 重试间隔（秒），按尝试次数递增
+    :return:
+    """
+    pending = [(pubtime_begin_s, pubtime_end_s)]
+    while pending:
+        begin_s, end_s = pending.pop()
+        attempt = 1
+        while True:
+            try:
+                first_page = await probe(begin_s, end_s)
+                break
+            except Exception as e:
+                if attempt >= probe_retry_times:
+                    utils.logger.error(
+                        f"[split_search_windows] probe window {begin_s}-{end_s} failed after {attempt} attempts: {e}")
+                    raise
+                utils.logger.warning(
+                    f"[split_search_windows] probe window {begin_s}-{end_s} failed, "
+                    f"retry {attempt}/{probe_retry_times - 1}: {e}")
+                await asyncio.sleep(probe_retry_wait_s * attempt)
+                attempt += 1
+        num_results = int(first_page.get("numResults") or 0)
+        if not num_results or not first_page.get("result"):
+            utils.logger.info(f"[split_search_windows] window {begin_s}-{end_s} is empty, skip")
+            continue
+        if num_results >= result_cap:
+            if end_s - begin_s > min_window_s:
+                mid_s = (begin_s + end_s) // 2
+                utils.logger.info(
+                    f"[split_search_windows] window {begin_s}-{end_s} hits the {result_cap} results cap, split at {mid_s}")
+                # 后入先出，先处理较早的一半，保证按时间顺序产出
+                pending.append((mid_s + 1, end_s))
+                pending.append((begin_s, mid_s))
+                continue
+            utils.logger.warning(
+                f"[split_search_windows] window {begin_s}-{end_s} still hits the cap but can not be split any more, "
+                f"results will be truncated")
+        yield begin_s, end_s, first_page
+
+
 if __name__ == '__main__':
     _img_key = "7cd084941338484aae1ad9425b84077c"
     _sub_key = "4932caff0ff746eab6f01bf08b70ac45"
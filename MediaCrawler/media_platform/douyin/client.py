@@ -15,9 +15,9 @@ import json
 import urllib.parse
 from typing import Any, Callable, Dict, Optional
 
-import requests
 from playwright.async_api import BrowserContext
 
+import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
 from var import request_keyword_var
@@ -43,63 +43,40 @@ class DOUYINClient(AbstractApiClient):
         self._host = "https://www.douyin.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self.param_context = DouyinParamContext(playwright_page, config.DY_MS_TOKEN_TTL_SEC)
 
     async def __process_req_params(
             self, uri: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
             request_method="GET"
-    ):
-
+    ) -> str:
+        """
+        拼接公共参数并计算 a_bogus，公共参数与 msToken 由 param_context 缓存
+        Returns: GET 请求的查询字符串，POST 请求时直接在 params 上补充参数
+        """
         if not params:
-            return
+            return ""
         headers = headers or self.headers
-        local_storage: Dict = await self.playwright_page.evaluate("() => window.localStorage")  # type: ignore
-        common_params = {
-            "device_platform": "webapp",
-            "aid": "6383",
-            "channel": "channel_pc_web",
-            "version_code": "190600",
-            "version_name": "19.6.0",
-            "update_version_code": "170400",
-            "pc_client_type": "1",
-            "cookie_enabled": "true",
-            "browser_language": "zh-CN",
-            "browser_platform": "MacIntel",
-            "browser_name": "Chrome",
-            "browser_version": "125.0.0.0",
-            "browser_online": "true",
-            "engine_name": "Blink",
-            "os_name": "Mac OS",
-            "os_version": "10.15.7",
-            "cpu_core_num": "8",
-            "device_memory": "8",
-            "engine_version": "109.0",
-            "platform": "PC",
-            "screen_width": "2560",
-            "screen_height": "1440",
-            'effective_type': '4g',
-            "round_trip_time": "50",
-            "webid": get_web_id(),
-            "msToken": local_storage.get("xmst"),
-        }
-        params.update(common_params)
-        query_string = urllib.parse.urlencode(params)
-
         # 20240927 a-bogus更新（JS版本）
         post_data = {}
         if request_method == "POST":
-            post_data = params
+            post_data = await self.param_context.build_params(params)
+            query_string = urllib.parse.urlencode(post_data)
+        else:
+            query_string = await self.param_context.build_query(params)
         a_bogus = await get_a_bogus(uri, query_string, post_data, headers["User-Agent"], self.playwright_page)
-        params["a_bogus"] = a_bogus
+        if request_method == "POST":
+            params["a_bogus"] = a_bogus
+        return f"{query_string}&{urllib.parse.urlencode({'a_bogus': a_bogus})}"
 
     async def request(self, method, url, **kwargs):
-        response = None
-        if method == "GET":
-            response = requests.request(method, url, **kwargs)
-        elif method == "POST":
-            response = requests.request(method, url, **kwargs)
+        await self.acquire_rate_limit(url)
+        response = await self.send_request(method, url, proxies=self.proxies, timeout=self.timeout, **kwargs)
+        self.report_rate_limit(url, response.status_code, throttled=response.text == "blocked")
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
+                # 可能是 msToken 失效，下一次请求重新读取
+                self.param_context.invalidate()
                 raise Exception("account blocked")
             return response.json()
         except Exception as e:
@@ -109,12 +86,13 @@ class DOUYINClient(AbstractApiClient):
         """
         GET请求
         """
-        await self.__process_req_params(uri, params, headers)
+        query_string = await self.__process_req_params(uri, params, headers)
         headers = headers or self.headers
-        return await self.request(method="GET", url=f"{self._host}{uri}", params=params, headers=headers)
+        url = f"{self._host}{uri}?{query_string}" if query_string else f"{self._host}{uri}"
+        return await self.request(method="GET", url=url, headers=headers)
 
     async def post(self, uri: str, data: dict, headers: Optional[Dict] = None):
-        await self.__process_req_params(uri, data, headers)
+        await self.__process_req_params(uri, data, headers, request_method="POST")
         headers = headers or self.headers
         return await self.request(method="POST", url=f"{self._host}{uri}", data=data, headers=headers)
 
@@ -11,7 +11,6 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -21,8 +20,12 @@ from playwright.async_api import (BrowserContext, BrowserType, Page,
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import create_proxy_rotator
 from store import douyin as douyin_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
+from tools.account_pool import create_account_pool
+from tools.js_sign_pool import close_sign_pools
 from var import crawler_type_var, source_keyword_var
 
 from .client import DOUYINClient
@@ -40,10 +43,11 @@ class DouYinCrawler(AbstractCrawler):
         self.index_url = "https://www.douyin.com"
 
     async def start(self) -> None:
-        playwright_proxy_format, httpx_proxy_format = None, None
+        playwright_proxy_format, httpx_proxy_format, proxy_rotator = None, None, None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
@@ -61,6 +65,7 @@ class DouYinCrawler(AbstractCrawler):
             await self.context_page.goto(self.index_url)
 
             self.dy_client = await self.create_douyin_client(httpx_proxy_format)
+            self.dy_client.proxy_rotator = proxy_rotator
             if not await self.dy_client.pong(browser_context=self.browser_context):
                 login_obj = DouYinLogin(
                     login_type=config.LOGIN_TYPE,
@@ -71,6 +76,11 @@ class DouYinCrawler(AbstractCrawler):
                 )
                 await login_obj.begin()
                 await self.dy_client.update_cookies(browser_context=self.browser_context)
+            # 配置了多个账号时，并发任务分摊到各个账号上
+            cookie_str, _ = utils.convert_cookies(await self.browser_context.cookies())
+            # 抖音的 pong 检查的是浏览器的登录态，无法按账号检查，跳过
+            self.dy_client.account_pool = await create_account_pool(
+                cookie_str, None, chromium, None)
             crawler_type_var.set(config.CRAWLER_TYPE)
             if config.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
@@ -83,6 +93,7 @@ class DouYinCrawler(AbstractCrawler):
                 await self.get_creators_and_videos()
 
             utils.logger.info("[DouYinCrawler.start] Douyin Crawler finished ...")
+            await self.close()
 
     async def search(self) -> None:
         utils.logger.info("[DouYinCrawler.search] Begin search douyin keywords")
@@ -130,6 +141,8 @@ class DouYinCrawler(AbstractCrawler):
                     aweme_list.append(aweme_info.get("aweme_id", ""))
                     await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
             utils.logger.info(f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}")
+            if aweme_list:
+                mark_target_crawled(keyword)
             await self.batch_get_note_comments(aweme_list)
 
     async def get_specified_awemes(self):
@@ -139,9 +152,10 @@ class DouYinCrawler(AbstractCrawler):
             self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore) for aweme_id in config.DY_SPECIFIED_ID_LIST
         ]
         aweme_details = await asyncio.gather(*task_list)
-        for aweme_detail in aweme_details:
+        for aweme_id, aweme_detail in zip(config.DY_SPECIFIED_ID_LIST, aweme_details):
             if aweme_detail is not None:
                 await douyin_store.update_douyin_aweme(aweme_detail)
+                mark_target_crawled(aweme_id)
         await self.batch_get_note_comments(config.DY_SPECIFIED_ID_LIST)
 
     async def get_aweme_detail(self, aweme_id: str, semaphore: asyncio.Semaphore) -> Any:
@@ -180,7 +194,7 @@ class DouYinCrawler(AbstractCrawler):
                 # 将关键词列表传递给 get_aweme_all_comments 方法
                 await self.dy_client.get_aweme_all_comments(
                     aweme_id=aweme_id,
-                    crawl_interval=random.random(),
+                    crawl_interval=0,
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=douyin_store.batch_update_dy_aweme_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
@@ -206,6 +220,9 @@ class DouYinCrawler(AbstractCrawler):
                 callback=self.fetch_creator_video_detail
             )
 
+            if creator_info or all_video_list:
+                mark_target_crawled(user_id)
+
             video_ids = [video_item.get("aweme_id") for video_item in all_video_list]
             await self.batch_get_note_comments(video_ids)
 
@@ -284,5 +301,7 @@ class DouYinCrawler(AbstractCrawler):
 
     async def close(self) -> None:
         """Close browser context"""
+        await self.dy_client.close()
+        await close_sign_pools()
         await self.browser_context.close()
         utils.logger.info("[DouYinCrawler.close] Browser context closed ...")
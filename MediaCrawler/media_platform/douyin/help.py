@@ -15,12 +15,17 @@
 # @Time    : 2024/6/10 02:24
 # @Desc    : 获取 a_bogus 参数, 学习交流使用，请勿用作商业用途，侵权联系作者删除
 
+import asyncio
 import random
+import time
+import urllib.parse
+from typing import Dict, Optional
 
-import execjs
 from playwright.async_api import Page
 
-douyin_sign_obj = execjs.compile(open('libs/douyin.js', encoding='utf-8-sig').read())
+from tools.js_sign_pool import get_sign_pool
+
+DOUYIN_SIGN_JS = "libs/douyin.js"
 
 def get_web_id():
     """
@@ -44,15 +49,101 @@ def get_web_id():
 
 
 
+class DouyinParamContext:
+    def __init__(self, playwright_page: Page, ms_token_ttl_s: float):
+        """
+        一次会话内的公共请求参数：静态参数和 webid 只生成一次并预先编码成查询字符串，
+        msToken 从 localStorage 的 xmst 读取后缓存，过期或被服务端拒绝时重新读取
+        :param playwright_page: 打开抖音页面的 playwright page
+        :param ms_token_ttl_s: msToken 的缓存时间（秒）
+        """
+        self.playwright_page = playwright_page
+        self.ms_token_ttl_s = ms_token_ttl_s
+        self.common_params = {
+            "device_platform": "webapp",
+            "aid": "6383",
+            "channel": "channel_pc_web",
+            "version_code": "190600",
+            "version_name": "19.6.0",
+            "update_version_code": "170400",
+            "pc_client_type": "1",
+            "cookie_enabled": "true",
+            "browser_language": "zh-CN",
+            "browser_platform": "MacIntel",
+            "browser_name": "Chrome",
+            "browser_version": "125.0.0.0",
+            "browser_online": "true",
+            "engine_name": "Blink",
+            "os_name": "Mac OS",
+            "os_version": "10.15.7",
+            "cpu_core_num": "8",
+            "device_memory": "8",
+            "engine_version": "109.0",
+            "platform": "PC",
+            "screen_width": "2560",
+            "screen_height": "1440",
+            'effective_type': '4g',
+            "round_trip_time": "50",
+            "webid": get_web_id(),
+        }
+        self.common_query = urllib.parse.urlencode(self.common_params)
+        self._ms_token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get_ms_token(self) -> str:
+        if time.monotonic() < self._expires_at:
+            return self._ms_token
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # 等锁期间可能已经被其他请求刷新过
+            if time.monotonic() >= self._expires_at:
+                local_storage: Dict = await self.playwright_page.evaluate("() => window.localStorage")
+                self._ms_token = local_storage.get("xmst") or ""
+                self._expires_at = time.monotonic() + self.ms_token_ttl_s
+        return self._ms_token
+
+    def invalidate(self):
+        """
+        服务端拒绝请求时调用，下一次请求重新读取 msToken
+        :return:
+        """
+        self._expires_at = 0.0
+
+    async def build_query(self, params: Dict) -> str:
+        """
+        拼接请求参数、公共参数和 msToken，与公共参数重名的请求参数以公共参数为准
+        :param params: 接口自身的请求参数
+        :return: 编码后的查询字符串
+        """
+        own_params = {k: v for k, v in params.items() if k not in self.common_params}
+        ms_token = urllib.parse.urlencode({"msToken": await self.get_ms_token()})
+        if not own_params:
+            return f"{self.common_query}&{ms_token}"
+        return f"{urllib.parse.urlencode(own_params)}&{self.common_query}&{ms_token}"
+
+    async def build_params(self, params: Dict) -> Dict:
+        """
+        POST 请求使用的参数字典
+        :param params: 接口自身的请求参数
+        :return:
+        """
+        params.update(self.common_params)
+        params["msToken"] = await self.get_ms_token()
+        return params
+
+
+
 async def get_a_bogus(url: str, params: str, post_data: dict, user_agent: str, page: Page = None):
     """
     获取 a_bogus 参数, 目前不支持post请求类型的签名
     """
-    return get_a_bogus_from_js(url, params, user_agent)
+    return await get_a_bogus_from_js(url, params, user_agent)
 
-def get_a_bogus_from_js(url: str, params: str, user_agent: str):
+async def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     """
-    通过js获取 a_bogus 参数
+    通过js获取 a_bogus 参数，由常驻的 node 签名进程计算
     Args:
         url:
         params:
@@ -64,7 +155,7 @@ def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     sign_js_name = "sign_datail"
     if "/reply" in url:
         sign_js_name = "sign_reply"
-    return douyin_sign_obj.call(sign_js_name, params, user_agent)
+    return await get_sign_pool(DOUYIN_SIGN_JS).call(sign_js_name, params, user_agent)
 
 
 
@@ -11,7 +11,6 @@
 
 import asyncio
 import os
-import random
 import time
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
@@ -21,8 +20,11 @@ from playwright.async_api import BrowserContext, BrowserType, Page, async_playwr
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import create_proxy_rotator
 from store import kuaishou as kuaishou_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
+from tools.account_pool import create_account_pool
 from var import comment_tasks_var, crawler_type_var, source_keyword_var
 
 from .client import KuaiShouClient
@@ -40,12 +42,13 @@ class KuaishouCrawler(AbstractCrawler):
         self.user_agent = utils.get_user_agent()
 
     async def start(self):
-        playwright_proxy_format, httpx_proxy_format = None, None
+        playwright_proxy_format, httpx_proxy_format, proxy_rotator = None, None, None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -63,6 +66,7 @@ class KuaishouCrawler(AbstractCrawler):
 
             # Create a client to interact with the kuaishou website.
             self.ks_client = await self.create_ks_client(httpx_proxy_format)
+            self.ks_client.proxy_rotator = proxy_rotator
             if not await self.ks_client.pong():
                 login_obj = KuaishouLogin(
                     login_type=config.LOGIN_TYPE,
@@ -76,6 +80,10 @@ class KuaishouCrawler(AbstractCrawler):
                     browser_context=self.browser_context
                 )
 
+            # 配置了多个账号时，并发任务分摊到各个账号上
+            cookie_str, _ = utils.convert_cookies(await self.browser_context.cookies())
+            self.ks_client.account_pool = await create_account_pool(
+                cookie_str, self.ks_client.pong, chromium, self.user_agent)
             crawler_type_var.set(config.CRAWLER_TYPE)
             if config.CRAWLER_TYPE == "search":
                 # Search for videos and retrieve their comment information.
@@ -90,6 +98,7 @@ class KuaishouCrawler(AbstractCrawler):
                 pass
 
             utils.logger.info("[KuaishouCrawler.start] Kuaishou Crawler finished ...")
+            await self.close()
 
     async def search(self):
         utils.logger.info("[KuaishouCrawler.search] Begin search kuaishou keywords")
@@ -136,6 +145,7 @@ class KuaishouCrawler(AbstractCrawler):
                 for video_detail in vision_search_photo.get("feeds"):
                     video_id_list.append(video_detail.get("photo", {}).get("id"))
                     await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+                    mark_target_crawled(keyword)
 
                 # batch fetch video comments
                 page += 1
@@ -149,9 +159,10 @@ class KuaishouCrawler(AbstractCrawler):
             for video_id in config.KS_SPECIFIED_ID_LIST
         ]
         video_details = await asyncio.gather(*task_list)
-        for video_detail in video_details:
+        for video_id, video_detail in zip(config.KS_SPECIFIED_ID_LIST, video_details):
             if video_detail is not None:
                 await kuaishou_store.update_kuaishou_video(video_detail)
+                mark_target_crawled(video_id)
         await self.batch_get_video_comments(config.KS_SPECIFIED_ID_LIST)
 
     async def get_video_info_task(
@@ -216,7 +227,7 @@ class KuaishouCrawler(AbstractCrawler):
                 )
                 await self.ks_client.get_video_all_comments(
                     photo_id=video_id,
-                    crawl_interval=random.random(),
+                    crawl_interval=0,
                     callback=kuaishou_store.batch_update_ks_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
@@ -321,10 +332,13 @@ class KuaishouCrawler(AbstractCrawler):
             # Get all video information of the creator
             all_video_list = await self.ks_client.get_all_videos_by_creator(
                 user_id=user_id,
-                crawl_interval=random.random(),
+                crawl_interval=0,
                 callback=self.fetch_creator_video_detail,
             )
 
+            if createor_info or all_video_list:
+                mark_target_crawled(user_id)
+
             video_ids = [
                 video_item.get("photo", {}).get("id") for video_item in all_video_list
             ]
@@ -347,5 +361,6 @@ class KuaishouCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        await self.ks_client.close()
         await self.browser_context.close()
         utils.logger.info("[KuaishouCrawler.close] Browser context closed ...")
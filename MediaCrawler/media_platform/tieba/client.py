@@ -14,14 +14,12 @@ import json
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext
 from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
 
 import config
 from base.base_crawler import AbstractApiClient
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
-from proxy.proxy_ip_pool import ProxyIpPool
 from tools import utils
 
 from .field import SearchNoteType, SearchSortType
@@ -32,10 +30,11 @@ class BaiduTieBaClient(AbstractApiClient):
     def __init__(
             self,
             timeout=10,
-            ip_pool=None,
             default_ip_proxy=None,
+            proxy_rotator=None,
     ):
-        self.ip_pool: Optional[ProxyIpPool] = ip_pool
+        # 开启代理时由轮换器为每个请求分配代理，被封禁时自动换代理重发
+        self.proxy_rotator = proxy_rotator
         self.timeout = timeout
         self.headers = {
             "User-Agent": utils.get_user_agent(),
@@ -60,11 +59,12 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         actual_proxies = proxies if proxies else self.default_ip_proxy
-        async with httpx.AsyncClient(proxies=actual_proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                headers=self.headers, **kwargs
-            )
+        await self.acquire_rate_limit(url)
+        response = await self.send_request(
+            method, url, proxies=actual_proxies, timeout=self.timeout,
+            headers=self.headers, **kwargs
+        )
+        self.report_rate_limit(url, response.status_code, throttled=response.text == "blocked")
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -101,16 +101,6 @@ class BaiduTieBaClient(AbstractApiClient):
                                      **kwargs)
             return res
         except RetryError as e:
-            if self.ip_pool:
-                proxie_model = await self.ip_pool.get_proxy()
-                _, proxies = utils.format_proxy_info(proxie_model)
-                res = await self.request(method="GET", url=f"{self._host}{final_uri}",
-                                         return_ori_content=return_ori_content,
-                                         proxies=proxies,
-                                         **kwargs)
-                self.default_ip_proxy = proxies
-                return res
-
             utils.logger.error(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
             raise Exception(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
 
@@ -11,7 +11,6 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
@@ -22,7 +21,9 @@ import config
 from base.base_crawler import AbstractCrawler
 from model.m_baidu_tieba import TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import create_proxy_rotator
 from store import tieba as tieba_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
 from tools.crawler_util import format_proxy_info
 from var import crawler_type_var, source_keyword_var
@@ -49,18 +50,19 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        ip_proxy_pool, httpx_proxy_format = None, None
+        httpx_proxy_format, proxy_rotator = None, None
         if config.ENABLE_IP_PROXY:
             utils.logger.info("[BaiduTieBaCrawler.start] Begin create ip proxy pool ...")
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             _, httpx_proxy_format = format_proxy_info(ip_proxy_info)
             utils.logger.info(f"[BaiduTieBaCrawler.start] Init default ip proxy, value: {httpx_proxy_format}")
 
         # Create a client to interact with the baidutieba website.
         self.tieba_client = BaiduTieBaClient(
-            ip_pool=ip_proxy_pool,
             default_ip_proxy=httpx_proxy_format,
+            proxy_rotator=proxy_rotator,
         )
         crawler_type_var.set(config.CRAWLER_TYPE)
         if config.CRAWLER_TYPE == "search":
@@ -69,7 +71,8 @@ class TieBaCrawler(AbstractCrawler):
             await self.get_specified_tieba_notes()
         elif config.CRAWLER_TYPE == "detail":
             # Get the information and comments of the specified post
-            await self.get_specified_notes()
+            # 默认参数在导入时绑定，队列 worker 会在运行时替换配置项，这里显式传入
+            await self.get_specified_notes(config.TIEBA_SPECIFIED_ID_LIST)
         elif config.CRAWLER_TYPE == "creator":
             # Get creator's information and their notes and comments
             await self.get_creators_and_notes()
@@ -77,6 +80,7 @@ class TieBaCrawler(AbstractCrawler):
             pass
 
         utils.logger.info("[BaiduTieBaCrawler.start] Tieba Crawler finished ...")
+        await self.close()
 
     async def search(self) -> None:
         """
@@ -111,7 +115,8 @@ class TieBaCrawler(AbstractCrawler):
                         utils.logger.info(f"[BaiduTieBaCrawler.search] Search note list is empty")
                         break
                     utils.logger.info(f"[BaiduTieBaCrawler.search] Note list len: {len(notes_list)}")
-                    await self.get_specified_notes(note_id_list=[note_detail.note_id for note_detail in notes_list])
+                    if await self.get_specified_notes(note_id_list=[note_detail.note_id for note_detail in notes_list]):
+                        mark_target_crawled(keyword)
                     page += 1
                 except Exception as ex:
                     utils.logger.error(
@@ -146,13 +151,13 @@ class TieBaCrawler(AbstractCrawler):
                 await self.get_specified_notes([note.note_id for note in note_list])
                 page_number += tieba_limit_count
 
-    async def get_specified_notes(self, note_id_list: List[str] = config.TIEBA_SPECIFIED_ID_LIST):
+    async def get_specified_notes(self, note_id_list: List[str] = config.TIEBA_SPECIFIED_ID_LIST) -> int:
         """
         Get the information and comments of the specified post
         Args:
             note_id_list:
 
-        Returns:
+        Returns: the number of stored notes
 
         """
         semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
@@ -161,11 +166,13 @@ class TieBaCrawler(AbstractCrawler):
         ]
         note_details = await asyncio.gather(*task_list)
         note_details_model: List[TiebaNote] = []
-        for note_detail in note_details:
+        for note_id, note_detail in zip(note_id_list, note_details):
             if note_detail is not None:
                 note_details_model.append(note_detail)
                 await tieba_store.update_tieba_note(note_detail)
+                mark_target_crawled(note_id)
         await self.batch_get_note_comments(note_details_model)
+        return len(note_details_model)
 
     async def get_note_detail_async_task(self, note_id: str, semaphore: asyncio.Semaphore) -> Optional[TiebaNote]:
         """
@@ -227,7 +234,7 @@ class TieBaCrawler(AbstractCrawler):
             utils.logger.info(f"[BaiduTieBaCrawler.get_comments] Begin get note id comments {note_detail.note_id}")
             await self.tieba_client.get_note_all_comments(
                 note_detail=note_detail,
-                crawl_interval=random.random(),
+                crawl_interval=0,
                 callback=tieba_store.batch_update_tieba_note_comments,
                 max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
             )
@@ -248,6 +255,7 @@ class TieBaCrawler(AbstractCrawler):
                     raise Exception("Get creator info error")
 
                 await tieba_store.save_creator(user_info=creator_info)
+                mark_target_crawled(creator_url)
 
                 # Get all note information of the creator
                 all_notes_list = await self.tieba_client.get_all_notes_by_creator_user_name(
@@ -307,9 +315,12 @@ class TieBaCrawler(AbstractCrawler):
 
     async def close(self):
         """
-        Close browser context
+        Close api client and browser context
         Returns:
 
         """
-        await self.browser_context.close()
-        utils.logger.info("[BaiduTieBaCrawler.close] Browser context closed ...")
+        await self.tieba_client.close()
+        # 贴吧直接走 HTTP 接口，没有启动浏览器时不需要关闭
+        if getattr(self, "browser_context", None):
+            await self.browser_context.close()
+            utils.logger.info("[BaiduTieBaCrawler.close] Browser context closed ...")
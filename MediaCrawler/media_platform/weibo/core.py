@@ -17,7 +17,6 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
@@ -27,8 +26,11 @@ from playwright.async_api import (BrowserContext, BrowserType, Page,
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import create_proxy_rotator
 from store import weibo as weibo_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
+from tools.account_pool import create_account_pool
 from var import crawler_type_var, source_keyword_var
 
 from .client import WeiboClient
@@ -50,10 +52,11 @@ class WeiboCrawler(AbstractCrawler):
         self.mobile_user_agent = utils.get_mobile_user_agent()
 
     async def start(self):
-        playwright_proxy_format, httpx_proxy_format = None, None
+        playwright_proxy_format, httpx_proxy_format, proxy_rotator = None, None, None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
@@ -72,6 +75,7 @@ class WeiboCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.wb_client = await self.create_weibo_client(httpx_proxy_format)
+            self.wb_client.proxy_rotator = proxy_rotator
             if not await self.wb_client.pong():
                 login_obj = WeiboLogin(
                     login_type=config.LOGIN_TYPE,
@@ -88,6 +92,10 @@ class WeiboCrawler(AbstractCrawler):
                 await asyncio.sleep(2)
                 await self.wb_client.update_cookies(browser_context=self.browser_context)
 
+            # 配置了多个账号时，并发任务分摊到各个账号上
+            cookie_str, _ = utils.convert_cookies(await self.browser_context.cookies())
+            self.wb_client.account_pool = await create_account_pool(
+                cookie_str, self.wb_client.pong, chromium, self.user_agent)
             crawler_type_var.set(config.CRAWLER_TYPE)
             if config.CRAWLER_TYPE == "search":
                 # Search for video and retrieve their comment information.
@@ -101,6 +109,7 @@ class WeiboCrawler(AbstractCrawler):
             else:
                 pass
             utils.logger.info("[WeiboCrawler.start] Weibo Crawler finished ...")
+            await self.close()
 
     async def search(self):
         """
@@ -136,6 +145,7 @@ class WeiboCrawler(AbstractCrawler):
                             note_id_list.append(mblog.get("id"))
                             await weibo_store.update_weibo_note(note_item)
                             await self.get_note_images(mblog)
+                            mark_target_crawled(keyword)
 
                 page += 1
                 await self.batch_get_notes_comments(note_id_list)
@@ -151,9 +161,10 @@ class WeiboCrawler(AbstractCrawler):
             config.WEIBO_SPECIFIED_ID_LIST
         ]
         video_details = await asyncio.gather(*task_list)
-        for note_item in video_details:
+        for note_id, note_item in zip(config.WEIBO_SPECIFIED_ID_LIST, video_details):
             if note_item:
                 await weibo_store.update_weibo_note(note_item)
+                mark_target_crawled(note_id)
         await self.batch_get_notes_comments(config.WEIBO_SPECIFIED_ID_LIST)
 
     async def get_note_info_task(self, note_id: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
@@ -205,7 +216,7 @@ class WeiboCrawler(AbstractCrawler):
                 utils.logger.info(f"[WeiboCrawler.get_note_comments] begin get note_id: {note_id} comments ...")
                 await self.wb_client.get_note_all_comments(
                     note_id=note_id,
-                    crawl_interval=random.randint(1,3), # 微博对API的限流比较严重，所以延时提高一些
+                    crawl_interval=0,  # 微博对API的限流比较严重，速率见 RATE_LIMIT_RATES["m.weibo.cn"]
                     callback=weibo_store.batch_update_weibo_note_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
                 )
@@ -252,6 +263,7 @@ class WeiboCrawler(AbstractCrawler):
                 if not createor_info:
                     raise DataFetchError("Get creator info error")
                 await weibo_store.save_creator(user_id, user_info=createor_info)
+                mark_target_crawled(user_id)
 
                 # Get all note information of the creator
                 all_notes_list = await self.wb_client.get_all_notes_by_creator_id(
@@ -330,3 +342,9 @@ class WeiboCrawler(AbstractCrawler):
                 user_agent=user_agent
             )
             return browser_context
+
+    async def close(self):
+        """Close api client and browser context"""
+        await self.wb_client.close()
+        await self.browser_context.close()
+        utils.logger.info("[WeiboCrawler.close] Browser context closed ...")
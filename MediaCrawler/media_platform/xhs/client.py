@@ -15,7 +15,6 @@ import re
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_result
 
@@ -26,7 +25,7 @@ from html import unescape
 
 from .exception import DataFetchError, IPBlockError
 from .field import SearchNoteType, SearchSortType
-from .help import get_search_id, sign
+from .help import XhsSignPagePool, get_search_id, sign
 
 
 class XiaoHongShuClient(AbstractApiClient):
@@ -38,6 +37,7 @@ class XiaoHongShuClient(AbstractApiClient):
         headers: Dict[str, str],
         playwright_page: Page,
         cookie_dict: Dict[str, str],
+        sign_page_pool: Optional[XhsSignPagePool] = None,
     ):
         self.proxies = proxies
         self.timeout = timeout
@@ -50,6 +50,8 @@ class XiaoHongShuClient(AbstractApiClient):
         self.NOTE_ABNORMAL_CODE = -510001
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        # 没有传入签名页面池时退化为只用 playwright_page 一个页面签名
+        self.sign_page_pool = sign_page_pool or XhsSignPagePool([playwright_page])
 
     async def _pre_headers(self, url: str, data=None) -> Dict:
         """
@@ -61,13 +63,10 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        encrypt_params = await self.playwright_page.evaluate(
-            "([url, data]) => window._webmsxyw(url,data)", [url, data]
-        )
-        local_storage = await self.playwright_page.evaluate("() => window.localStorage")
+        encrypt_params = await self.sign_page_pool.sign(url, data)
         signs = sign(
-            a1=self.cookie_dict.get("a1", ""),
-            b1=local_storage.get("b1", ""),
+            a1=self.get_cookie_dict().get("a1", ""),
+            b1=await self.sign_page_pool.get_b1(),
             x_s=encrypt_params.get("X-s", ""),
             x_t=str(encrypt_params.get("X-t", "")),
         )
@@ -78,8 +77,24 @@ class XiaoHongShuClient(AbstractApiClient):
             "x-S-Common": signs["x-s-common"],
             "X-B3-Traceid": signs["x-b3-traceid"],
         }
-        self.headers.update(headers)
-        return self.headers
+        # 并发请求各自签名，返回副本，避免互相覆盖签名头
+        return {**self.headers, **headers}
+
+    def is_blocked_response(self, response) -> bool:
+        """
+        除了 461/471 验证码，小红书还会返回 HTTP 200 + 错误码 300012 表示 IP 被封禁
+        :param response:
+        :return:
+        """
+        if super().is_blocked_response(response):
+            return True
+        body = self.get_block_check_body(response)
+        if body is None or str(self.IP_ERROR_CODE).encode() not in body:
+            return False
+        try:
+            return response.json().get("code") == self.IP_ERROR_CODE
+        except ValueError:
+            return False
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
@@ -96,8 +111,9 @@ class XiaoHongShuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop("return_response", False)
 
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        await self.acquire_rate_limit(url)
+        response = await self.send_request(method, url, proxies=self.proxies, timeout=self.timeout, **kwargs)
+        self.report_rate_limit(url, response.status_code)
 
         if response.status_code == 471 or response.status_code == 461:
             # someday someone maybe will bypass captcha
@@ -113,6 +129,7 @@ class XiaoHongShuClient(AbstractApiClient):
         if data["success"]:
             return data.get("data", data.get("success", {}))
         elif data["code"] == self.IP_ERROR_CODE:
+            self.report_rate_limit(url, throttled=True)
             raise IPBlockError(self.IP_ERROR_STR)
         else:
             raise DataFetchError(data.get("msg", None))
@@ -156,15 +173,16 @@ class XiaoHongShuClient(AbstractApiClient):
         )
 
     async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(
-                    f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
-                )
-                return None
-            else:
-                return response.content
+        await self.acquire_rate_limit(url, "media")
+        response = await self.send_request("GET", url, proxies=self.proxies, timeout=self.timeout)
+        self.report_rate_limit(url, response.status_code, endpoint_class="media")
+        if not response.reason_phrase == "OK":
+            utils.logger.error(
+                f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
+            )
+            return None
+        else:
+            return response.content
 
     async def pong(self) -> bool:
         """
@@ -198,6 +216,7 @@ class XiaoHongShuClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        self.sign_page_pool.invalidate_b1()
 
     async def get_note_by_keyword(
         self,
@@ -11,7 +11,6 @@
 
 import asyncio
 import os
-import random
 import time
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
@@ -24,14 +23,17 @@ from base.base_crawler import AbstractCrawler
 from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
 from model.m_xiaohongshu import NoteUrlInfo
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import create_proxy_rotator
 from store import xhs as xhs_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
+from tools.account_pool import create_account_pool
 from var import crawler_type_var, source_keyword_var
 
 from .client import XiaoHongShuClient
 from .exception import DataFetchError
 from .field import SearchSortType
-from .help import parse_note_info_from_note_url, get_search_id
+from .help import XhsSignPagePool, get_search_id, parse_note_info_from_note_url
 from .login import XiaoHongShuLogin
 
 
@@ -46,12 +48,13 @@ class XiaoHongShuCrawler(AbstractCrawler):
         self.user_agent = config.UA if config.UA else "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
 
     async def start(self) -> None:
-        playwright_proxy_format, httpx_proxy_format = None, None
+        playwright_proxy_format, httpx_proxy_format, proxy_rotator = None, None, None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -80,6 +83,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.xhs_client = await self.create_xhs_client(httpx_proxy_format)
+            self.xhs_client.proxy_rotator = proxy_rotator
             if not await self.xhs_client.pong():
                 login_obj = XiaoHongShuLogin(
                     login_type=config.LOGIN_TYPE,
@@ -93,6 +97,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
                     browser_context=self.browser_context
                 )
 
+            # 配置了多个账号时，并发任务分摊到各个账号上
+            cookie_str, _ = utils.convert_cookies(await self.browser_context.cookies())
+            self.xhs_client.account_pool = await create_account_pool(
+                cookie_str, self.xhs_client.pong, chromium, self.user_agent)
             crawler_type_var.set(config.CRAWLER_TYPE)
             if config.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
@@ -107,6 +115,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 pass
 
             utils.logger.info("[XiaoHongShuCrawler.start] Xhs Crawler finished ...")
+            await self.close()
 
     async def search(self) -> None:
         """Search for notes and retrieve their comment information."""
@@ -170,6 +179,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                         if note_detail:
                             await xhs_store.update_xhs_note(note_detail)
                             await self.get_notice_media(note_detail)
+                            mark_target_crawled(keyword)
                             note_ids.append(note_detail.get("note_id"))
                             xsec_tokens.append(note_detail.get("xsec_token"))
                     page += 1
@@ -196,11 +206,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
             if createor_info:
                 await xhs_store.save_creator(user_id, creator=createor_info)
 
-            # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
-            else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
+            # 请求节奏由全局限流器控制，这里不再额外休眠
+            crawl_interval = 0
             # Get all note information of the creator
             all_notes_list = await self.xhs_client.get_all_notes_by_creator(
                 user_id=user_id,
@@ -208,6 +215,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 callback=self.fetch_creator_notes_detail,
             )
 
+            if createor_info or all_notes_list:
+                mark_target_crawled(user_id)
+
             note_ids = []
             xsec_tokens = []
             for note_item in all_notes_list:
@@ -259,8 +269,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
         need_get_comment_note_ids = []
         xsec_tokens = []
         note_details = await asyncio.gather(*get_note_detail_task_list)
-        for note_detail in note_details:
+        for full_note_url, note_detail in zip(config.XHS_SPECIFIED_NOTE_URL_LIST, note_details):
             if note_detail:
+                mark_target_crawled(full_note_url)
                 need_get_comment_note_ids.append(note_detail.get("note_id", ""))
                 xsec_tokens.append(note_detail.get("xsec_token", ""))
                 await xhs_store.update_xhs_note(note_detail)
@@ -286,11 +297,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
         """
         note_detail_from_html, note_detail_from_api = None, None
         async with semaphore:
-            # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
-            else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
+            # 请求节奏由全局限流器控制，这里不再额外休眠
+            crawl_interval = 0
             try:
                 # 尝试直接获取网页版笔记详情，携带cookie
                 note_detail_from_html: Optional[Dict] = (
@@ -366,11 +374,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
             utils.logger.info(
                 f"[XiaoHongShuCrawler.get_comments] Begin get note id comments {note_id}"
             )
-            # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
-            else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
+            # 请求节奏由全局限流器控制，这里不再额外休眠
+            crawl_interval = 0
             await self.xhs_client.get_note_all_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
@@ -413,9 +418,25 @@ class XiaoHongShuCrawler(AbstractCrawler):
             },
             playwright_page=self.context_page,
             cookie_dict=cookie_dict,
+            sign_page_pool=await self.create_sign_page_pool(),
         )
         return xhs_client_obj
 
+    async def create_sign_page_pool(self) -> XhsSignPagePool:
+        """
+        创建签名页面池，除了 context_page 之外再打开 XHS_SIGN_PAGE_POOL_SIZE - 1 个小红书首页
+        页面属于同一个浏览器上下文，共享登录态
+        """
+        pages = [self.context_page]
+        for _ in range(config.XHS_SIGN_PAGE_POOL_SIZE - 1):
+            page = await self.browser_context.new_page()
+            await page.goto(self.index_url)
+            pages.append(page)
+        utils.logger.info(
+            f"[XiaoHongShuCrawler.create_sign_page_pool] Sign page pool size: {len(pages)}"
+        )
+        return XhsSignPagePool(pages)
+
     async def launch_browser(
         self,
         chromium: BrowserType,
@@ -451,6 +472,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        await self.xhs_client.close()
         await self.browser_context.close()
         utils.logger.info("[XiaoHongShuCrawler.close] Browser context closed ...")
 
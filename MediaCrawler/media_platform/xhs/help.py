@@ -9,11 +9,15 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
 
+import asyncio
 import ctypes
 import json
 import random
 import time
 import urllib.parse
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from playwright.async_api import Page
 
 from model.m_xiaohongshu import NoteUrlInfo
 from tools.crawler_util import extract_url_params_to_dict
@@ -306,11 +310,77 @@ def parse_note_info_from_note_url(url: str) -> NoteUrlInfo:
     return NoteUrlInfo(note_id=note_id, xsec_token=xsec_token, xsec_source=xsec_source)
 
 
+class XhsSignPagePool:
+    def __init__(self, pages: List[Page]):
+        """
+        小红书签名页面池：window._webmsxyw 只能在浏览器页面中执行，单个页面会让所有请求排队签名
+        每次签名交给当前负载最小的页面，同一页面上同一轮事件循环内到达的签名请求合并为一次 evaluate
+        :param pages: 已经打开小红书首页的页面，需属于同一个浏览器上下文（共享 cookie 和 localStorage）
+        """
+        self.pages = pages
+        self._loads = [0] * len(pages)
+        self._pending: List[List[Tuple[str, Any, asyncio.Future]]] = [[] for _ in pages]
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._b1: Optional[str] = None
+
+    async def get_b1(self) -> str:
+        """
+        localStorage 中的 b1 是设备指纹，首次读取后缓存
+        :return:
+        """
+        if self._b1 is None:
+            local_storage = await self.pages[0].evaluate("() => window.localStorage")
+            self._b1 = local_storage.get("b1", "")
+        return self._b1
+
+    def invalidate_b1(self):
+        """
+        登录状态变化后重新读取 b1
+        :return:
+        """
+        self._b1 = None
+
+    async def sign(self, url: str, data=None) -> Dict:
+        """
+        调用 window._webmsxyw 计算 X-s/X-t
+        :param url: 请求路径
+        :param data: 请求体
+        :return:
+        """
+        index = min(range(len(self.pages)), key=self._loads.__getitem__)
+        future = asyncio.get_running_loop().create_future()
+        self._loads[index] += 1
+        self._pending[index].append((url, data, future))
+        if len(self._pending[index]) == 1:
+            # 延后到下一轮事件循环再 evaluate，期间到达的签名请求一起提交
+            task = asyncio.create_task(self._flush(index))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        try:
+            return await future
+        finally:
+            self._loads[index] -= 1
+
+    async def _flush(self, index: int):
+        batch, self._pending[index] = self._pending[index], []
+        try:
+            results = await self.pages[index].evaluate(
+                "(items) => Promise.all(items.map(([url, data]) => window._webmsxyw(url, data)))",
+                [[url, data] for url, data, _ in batch],
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
 if __name__ == '__main__':
     _img_url = "https://sns-img-bd.xhscdn.com/7a3abfaf-90c1-a828-5de7-022c80b92aa3"
     # 获取一个图片地址在多个cdn下的url地址
     # final_img_urls = get_img_urls_by_trace_id(get_trace_id(_img_url))
     final_img_url = get_img_url_by_trace_id(get_trace_id(_img_url))
     print(final_img_url)
-
-
@@ -15,7 +15,6 @@ import json
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
-import httpx
 from httpx import Response
 from playwright.async_api import BrowserContext, Page
 from tenacity import retry, stop_after_attempt, wait_fixed
@@ -55,10 +54,13 @@ class ZhiHuClient(AbstractApiClient):
         Returns:
 
         """
-        d_c0 = self.cookie_dict.get("d_c0")
+        d_c0 = self.get_cookie_dict().get("d_c0")
         if not d_c0:
             raise Exception("d_c0 not found in cookies")
-        sign_res = sign(url, self.default_headers["cookie"])
+        # 签名需要和实际发送的 cookie 一致，多账号时 send_request 会换成当前账号的 cookie
+        account = self.current_account()
+        cookie_str = account.cookie_str if account is not None else self.default_headers["cookie"]
+        sign_res = await sign(url, cookie_str)
         headers = self.default_headers.copy()
         headers['x-zst-81'] = sign_res["x-zst-81"]
         headers['x-zse-96'] = sign_res["x-zse-96"]
@@ -79,11 +81,12 @@ class ZhiHuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop('return_response', False)
 
-        async with httpx.AsyncClient(proxies=self.proxies, ) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        await self.acquire_rate_limit(url)
+        response = await self.send_request(
+            method, url, proxies=self.proxies, timeout=self.timeout,
+            **kwargs
+        )
+        self.report_rate_limit(url, response.status_code)
 
         if response.status_code != 200:
             utils.logger.error(f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}")
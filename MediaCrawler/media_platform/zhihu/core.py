@@ -12,7 +12,6 @@
 # -*- coding: utf-8 -*-
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple, cast
 
@@ -24,8 +23,12 @@ from constant import zhihu as constant
 from base.base_crawler import AbstractCrawler
 from model.m_zhihu import ZhihuContent, ZhihuCreator
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotator import create_proxy_rotator
 from store import zhihu as zhihu_store
+from task_queue.worker import mark_target_crawled
 from tools import utils
+from tools.account_pool import create_account_pool
+from tools.js_sign_pool import close_sign_pools
 from var import crawler_type_var, source_keyword_var
 
 from .client import ZhiHuClient
@@ -51,10 +54,11 @@ class ZhihuCrawler(AbstractCrawler):
         Returns:
 
         """
-        playwright_proxy_format, httpx_proxy_format = None, None
+        playwright_proxy_format, httpx_proxy_format, proxy_rotator = None, None, None
         if config.ENABLE_IP_PROXY:
             ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            proxy_rotator = create_proxy_rotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
@@ -74,6 +78,7 @@ class ZhihuCrawler(AbstractCrawler):
 
             # Create a client to interact with the zhihu website.
             self.zhihu_client = await self.create_zhihu_client(httpx_proxy_format)
+            self.zhihu_client.proxy_rotator = proxy_rotator
             if not await self.zhihu_client.pong():
                 login_obj = ZhiHuLogin(
                     login_type=config.LOGIN_TYPE,
@@ -91,6 +96,10 @@ class ZhihuCrawler(AbstractCrawler):
             await asyncio.sleep(5)
             await self.zhihu_client.update_cookies(browser_context=self.browser_context)
 
+            # 配置了多个账号时，并发任务分摊到各个账号上
+            cookie_str, _ = utils.convert_cookies(await self.browser_context.cookies())
+            self.zhihu_client.account_pool = await create_account_pool(
+                cookie_str, self.zhihu_client.pong, chromium, self.user_agent)
             crawler_type_var.set(config.CRAWLER_TYPE)
             if config.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
@@ -105,6 +114,7 @@ class ZhihuCrawler(AbstractCrawler):
                 pass
 
             utils.logger.info("[ZhihuCrawler.start] Zhihu Crawler finished ...")
+            await self.close()
 
     async def search(self) -> None:
         """Search for notes and retrieve their comment information."""
@@ -137,6 +147,7 @@ class ZhihuCrawler(AbstractCrawler):
                     page += 1
                     for content in content_list:
                         await zhihu_store.update_zhihu_content(content)
+                    mark_target_crawled(keyword)
 
                     await self.batch_get_content_comments(content_list)
                 except DataFetchError:
@@ -177,7 +188,7 @@ class ZhihuCrawler(AbstractCrawler):
             utils.logger.info(f"[ZhihuCrawler.get_comments] Begin get note id comments {content_item.content_id}")
             await self.zhihu_client.get_note_all_comments(
                 content=content_item,
-                crawl_interval=random.random(),
+                crawl_interval=0,
                 callback=zhihu_store.batch_update_zhihu_note_comments
             )
 
@@ -199,13 +210,14 @@ class ZhihuCrawler(AbstractCrawler):
 
             utils.logger.info(f"[ZhihuCrawler.get_creators_and_notes] Creator info: {createor_info}")
             await zhihu_store.save_creator(creator=createor_info)
+            mark_target_crawled(user_link)
 
             # 默认只提取回答信息，如果需要文章和视频，把下面的注释打开即可
 
             # Get all anwser information of the creator
             all_content_list = await self.zhihu_client.get_all_anwser_by_creator(
                 creator=createor_info,
-                crawl_interval=random.random(),
+                crawl_interval=0,
                 callback=zhihu_store.batch_update_zhihu_contents
             )
 
@@ -213,14 +225,14 @@ class ZhihuCrawler(AbstractCrawler):
             # Get all articles of the creator's contents
             # all_content_list = await self.zhihu_client.get_all_articles_by_creator(
             #     creator=createor_info,
-            #     crawl_interval=random.random(),
+            #     crawl_interval=0,
             #     callback=zhihu_store.batch_update_zhihu_contents
             # )
 
             # Get all videos of the creator's contents
             # all_content_list = await self.zhihu_client.get_all_videos_by_creator(
             #     creator=createor_info,
-            #     crawl_interval=random.random(),
+            #     crawl_interval=0,
             #     callback=zhihu_store.batch_update_zhihu_contents
             # )
 
@@ -295,6 +307,7 @@ class ZhihuCrawler(AbstractCrawler):
             note_detail = cast(ZhihuContent, note_detail)  # only for type check
             need_get_comment_notes.append(note_detail)
             await zhihu_store.update_zhihu_content(note_detail)
+            mark_target_crawled(config.ZHIHU_SPECIFIED_ID_LIST[index])
 
         await self.batch_get_content_comments(need_get_comment_notes)
 
@@ -367,5 +380,7 @@ class ZhihuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        await self.zhihu_client.close()
+        await close_sign_pools()
         await self.browser_context.close()
         utils.logger.info("[ZhihuCrawler.close] Browser context closed ...")
@@ -16,10 +16,10 @@
 # @Url     : 快代理HTTP实现，官方文档：https://www.kuaidaili.com/?ref=ldwkjqipvz6c
 import json
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 import config
-from cache.abs_cache import AbstractCache
+from cache.abs_cache import AbstractAsyncCache
 from cache.cache_factory import CacheFactory
 from tools.utils import utils
 
@@ -43,10 +43,16 @@ class ProxyProvider(ABC):
 
 
 class IpCache:
-    def __init__(self):
-        self.cache_client: AbstractCache = CacheFactory.create_cache(cache_type=config.CACHE_TYPE_MEMORY)
+    def __init__(self, cache_client: Optional[AbstractAsyncCache] = None):
+        """
+        IP 缓存在代理商的协程中读写，使用异步缓存，不阻塞事件循环
+        :param cache_client: 指定缓存客户端，为空时按配置创建
+        """
+        # key 形如 {代理商}_{ip}_{port}，本地缓存以 _ 作为命名空间分隔符，按代理商前缀查询时不遍历整个缓存
+        self.cache_client: AbstractAsyncCache = cache_client or CacheFactory.create_async_cache(
+            cache_type=config.CACHE_TYPE_MEMORY, namespace_sep="_")
 
-    def set_ip(self, ip_key: str, ip_value_info: str, ex: int):
+    async def set_ip(self, ip_key: str, ip_value_info: str, ex: int):
         """
         设置IP并带有过期时间，到期之后由 redis 负责删除
         :param ip_key:
@@ -54,22 +60,21 @@ class IpCache:
         :param ex:
         :return:
         """
-        self.cache_client.set(key=ip_key, value=ip_value_info, expire_time=ex)
+        await self.cache_client.set(key=ip_key, value=ip_value_info, expire_time=ex)
 
-    def load_all_ip(self, proxy_brand_name: str) -> List[IpInfoModel]:
+    async def load_all_ip(self, proxy_brand_name: str) -> List[IpInfoModel]:
         """
-        从 redis 中加载所有还未过期的 IP 信息
+        从 redis 中加载所有还未过期的 IP 信息，SCAN 出 key 后用一次 MGET 取出所有值
         :param proxy_brand_name: 代理商名称
         :return:
         """
         all_ip_list: List[IpInfoModel] = []
-        all_ip_keys: List[str] = self.cache_client.keys(pattern=f"{proxy_brand_name}_*")
         try:
-            for ip_key in all_ip_keys:
-                ip_value = self.cache_client.get(ip_key)
+            all_ip_keys: List[str] = await self.cache_client.keys(pattern=f"{proxy_brand_name}_*")
+            for ip_value in await self.cache_client.mget(all_ip_keys):
                 if not ip_value:
                     continue
                 all_ip_list.append(IpInfoModel(**json.loads(ip_value)))
         except Exception as e:
-            utils.logger.error("[IpCache.load_all_ip] get ip err from redis db", e)
+            utils.logger.error(f"[IpCache.load_all_ip] get ip err from redis db: {e}")
         return all_ip_list
@@ -12,88 +12,271 @@
 # -*- coding: utf-8 -*-
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 13:45
-# @Desc    : ip代理池实现
+# @Desc    : ip代理池实现：后台并发验证候选代理，按滚动的延迟/成功率给每个代理打分，
+#            按分数挑选代理，被封禁的代理隔离一段时间，可用代理不足时提前补充
+import asyncio
 import random
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional
 
 import httpx
-from tenacity import retry, stop_after_attempt, wait_fixed
 
 import config
 from proxy.providers import new_jisu_http_proxy, new_kuai_daili_proxy
 from tools import utils
 
-from .base_proxy import ProxyProvider
+from .base_proxy import IpGetError, ProxyProvider
 from .types import IpInfoModel, ProviderNameEnum
 
+# 延迟和成功率的滑动平均系数，越大越看重最近的结果
+SCORE_EWMA_ALPHA = 0.3
+# 成功率低于该值的代理直接丢弃
+MIN_SUCCESS_RATE = 0.3
+# 可用代理还有剩余时，两次向提供商补充代理的最小间隔（秒），避免频繁调用提取接口
+REFILL_MIN_INTERVAL_SEC = 5
+# 验证代理的请求超时（秒）
+VALIDATE_TIMEOUT_SEC = 10
+# 代理距离过期不足该秒数时视为已过期，避免请求发出后代理才失效
+PROXY_EXPIRE_MARGIN_SEC = 10
+
+
+def proxy_key(proxy: IpInfoModel) -> str:
+    return f"{proxy.ip}:{proxy.port}"
+
+
+def is_proxy_expired(proxy: IpInfoModel, now: Optional[float] = None) -> bool:
+    """
+    代理是否已过期（含 PROXY_EXPIRE_MARGIN_SEC 的安全余量），expired_time_ts 为空或 0 表示不过期
+    :param proxy: 代理信息
+    :param now: 当前时间戳，默认取 time.time()
+    :return:
+    """
+    if not proxy.expired_time_ts:
+        return False
+    if now is None:
+        now = time.time()
+    return proxy.expired_time_ts - PROXY_EXPIRE_MARGIN_SEC <= now
+
+
+class ProxyStats:
+    def __init__(self, proxy: IpInfoModel, latency: float):
+        """
+        单个代理的健康状态
+        :param proxy: 代理信息
+        :param latency: 验证时测得的延迟（秒）
+        """
+        self.proxy = proxy
+        self.success_rate = 1.0
+        self.latency = latency
+        self.quarantined_until = 0.0
+
+    @property
+    def score(self) -> float:
+        return self.success_rate / (1 + self.latency)
+
+    def update(self, success: bool, latency: Optional[float] = None):
+        self.success_rate += SCORE_EWMA_ALPHA * ((1.0 if success else 0.0) - self.success_rate)
+        if latency is not None:
+            self.latency += SCORE_EWMA_ALPHA * (latency - self.latency)
+
 
 class ProxyIpPool:
     def __init__(self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider) -> None:
         """
 
         Args:
-            ip_pool_count:
-            enable_validate_ip:
+            ip_pool_count: 保持可用的代理数量，低于该数量时在后台补充
+            enable_validate_ip: 代理加入可用列表前是否先验证
             ip_provider:
         """
         self.valid_ip_url = "https://httpbin.org/ip"  # 验证 IP 是否有效的地址
         self.ip_pool_count = ip_pool_count
         self.enable_validate_ip = enable_validate_ip
-        self.proxy_list: List[IpInfoModel] = []
         self.ip_provider: ProxyProvider = ip_provider
+        # 所有已知的代理，包括可用的和隔离中的
+        self._stats: Dict[str, ProxyStats] = {}
+        # 可用代理的 key，配合下标索引做到 O(1) 随机访问和删除
+        self._ready_keys: List[str] = []
+        self._ready_index: Dict[str, int] = {}
+        self._refill_task: Optional[asyncio.Task] = None
+        self._last_refill = 0.0
+
+    @property
+    def proxy_list(self) -> List[IpInfoModel]:
+        """
+        当前可用的代理
+        :return:
+        """
+        return [self._stats[key].proxy for key in self._ready_keys]
 
     async def load_proxies(self) -> None:
         """
-        加载IP代理
+        加载IP代理，并发验证后放入可用列表
         Returns:
 
         """
-        self.proxy_list = await self.ip_provider.get_proxies(self.ip_pool_count)
+        await asyncio.shield(self._schedule_refill())
 
-    async def _is_valid_proxy(self, proxy: IpInfoModel) -> bool:
+    async def _validate_proxy(self, proxy: IpInfoModel) -> Optional[float]:
         """
         验证代理IP是否有效
         :param proxy:
-        :return:
+        :return: 有效时返回请求延迟（秒），无效时返回 None
         """
-        utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} is it valid ")
+        if not self.enable_validate_ip:
+            return 0.0
+        httpx_proxy = {
+            f"{proxy.protocol}": f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
+        }
+        start = time.monotonic()
         try:
-            httpx_proxy = {
-                f"{proxy.protocol}": f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
-            }
-            async with httpx.AsyncClient(proxies=httpx_proxy) as client:
+            async with httpx.AsyncClient(proxies=httpx_proxy, timeout=VALIDATE_TIMEOUT_SEC) as client:
                 response = await client.get(self.valid_ip_url)
-            if response.status_code == 200:
-                return True
-            else:
-                return False
         except Exception as e:
-            utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} err: {e}")
-            raise e
+            utils.logger.info(f"[ProxyIpPool._validate_proxy] testing {proxy.ip} err: {e}")
+            return None
+        if response.status_code != 200:
+            utils.logger.info(f"[ProxyIpPool._validate_proxy] testing {proxy.ip} status: {response.status_code}")
+            return None
+        return time.monotonic() - start
+
+    def _schedule_refill(self) -> asyncio.Task:
+        if self._refill_task is None or self._refill_task.done():
+            self._last_refill = time.monotonic()
+            self._refill_task = asyncio.create_task(self._refill())
+        return self._refill_task
+
+    def _maybe_refill(self):
+        """
+        可用代理低于目标数量时在后台补充，不阻塞调用方
+        :return:
+        """
+        if len(self._ready_keys) >= self.ip_pool_count:
+            return
+        if self._ready_keys and time.monotonic() - self._last_refill < REFILL_MIN_INTERVAL_SEC:
+            return
+        self._schedule_refill()
+
+    async def _refill(self):
+        """
+        重新验证隔离到期的代理，不足的部分向提供商提取，所有候选代理并发验证
+        :return:
+        """
+        try:
+            now = time.time()
+            for key in [key for key, stats in self._stats.items() if is_proxy_expired(stats.proxy, now)]:
+                self._remove(key)
+            candidates: List[IpInfoModel] = [
+                stats.proxy for key, stats in self._stats.items()
+                if key not in self._ready_index and stats.quarantined_until <= now
+            ]
+            need = self.ip_pool_count - len(self._ready_keys) - len(candidates)
+            if need > 0:
+                for proxy in await self.ip_provider.get_proxies(need):
+                    if proxy_key(proxy) not in self._stats and not is_proxy_expired(proxy):
+                        candidates.append(proxy)
+
+            semaphore = asyncio.Semaphore(config.PROXY_VALIDATE_CONCURRENCY)
+
+            async def validate(proxy: IpInfoModel) -> Optional[float]:
+                async with semaphore:
+                    return await self._validate_proxy(proxy)
+
+            latencies = await asyncio.gather(*[validate(proxy) for proxy in candidates])
+            for proxy, latency in zip(candidates, latencies):
+                if latency is None:
+                    self._remove(proxy_key(proxy))
+                else:
+                    self._add_ready(proxy, latency)
+            utils.logger.info(f"[ProxyIpPool._refill] validated {len(candidates)} proxies, "
+                              f"{len(self._ready_keys)} ready")
+        except Exception as e:
+            utils.logger.error(f"[ProxyIpPool._refill] refill proxies err: {e}")
+
+    def _add_ready(self, proxy: IpInfoModel, latency: float):
+        key = proxy_key(proxy)
+        stats = self._stats.get(key)
+        if stats is None:
+            self._stats[key] = ProxyStats(proxy, latency)
+        else:
+            # 隔离到期后重新验证通过
+            stats.quarantined_until = 0.0
+            stats.update(True, latency)
+        if key not in self._ready_index:
+            self._ready_index[key] = len(self._ready_keys)
+            self._ready_keys.append(key)
+
+    def _remove_ready(self, key: str):
+        index = self._ready_index.pop(key, None)
+        if index is None:
+            return
+        # 用最后一个元素填补空位，O(1) 删除
+        last_key = self._ready_keys.pop()
+        if last_key != key:
+            self._ready_keys[index] = last_key
+            self._ready_index[last_key] = index
+
+    def _remove(self, key: str):
+        self._remove_ready(key)
+        self._stats.pop(key, None)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_proxy(self) -> IpInfoModel:
         """
-        从代理池中随机提取一个代理IP
+        从可用代理中按健康分挑选一个代理IP：随机取两个，返回分数高的那个。
+        只在没有任何可用代理时等待补充完成，其余情况下不发起网络请求。抽到已过期的代理时直接丢弃并重新挑选
         :return:
         """
-        if len(self.proxy_list) == 0:
-            await self._reload_proxies()
+        while True:
+            if not self._ready_keys:
+                await asyncio.shield(self._schedule_refill())
+                if not self._ready_keys:
+                    raise IpGetError("[ProxyIpPool.get_proxy] no valid proxy available")
+            self._maybe_refill()
+            first = self._stats[random.choice(self._ready_keys)]
+            second = self._stats[random.choice(self._ready_keys)]
+            expired_keys = {proxy_key(stats.proxy) for stats in (first, second) if is_proxy_expired(stats.proxy)}
+            if not expired_keys:
+                return first.proxy if first.score >= second.score else second.proxy
+            for key in expired_keys:
+                self._remove(key)
+                utils.logger.info(f"[ProxyIpPool.get_proxy] proxy {key} expired, dropped")
 
-        proxy = random.choice(self.proxy_list)
-        self.proxy_list.remove(proxy) # 取出来一个IP就应该移出掉
-        if self.enable_validate_ip:
-            if not await self._is_valid_proxy(proxy):
-                raise Exception("[ProxyIpPool.get_proxy] current ip invalid and again get it")
-        return proxy
+    def report_result(self, proxy: IpInfoModel, success: bool, latency: Optional[float] = None,
+                      blocked: bool = False):
+        """
+        上报一次使用代理的结果，更新健康分
+        :param proxy: get_proxy 返回的代理
+        :param success: 请求是否成功
+        :param latency: 请求耗时（秒）
+        :param blocked: 是否被目标平台封禁，封禁的代理会被隔离 PROXY_QUARANTINE_SEC 秒后重新验证
+        :return:
+        """
+        key = proxy_key(proxy)
+        stats = self._stats.get(key)
+        if stats is None:
+            return
+        stats.update(success and not blocked, latency)
+        if blocked:
+            stats.quarantined_until = time.time() + config.PROXY_QUARANTINE_SEC
+            self._remove_ready(key)
+            utils.logger.warning(f"[ProxyIpPool.report_result] proxy {key} blocked, "
+                                 f"quarantined for {config.PROXY_QUARANTINE_SEC}s")
+        elif stats.success_rate < MIN_SUCCESS_RATE:
+            self._remove(key)
+            utils.logger.info(f"[ProxyIpPool.report_result] proxy {key} success rate too low, dropped")
+        self._maybe_refill()
 
-    async def _reload_proxies(self):
+    async def close(self):
         """
-        # 重新加载代理池
+        停止正在进行的补充任务
         :return:
         """
-        self.proxy_list = []
-        await self.load_proxies()
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
 
 
 IpProxyProvider: Dict[str, ProxyProvider] = {
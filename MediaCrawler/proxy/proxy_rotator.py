@@ -0,0 +1,84 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 请求级代理轮换：按策略为每个请求分配代理，被封禁或连接失败时把结果回报给代理池并换代理
+from typing import Optional
+
+import config
+from tools import utils
+
+from .proxy_ip_pool import ProxyIpPool
+from .types import IpInfoModel, ProxyRotationPolicyEnum
+
+
+class ProxyRotator:
+    def __init__(self, ip_pool: ProxyIpPool, policy: str, rotate_every: int,
+                 initial_proxy: Optional[IpInfoModel] = None):
+        """
+        :param ip_pool: 代理池
+        :param policy: 轮换策略，见 ProxyRotationPolicyEnum
+        :param rotate_every: round_robin 策略下每个代理连续使用的请求数
+        :param initial_proxy: 初始代理，一般是浏览器使用的代理，sticky 策略下请求和浏览器保持同一个出口 IP
+        """
+        self.ip_pool = ip_pool
+        self.policy = ProxyRotationPolicyEnum(policy)
+        self.rotate_every = max(1, rotate_every)
+        self._current: Optional[IpInfoModel] = initial_proxy
+        self._served = 0
+
+    @property
+    def can_failover(self) -> bool:
+        """
+        sticky 策略整个会话只用一个代理，被封禁时不换代理重发
+        :return:
+        """
+        return self.policy != ProxyRotationPolicyEnum.STICKY
+
+    async def acquire(self) -> IpInfoModel:
+        """
+        获取下一个请求使用的代理
+        :return:
+        """
+        if self._current is None or (
+                self.policy == ProxyRotationPolicyEnum.ROUND_ROBIN and self._served >= self.rotate_every):
+            self._current = await self.ip_pool.get_proxy()
+            self._served = 0
+        self._served += 1
+        return self._current
+
+    def report(self, proxy: IpInfoModel, success: bool, latency: Optional[float] = None, blocked: bool = False):
+        """
+        回报一次请求的结果，失败或被封禁时后续请求换一个代理
+        :param proxy: acquire 返回的代理
+        :param success: 请求是否成功
+        :param latency: 请求耗时（秒）
+        :param blocked: 是否被平台封禁
+        :return:
+        """
+        self.ip_pool.report_result(proxy, success, latency, blocked)
+        if (blocked or not success) and self.can_failover and proxy == self._current:
+            utils.logger.info(f"[ProxyRotator.report] proxy {proxy.ip}:{proxy.port} "
+                              f"{'blocked' if blocked else 'failed'}, rotate to a new proxy")
+            self._current = None
+
+
+def create_proxy_rotator(ip_pool: ProxyIpPool, initial_proxy: Optional[IpInfoModel] = None) -> ProxyRotator:
+    """
+    按配置创建代理轮换器
+    :param ip_pool: 代理池
+    :param initial_proxy: 初始代理
+    :return:
+    """
+    return ProxyRotator(ip_pool,
+                        policy=config.PROXY_ROTATION_POLICY,
+                        rotate_every=config.PROXY_ROTATE_EVERY_N_REQUESTS,
+                        initial_proxy=initial_proxy)
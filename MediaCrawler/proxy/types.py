@@ -24,6 +24,15 @@ class ProviderNameEnum(Enum):
     KUAI_DAILI_PROVIDER: str = "kuaidaili"
 
 
+class ProxyRotationPolicyEnum(Enum):
+    # 每 N 个请求换一个代理，被封禁时立即换
+    ROUND_ROBIN: str = "round_robin"
+    # 一直使用当前代理，直到被封禁或连接失败
+    ON_BLOCK: str = "on_block"
+    # 整个会话只使用一个代理
+    STICKY: str = "sticky"
+
+
 class IpInfoModel(BaseModel):
     """Unified IP model"""
     ip: str = Field(title="ip")
@@ -590,3 +590,27 @@ alter table douyin_aweme_comment add column `like_count` varchar(255) NOT NULL D
 
 alter table xhs_note add column xsec_token varchar(50) default null comment '签名算法';
 alter table douyin_aweme_comment add column `pictures` varchar(500) NOT NULL DEFAULT '' COMMENT '评论图片列表';
+
+-- 入库改为 INSERT ... ON DUPLICATE KEY UPDATE 批量写入，按业务 id 加唯一索引
+-- 已有数据的库执行前需先清理重复记录
+ALTER TABLE `bilibili_video` ADD UNIQUE KEY `uk_bilibili_video_video_id` (`video_id`);
+ALTER TABLE `bilibili_video_comment` ADD UNIQUE KEY `uk_bilibili_video_comment_comment_id` (`comment_id`);
+ALTER TABLE `bilibili_up_info` ADD UNIQUE KEY `uk_bilibili_up_info_user_id` (`user_id`);
+ALTER TABLE `bilibili_contact_info` ADD UNIQUE KEY `uk_bilibili_contact_info_up_fan` (`up_id`, `fan_id`);
+ALTER TABLE `bilibili_up_dynamic` ADD UNIQUE KEY `uk_bilibili_up_dynamic_dynamic_id` (`dynamic_id`);
+ALTER TABLE `douyin_aweme` ADD UNIQUE KEY `uk_douyin_aweme_aweme_id` (`aweme_id`);
+ALTER TABLE `douyin_aweme_comment` ADD UNIQUE KEY `uk_douyin_aweme_comment_comment_id` (`comment_id`);
+ALTER TABLE `dy_creator` ADD UNIQUE KEY `uk_dy_creator_user_id` (`user_id`);
+ALTER TABLE `kuaishou_video` ADD UNIQUE KEY `uk_kuaishou_video_video_id` (`video_id`);
+ALTER TABLE `kuaishou_video_comment` ADD UNIQUE KEY `uk_kuaishou_video_comment_comment_id` (`comment_id`);
+ALTER TABLE `weibo_note` ADD UNIQUE KEY `uk_weibo_note_note_id` (`note_id`);
+ALTER TABLE `weibo_note_comment` ADD UNIQUE KEY `uk_weibo_note_comment_comment_id` (`comment_id`);
+ALTER TABLE `weibo_creator` ADD UNIQUE KEY `uk_weibo_creator_user_id` (`user_id`);
+ALTER TABLE `xhs_note` ADD UNIQUE KEY `uk_xhs_note_note_id` (`note_id`);
+ALTER TABLE `xhs_note_comment` ADD UNIQUE KEY `uk_xhs_note_comment_comment_id` (`comment_id`);
+ALTER TABLE `xhs_creator` ADD UNIQUE KEY `uk_xhs_creator_user_id` (`user_id`);
+ALTER TABLE `tieba_note` ADD UNIQUE KEY `uk_tieba_note_note_id` (`note_id`);
+ALTER TABLE `tieba_comment` ADD UNIQUE KEY `uk_tieba_comment_comment_id` (`comment_id`);
+ALTER TABLE `tieba_creator` ADD UNIQUE KEY `uk_tieba_creator_user_id` (`user_id`);
+ALTER TABLE `zhihu_content` ADD UNIQUE KEY `uk_zhihu_content_content_id` (`content_id`);
+ALTER TABLE `zhihu_comment` ADD UNIQUE KEY `uk_zhihu_comment_comment_id` (`comment_id`);
@@ -14,7 +14,7 @@
 # @Time    : 2024/1/14 19:34
 # @Desc    :
 
-from typing import List
+from typing import Dict, List
 
 import config
 from var import source_keyword_var
@@ -29,6 +29,8 @@ class BiliStoreFactory:
         "db": BiliDbStoreImplement,
         "json": BiliJsonStoreImplement
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
@@ -36,7 +38,9 @@ class BiliStoreFactory:
         if not store_class:
             raise ValueError(
                 "[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+        if config.SAVE_DATA_OPTION not in BiliStoreFactory._instances:
+            BiliStoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return BiliStoreFactory._instances[config.SAVE_DATA_OPTION]
 
 
 async def update_bilibili_video(video_item: Dict):
@@ -0,0 +1,126 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : CSV 写入：每个文件（爬取类型、数据类型、日期）一个常驻句柄，数据先缓冲在内存中，攒批写入，表头只写一次
+
+import csv
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import config
+from tools import utils
+
+
+class CsvFileSink:
+    def __init__(self, file_name: str):
+        """
+        一个 CSV 文件的句柄和待写入的行
+        :param file_name: 文件路径，目录不存在时自动创建
+        """
+        self.file_name = file_name
+        os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+        # 追加模式下文件非空时 utf-8-sig 不会再写 BOM
+        self._file = open(file_name, "a", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file)
+        self._header_written = self._file.tell() > 0
+        self.rows: List[List[Any]] = []
+
+    def add(self, item: Dict):
+        if not self._header_written:
+            self._writer.writerow(list(item.keys()))
+            self._header_written = True
+        self.rows.append(list(item.values()))
+
+    def flush(self):
+        if not self.rows:
+            return
+        self._writer.writerows(self.rows)
+        self._file.flush()
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class CsvStore:
+    def __init__(self, batch_size: int, flush_interval: float):
+        """
+        :param batch_size: 单个文件缓冲达到该行数时写入
+        :param flush_interval: 距上次写入超过该间隔（秒）时写入所有文件
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._sinks: Dict[str, CsvFileSink] = {}
+        self._last_flush = time.monotonic()
+
+    async def append(self, file_name: str, item: Dict):
+        """
+        缓冲一行数据，文件第一次写入时以这条数据的字段作为表头
+        :param file_name: csv 文件路径
+        :param item: 一条数据
+        :return:
+        """
+        sink = self._sinks.get(file_name)
+        if sink is None:
+            sink = CsvFileSink(file_name)
+            self._sinks[file_name] = sink
+        sink.add(item)
+        if len(sink.rows) >= self.batch_size:
+            sink.flush()
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        写入所有文件缓冲的数据
+        :return:
+        """
+        self._last_flush = time.monotonic()
+        for sink in self._sinks.values():
+            sink.flush()
+
+    async def close(self):
+        """
+        写入剩余数据并关闭所有文件
+        :return:
+        """
+        for sink in self._sinks.values():
+            sink.close()
+            utils.logger.info(f"[CsvStore.close] closed {sink.file_name}")
+        self._sinks = {}
+
+
+_csv_store: Optional[CsvStore] = None
+
+
+def get_csv_store() -> CsvStore:
+    """
+    获取全局 csv 存储，首次调用时按配置创建
+    :return:
+    """
+    global _csv_store
+    if _csv_store is None:
+        _csv_store = CsvStore(config.CSV_WRITE_BATCH_SIZE, config.CSV_FLUSH_INTERVAL_SEC)
+    return _csv_store
+
+
+async def close_csv_store():
+    """
+    关闭 csv 存储，在 main 退出时调用
+    :return:
+    """
+    global _csv_store
+    if _csv_store is not None:
+        await _csv_store.close()
+        _csv_store = None
@@ -0,0 +1,140 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : mysql 写缓冲：按表攒批，用多行 INSERT ... ON DUPLICATE KEY UPDATE 写入，替代逐条先查后写
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import config
+from async_db import AsyncMysqlDB
+from tools import utils
+from var import media_crawler_db_var
+
+# 记录已存在时不覆盖的字段：首次入库时间
+UPSERT_IGNORE_FIELDS = ("add_ts",)
+
+
+class DbWriteBuffer:
+    def __init__(self, batch_size: int, flush_interval: float):
+        """
+        :param batch_size: 单表缓冲达到该条数时立即写入
+        :param flush_interval: 后台定时写入的间隔（秒）
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffers: Dict[str, List[Dict]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    async def upsert(self, table_name: str, item: Dict):
+        """
+        缓冲一条记录，表上需要有唯一索引（见 schema/tables.sql）
+        :param table_name: 表名
+        :param item: 一条记录，需要包含 add_ts，记录已存在时 add_ts 保持不变
+        :return:
+        """
+        buffer = self._buffers.setdefault(table_name, [])
+        buffer.append(item)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+        if len(buffer) >= self.batch_size:
+            await self.flush_table(table_name)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # close() 取消本任务时不打断正在进行的写入
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                utils.logger.error(f"[DbWriteBuffer._flush_periodically] flush error: {e}")
+
+    async def flush_table(self, table_name: str):
+        """
+        把一张表缓冲的记录写入数据库
+        :param table_name: 表名
+        :return:
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        # 串行写入，保证同一条记录先缓冲的版本不会覆盖后缓冲的版本
+        async with self._flush_lock:
+            items = self._buffers.pop(table_name, None)
+            if not items:
+                return
+            try:
+                await self._write(table_name, items)
+            except Exception:
+                # 写入失败时放回缓冲区，下次写入时重试
+                self._buffers[table_name] = items + self._buffers.get(table_name, [])
+                raise
+
+    async def _write(self, table_name: str, items: List[Dict]):
+        # 同一批次内字段不一致的记录不能放进同一条 INSERT，按字段集合分组
+        groups: Dict[Tuple[str, ...], List[Tuple]] = {}
+        for item in items:
+            fields = tuple(item.keys())
+            groups.setdefault(fields, []).append(tuple(item.values()))
+        async_db_conn: AsyncMysqlDB = media_crawler_db_var.get()
+        for fields, rows in groups.items():
+            update_fields = [field for field in fields if field not in UPSERT_IGNORE_FIELDS]
+            for start in range(0, len(rows), self.batch_size):
+                await async_db_conn.bulk_upsert(table_name, fields, rows[start:start + self.batch_size], update_fields)
+        utils.logger.info(f"[DbWriteBuffer.flush_table] table: {table_name}, flushed {len(items)} items")
+
+    async def flush(self):
+        """
+        写入所有表缓冲的记录
+        :return:
+        """
+        for table_name in list(self._buffers.keys()):
+            await self.flush_table(table_name)
+
+    async def close(self):
+        """
+        停止后台写入并写入剩余记录，关闭数据库连接池前调用
+        :return:
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+
+_db_write_buffer: Optional[DbWriteBuffer] = None
+
+
+def get_db_write_buffer() -> DbWriteBuffer:
+    """
+    获取全局 mysql 写缓冲，首次调用时按配置创建
+    :return:
+    """
+    global _db_write_buffer
+    if _db_write_buffer is None:
+        _db_write_buffer = DbWriteBuffer(config.MYSQL_WRITE_BATCH_SIZE, config.MYSQL_WRITE_FLUSH_INTERVAL_SEC)
+    return _db_write_buffer
+
+
+async def close_db_write_buffer():
+    """
+    写入剩余记录，在 db.close() 中调用
+    :return:
+    """
+    global _db_write_buffer
+    if _db_write_buffer is not None:
+        await _db_write_buffer.close()
+        _db_write_buffer = None
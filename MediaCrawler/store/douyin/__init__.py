@@ -13,7 +13,7 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 18:46
 # @Desc    :
-from typing import List
+from typing import Dict, List
 
 import config
 from var import source_keyword_var
@@ -27,6 +27,8 @@ class DouyinStoreFactory:
         "db": DouyinDbStoreImplement,
         "json": DouyinJsonStoreImplement,
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
@@ -35,7 +37,9 @@ class DouyinStoreFactory:
             raise ValueError(
                 "[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json ..."
             )
-        return store_class()
+        if config.SAVE_DATA_OPTION not in DouyinStoreFactory._instances:
+            DouyinStoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return DouyinStoreFactory._instances[config.SAVE_DATA_OPTION]
 
 
 def _extract_comment_image_list(comment_item: Dict) -> List[str]:
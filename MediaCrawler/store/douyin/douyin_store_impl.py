@@ -14,7 +14,6 @@
 # @Time    : 2024/1/14 18:46
 # @Desc    : 抖音存储实现类
 import asyncio
-import csv
 import json
 import os
 import pathlib
@@ -24,6 +23,9 @@ import aiofiles
 
 import config
 from base.base_crawler import AbstractStore
+from store.csv_store import get_csv_store
+from store.db_write_buffer import get_db_write_buffer
+from store.jsonl_store import get_jsonl_store
 from tools import utils, words
 from var import crawler_type_var
 
@@ -68,13 +70,8 @@ class DouyinCsvStoreImplement(AbstractStore):
         Returns: no returns
 
         """
-        pathlib.Path(self.csv_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(store_type=store_type)
-        async with aiofiles.open(save_file_name, mode='a+', encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
-            if await f.tell() == 0:
-                await writer.writerow(save_item.keys())
-            await writer.writerow(save_item.values())
+        await get_csv_store().append(save_file_name, save_item)
 
     async def store_content(self, content_item: Dict):
         """
@@ -121,17 +118,13 @@ class DouyinDbStoreImplement(AbstractStore):
 
         """
 
-        from .douyin_store_sql import (add_new_content,
-                                       query_content_by_content_id,
-                                       update_content_by_content_id)
-        aweme_id = content_item.get("aweme_id")
-        aweme_detail: Dict = await query_content_by_content_id(content_id=aweme_id)
-        if not aweme_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            if content_item.get("title"):
-                await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(aweme_id, content_item=content_item)
+        if not content_item.get("title"):
+            # 没有标题的视频不新增记录，只更新已经入库的记录
+            from .douyin_store_sql import update_content_by_content_id
+            await update_content_by_content_id(content_item.get("aweme_id"), content_item=content_item)
+            return
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await get_db_write_buffer().upsert("douyin_aweme", content_item)
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -142,16 +135,8 @@ class DouyinDbStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .douyin_store_sql import (add_new_comment,
-                                       query_comment_by_comment_id,
-                                       update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await get_db_write_buffer().upsert("douyin_aweme_comment", comment_item)
 
     async def store_creator(self, creator: Dict):
         """
@@ -162,16 +147,8 @@ class DouyinDbStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .douyin_store_sql import (add_new_creator,
-                                       query_creator_by_user_id,
-                                       update_creator_by_user_id)
-        user_id = creator.get("user_id")
-        user_detail: Dict = await query_creator_by_user_id(user_id)
-        if not user_detail:
-            creator["add_ts"] = utils.get_current_timestamp()
-            await add_new_creator(creator)
-        else:
-            await update_creator_by_user_id(user_id, creator)
+        creator["add_ts"] = utils.get_current_timestamp()
+        await get_db_write_buffer().upsert("dy_creator", creator)
 
 class DouyinJsonStoreImplement(AbstractStore):
     json_store_path: str = "data/douyin/json"
@@ -179,7 +156,6 @@ class DouyinJsonStoreImplement(AbstractStore):
 
     lock = asyncio.Lock()
     file_count: int = calculate_number_of_files(json_store_path)
-    WordCloud = words.AsyncWordCloudGenerator()
 
     def make_save_file_name(self, store_type: str) -> (str,str):
         """
@@ -208,6 +184,16 @@ class DouyinJsonStoreImplement(AbstractStore):
         pathlib.Path(self.json_store_path).mkdir(parents=True, exist_ok=True)
         pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name,words_file_name_prefix = self.make_save_file_name(store_type=store_type)
+
+        if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
+            # 只对新数据分词并累加词频，词云在退出时或按间隔生成
+            await words.get_word_cloud_generator().add_item(save_item, words_file_name_prefix)
+
+        if config.JSON_STORE_FORMAT == "jsonl":
+            # 逐行追加，不再每条数据都读取并重写整个文件
+            await get_jsonl_store().append(save_file_name + "l", save_item)
+            return
+
         save_data = []
 
         async with self.lock:
@@ -219,12 +205,6 @@ class DouyinJsonStoreImplement(AbstractStore):
             async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
                 await file.write(json.dumps(save_data, ensure_ascii=False))
 
-            if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
-                try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
-                except:
-                    pass
-
     async def store_content(self, content_item: Dict):
         """
         content JSON storage implementation
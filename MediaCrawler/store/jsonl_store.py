@@ -0,0 +1,172 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : JSON Lines 存储：每条数据追加一行，文件句柄常驻并定时 fsync，退出时可压实成旧的 JSON 数组文件
+#            手动压实：python -m store.jsonl_store data/xhs/json/search_comments_2024-01-14.jsonl
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import config
+from tools import utils
+
+# 单个文件的写缓冲大小，写满后才落到操作系统
+JSONL_WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def iter_jsonl(file_name: str) -> Iterator[Dict]:
+    """
+    逐行读取 jsonl 文件，跳过进程异常退出时可能留下的不完整行
+    :param file_name: jsonl 文件路径
+    :return:
+    """
+    with open(file_name, "r", encoding="utf-8") as file:
+        for line_no, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                utils.logger.warning(f"[iter_jsonl] skip broken line {line_no} in {file_name}")
+
+
+def import_legacy_json(file_name: str) -> int:
+    """
+    新建 jsonl 文件前，如果当天已有 JSON_STORE_FORMAT="json" 模式写下的同名 .json 文件，
+    先把其中的数据写进 jsonl，避免压实时覆盖掉这部分旧数据。
+    jsonl 已存在时 .json 是压实生成的，不再导入
+    :param file_name: jsonl 文件路径
+    :return: 导入的数据条数
+    """
+    json_file_name = os.path.splitext(file_name)[0] + ".json"
+    if os.path.exists(file_name) or not os.path.exists(json_file_name):
+        return 0
+    with open(json_file_name, "r", encoding="utf-8") as file:
+        items: List[Dict] = json.load(file)
+    with open(file_name, "w", encoding="utf-8") as file:
+        for item in items:
+            file.write(json.dumps(item, ensure_ascii=False) + "\n")
+    return len(items)
+
+
+def compact_jsonl_file(file_name: str) -> str:
+    """
+    把 jsonl 文件流式转换成同名的 JSON 数组文件（.json），不把整个文件读入内存
+    :param file_name: jsonl 文件路径
+    :return: 生成的 json 文件路径
+    """
+    json_file_name = os.path.splitext(file_name)[0] + ".json"
+    tmp_file_name = json_file_name + ".tmp"
+    with open(tmp_file_name, "w", encoding="utf-8") as file:
+        file.write("[")
+        for index, item in enumerate(iter_jsonl(file_name)):
+            if index:
+                file.write(", ")
+            file.write(json.dumps(item, ensure_ascii=False))
+        file.write("]")
+    # 写完再替换，读取方不会看到写了一半的文件
+    os.replace(tmp_file_name, json_file_name)
+    return json_file_name
+
+
+class JsonlStore:
+    def __init__(self, fsync_interval: float):
+        """
+        :param fsync_interval: 定时把缓冲写入磁盘的间隔（秒）
+        """
+        self.fsync_interval = fsync_interval
+        self._files: Dict[str, TextIO] = {}
+        self._last_fsync = time.monotonic()
+
+    async def append(self, file_name: str, item: Dict):
+        """
+        追加一条数据
+        :param file_name: jsonl 文件路径，所在目录需要已存在
+        :param item: 一条数据
+        :return:
+        """
+        file = self._files.get(file_name)
+        if file is None:
+            imported = await asyncio.get_running_loop().run_in_executor(None, import_legacy_json, file_name)
+            if imported:
+                utils.logger.info(f"[JsonlStore.append] imported {imported} items from legacy json into {file_name}")
+            file = open(file_name, "a", encoding="utf-8", buffering=JSONL_WRITE_BUFFER_SIZE)
+            self._files[file_name] = file
+        file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        if time.monotonic() - self._last_fsync >= self.fsync_interval:
+            await self.sync()
+
+    async def sync(self):
+        """
+        把所有文件的缓冲写入磁盘
+        :return:
+        """
+        self._last_fsync = time.monotonic()
+        loop = asyncio.get_running_loop()
+        for file in list(self._files.values()):
+            file.flush()
+            await loop.run_in_executor(None, os.fsync, file.fileno())
+
+    async def close(self):
+        """
+        关闭所有文件，按配置压实成 JSON 数组文件
+        :return:
+        """
+        await self.sync()
+        file_names: List[str] = list(self._files.keys())
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+
+        loop = asyncio.get_running_loop()
+        for file_name in file_names:
+            if config.JSONL_COMPACT_ON_CLOSE:
+                json_file_name = await loop.run_in_executor(None, compact_jsonl_file, file_name)
+                utils.logger.info(f"[JsonlStore.close] compacted {file_name} to {json_file_name}")
+
+
+_jsonl_store: Optional[JsonlStore] = None
+
+
+def get_jsonl_store() -> JsonlStore:
+    """
+    获取全局 jsonl 存储，首次调用时按配置创建
+    :return:
+    """
+    global _jsonl_store
+    if _jsonl_store is None:
+        _jsonl_store = JsonlStore(config.JSONL_FSYNC_INTERVAL_SEC)
+    return _jsonl_store
+
+
+async def close_jsonl_store():
+    """
+    关闭 jsonl 存储，在 main 退出时调用
+    :return:
+    """
+    global _jsonl_store
+    if _jsonl_store is not None:
+        await _jsonl_store.close()
+        _jsonl_store = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="compact jsonl files into legacy json array files")
+    parser.add_argument("files", nargs="+", help="jsonl files, e.g. data/xhs/json/*.jsonl")
+    args = parser.parse_args()
+    for jsonl_file in args.files:
+        print(f"{jsonl_file} -> {compact_jsonl_file(jsonl_file)}")
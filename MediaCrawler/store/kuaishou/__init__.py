@@ -13,7 +13,7 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 20:03
 # @Desc    :
-from typing import List
+from typing import Dict, List
 
 import config
 from var import source_keyword_var
@@ -27,6 +27,8 @@ class KuaishouStoreFactory:
         "db": KuaishouDbStoreImplement,
         "json": KuaishouJsonStoreImplement
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
@@ -34,7 +36,9 @@ class KuaishouStoreFactory:
         if not store_class:
             raise ValueError(
                 "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+        if config.SAVE_DATA_OPTION not in KuaishouStoreFactory._instances:
+            KuaishouStoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return KuaishouStoreFactory._instances[config.SAVE_DATA_OPTION]
 
 
 async def update_kuaishou_video(video_item: Dict):
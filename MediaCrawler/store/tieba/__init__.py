@@ -10,7 +10,7 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List
 
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from var import source_keyword_var
@@ -25,6 +25,8 @@ class TieBaStoreFactory:
         "db": TieBaDbStoreImplement,
         "json": TieBaJsonStoreImplement
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
@@ -32,7 +34,9 @@ class TieBaStoreFactory:
         if not store_class:
             raise ValueError(
                 "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+        if config.SAVE_DATA_OPTION not in TieBaStoreFactory._instances:
+            TieBaStoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return TieBaStoreFactory._instances[config.SAVE_DATA_OPTION]
 
 
 async def batch_update_tieba_notes(note_list: List[TiebaNote]):
@@ -15,7 +15,7 @@
 # @Desc    :
 
 import re
-from typing import List
+from typing import Dict, List
 
 from var import source_keyword_var
 
@@ -29,6 +29,8 @@ class WeibostoreFactory:
         "db": WeiboDbStoreImplement,
         "json": WeiboJsonStoreImplement,
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
@@ -36,7 +38,9 @@ class WeibostoreFactory:
         if not store_class:
             raise ValueError(
                 "[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+        if config.SAVE_DATA_OPTION not in WeibostoreFactory._instances:
+            WeibostoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return WeibostoreFactory._instances[config.SAVE_DATA_OPTION]
 
 
 async def batch_update_weibo_notes(note_list: List[Dict]):
@@ -13,7 +13,7 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 17:34
 # @Desc    :
-from typing import List
+from typing import Dict, List
 
 import config
 from var import source_keyword_var
@@ -29,13 +29,17 @@ class XhsStoreFactory:
         "db": XhsDbStoreImplement,
         "json": XhsJsonStoreImplement
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
         store_class = XhsStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+        if config.SAVE_DATA_OPTION not in XhsStoreFactory._instances:
+            XhsStoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return XhsStoreFactory._instances[config.SAVE_DATA_OPTION]
 
 
 def get_video_url_arr(note_item: Dict) -> List:
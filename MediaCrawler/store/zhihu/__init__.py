@@ -10,7 +10,7 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List
 
 import config
 from base.base_crawler import AbstractStore
@@ -28,13 +28,17 @@ class ZhihuStoreFactory:
         "db": ZhihuDbStoreImplement,
         "json": ZhihuJsonStoreImplement
     }
+    # 存储实现不保存单条数据的状态，每种存储方式只创建一个实例，避免每条数据都新建
+    _instances: Dict[str, AbstractStore] = {}
 
     @staticmethod
     def create_store() -> AbstractStore:
         store_class = ZhihuStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+        if config.SAVE_DATA_OPTION not in ZhihuStoreFactory._instances:
+            ZhihuStoreFactory._instances[config.SAVE_DATA_OPTION] = store_class()
+        return ZhihuStoreFactory._instances[config.SAVE_DATA_OPTION]
 
 async def batch_update_zhihu_contents(contents: List[ZhihuContent]):
     """
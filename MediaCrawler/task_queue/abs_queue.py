@@ -0,0 +1,123 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : 任务队列抽象类
+#            任务按 (平台, 爬取类型) 分队列；领取任务后在可见性超时内需要确认（ack）或退回（nack），
+#            超时未确认的任务重新分配，尝试次数达到上限的任务进入死信队列
+
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+from pydantic import BaseModel, Field
+
+
+class CrawlTask(BaseModel):
+    platform: str = Field(title="平台，与 --platform 一致")
+    crawler_type: str = Field(title="爬取类型：search | detail | creator")
+    target: str = Field(title="搜索关键词、内容 id/链接或创作者 id/链接")
+    attempts: int = Field(default=0, title="已领取的次数")
+    last_error: str = Field(default="", title="最近一次失败的原因")
+
+    @property
+    def task_id(self) -> str:
+        # 同一个目标只会入队一次
+        return f"{self.platform}:{self.crawler_type}:{self.target}"
+
+
+class AbstractTaskQueue(ABC):
+    def __init__(self, max_attempts: int):
+        """
+        :param max_attempts: 任务最多领取的次数，达到后失败或超时的任务进入死信队列
+        """
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    async def enqueue(self, tasks: List[CrawlTask]) -> int:
+        """
+        任务入队，已在队列中或已完成的任务会被忽略
+        :param tasks: 任务列表
+        :return: 新入队的任务数
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def lease(self, platform: str, crawler_type: str, count: int,
+                    visibility_timeout: float) -> List[CrawlTask]:
+        """
+        领取任务，领取前先把可见性超时的任务放回队列（或在尝试次数用尽时放入死信队列）
+        :param platform: 平台
+        :param crawler_type: 爬取类型
+        :param count: 最多领取的任务数
+        :param visibility_timeout: 可见性超时（秒）
+        :return: 领取到的任务，队列为空时返回空列表
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def extend(self, tasks: List[CrawlTask], visibility_timeout: float) -> None:
+        """
+        延长任务的可见性超时，任务运行时间较长时定时调用
+        :param tasks: 已领取的任务
+        :param visibility_timeout: 从现在起的可见性超时（秒）
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ack(self, tasks: List[CrawlTask]) -> None:
+        """
+        确认任务完成
+        :param tasks: 已领取的任务
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def nack(self, tasks: List[CrawlTask], error: str) -> None:
+        """
+        任务失败，尝试次数未用尽时放回队列，否则放入死信队列
+        :param tasks: 已领取的任务
+        :param error: 失败原因
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def dead_letters(self, platform: str, crawler_type: str) -> List[CrawlTask]:
+        """
+        查看死信队列中的任务
+        :param platform: 平台
+        :param crawler_type: 爬取类型
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def requeue_dead_letters(self, platform: str, crawler_type: str) -> int:
+        """
+        把死信队列中的任务重置尝试次数后放回队列
+        :param platform: 平台
+        :param crawler_type: 爬取类型
+        :return: 放回的任务数
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stats(self, platform: str, crawler_type: str) -> Dict[str, int]:
+        """
+        队列中各状态的任务数
+        :param platform: 平台
+        :param crawler_type: 爬取类型
+        :return: {"ready": .., "leased": .., "dead": .., "done": ..}
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,66 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : 任务队列命令行，用于生产任务和查看队列，队列后端和连接使用 config 中的配置
+#            用法（在项目根目录执行）：
+#              python -m task_queue.cli enqueue --platform xhs --type search 编程副业 编程兼职
+#              python -m task_queue.cli enqueue --platform dy --type detail --from-config
+#              python -m task_queue.cli stats --platform xhs --type search
+#              python -m task_queue.cli dead --platform xhs --type search --requeue
+#            worker 端：python main.py --platform xhs --type search --queue yes
+
+import argparse
+import asyncio
+
+from .abs_queue import CrawlTask
+from .queue_factory import TaskQueueFactory
+from .worker import get_config_targets
+
+
+async def run(args: argparse.Namespace):
+    task_queue = TaskQueueFactory.create_task_queue(args.backend)
+    try:
+        if args.command == "enqueue":
+            targets = list(args.targets)
+            if args.from_config:
+                targets.extend(get_config_targets(args.platform, args.type))
+            tasks = [CrawlTask(platform=args.platform, crawler_type=args.type, target=target) for target in targets]
+            added = await task_queue.enqueue(tasks)
+            print(f"enqueued {added} new tasks, {len(tasks) - added} already queued or done")
+        elif args.command == "stats":
+            print(await task_queue.stats(args.platform, args.type))
+        elif args.command == "dead":
+            for task in await task_queue.dead_letters(args.platform, args.type):
+                print(f"{task.target}\tattempts={task.attempts}\terror={task.last_error}")
+            if args.requeue:
+                print(f"requeued {await task_queue.requeue_dead_letters(args.platform, args.type)} tasks")
+    finally:
+        await task_queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MediaCrawler distributed task queue")
+    parser.add_argument("--backend", default="", help="redis | sqlite, default config.TASK_QUEUE_BACKEND")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("enqueue", "add tasks"), ("stats", "show task counts"),
+                               ("dead", "list dead-letter tasks")):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("--platform", required=True, choices=["xhs", "dy", "ks", "bili", "wb", "tieba", "zhihu"])
+        subparser.add_argument("--type", required=True, choices=["search", "detail", "creator"])
+        if command == "enqueue":
+            subparser.add_argument("targets", nargs="*", help="keywords, content ids/urls or creator ids/urls")
+            subparser.add_argument("--from-config", action="store_true", help="also enqueue targets in config")
+        elif command == "dead":
+            subparser.add_argument("--requeue", action="store_true", help="move dead-letter tasks back to the queue")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
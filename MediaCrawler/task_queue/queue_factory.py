@@ -0,0 +1,39 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : 任务队列工厂
+
+
+import config
+
+from .abs_queue import AbstractTaskQueue
+
+
+class TaskQueueFactory:
+    """
+    任务队列工厂类
+    """
+
+    @staticmethod
+    def create_task_queue(backend: str = "") -> AbstractTaskQueue:
+        """
+        创建任务队列
+        :param backend: 队列后端：redis | sqlite，为空时使用 config.TASK_QUEUE_BACKEND
+        :return:
+        """
+        backend = backend or config.TASK_QUEUE_BACKEND
+        if backend == "sqlite":
+            from .sqlite_queue import SqliteTaskQueue
+            return SqliteTaskQueue(config.TASK_QUEUE_SQLITE_PATH, config.TASK_QUEUE_MAX_ATTEMPTS)
+        elif backend == "redis":
+            from .redis_queue import RedisTaskQueue
+            return RedisTaskQueue(config.TASK_QUEUE_MAX_ATTEMPTS)
+        else:
+            raise ValueError(f"Unknown task queue backend: {backend}")
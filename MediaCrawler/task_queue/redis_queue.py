@@ -0,0 +1,200 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : Redis 任务队列，连接配置与 cache/redis_cache 相同，多台机器上的 worker 共享一个队列
+#            每个 (平台, 爬取类型) 使用以下 key：
+#              ready(list) 待领取的任务 id；leases(zset) 已领取的任务 id -> 租约到期时间；
+#              tasks(hash) 任务 id -> 任务 json；attempts(hash) 领取次数；errors(hash) 失败原因；
+#              dead(list) 死信任务 id；done(set) 已完成的任务 id，用于入队去重
+#            领取、退回等涉及多个 key 的操作用 lua 脚本保证原子性
+
+import json
+import time
+from typing import Dict, List, Optional
+
+from redis import asyncio as aioredis
+
+from cache.redis_cache import _connection_kwargs
+
+from .abs_queue import AbstractTaskQueue, CrawlTask
+
+KEY_PREFIX = "mc:task_queue"
+
+ENQUEUE_SCRIPT = """
+local added = 0
+for i = 1, #ARGV, 2 do
+    if redis.call('SISMEMBER', KEYS[3], ARGV[i]) == 0 and redis.call('HSETNX', KEYS[2], ARGV[i], ARGV[i + 1]) == 1 then
+        redis.call('RPUSH', KEYS[1], ARGV[i])
+        added = added + 1
+    end
+end
+return added
+"""
+
+# KEYS: ready, leases, tasks, attempts, dead, errors
+# ARGV: now, lease_until, count, max_attempts
+LEASE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], id)
+    if tonumber(redis.call('HGET', KEYS[4], id) or '0') >= tonumber(ARGV[4]) then
+        redis.call('HSET', KEYS[6], id, 'lease expired')
+        redis.call('RPUSH', KEYS[5], id)
+    else
+        redis.call('LPUSH', KEYS[1], id)
+    end
+end
+local leased = {}
+for i = 1, tonumber(ARGV[3]) do
+    local id = redis.call('LPOP', KEYS[1])
+    if not id then
+        break
+    end
+    local attempts = redis.call('HINCRBY', KEYS[4], id, 1)
+    redis.call('ZADD', KEYS[2], ARGV[2], id)
+    table.insert(leased, redis.call('HGET', KEYS[3], id))
+    table.insert(leased, attempts)
+end
+return leased
+"""
+
+# KEYS: ready, leases, attempts, dead, errors
+# ARGV: max_attempts, error, id...
+NACK_SCRIPT = """
+for i = 3, #ARGV do
+    local id = ARGV[i]
+    if redis.call('ZREM', KEYS[2], id) == 1 then
+        redis.call('HSET', KEYS[5], id, ARGV[2])
+        if tonumber(redis.call('HGET', KEYS[3], id) or '0') >= tonumber(ARGV[1]) then
+            redis.call('RPUSH', KEYS[4], id)
+        else
+            redis.call('RPUSH', KEYS[1], id)
+        end
+    end
+end
+return 0
+"""
+
+# KEYS: dead, ready, attempts
+REQUEUE_DEAD_SCRIPT = """
+local ids = redis.call('LRANGE', KEYS[1], 0, -1)
+redis.call('DEL', KEYS[1])
+for _, id in ipairs(ids) do
+    redis.call('HDEL', KEYS[3], id)
+    redis.call('RPUSH', KEYS[2], id)
+end
+return #ids
+"""
+
+
+class RedisTaskQueue(AbstractTaskQueue):
+    def __init__(self, max_attempts: int, redis_client: Optional[aioredis.Redis] = None):
+        """
+        :param max_attempts: 任务最多领取的次数
+        :param redis_client: 指定 redis 客户端（如测试时的 fakeredis），为空时按配置连接
+        """
+        super().__init__(max_attempts)
+        self._redis_client = redis_client or aioredis.Redis(**_connection_kwargs())
+        self._enqueue = self._redis_client.register_script(ENQUEUE_SCRIPT)
+        self._lease = self._redis_client.register_script(LEASE_SCRIPT)
+        self._nack = self._redis_client.register_script(NACK_SCRIPT)
+        self._requeue_dead = self._redis_client.register_script(REQUEUE_DEAD_SCRIPT)
+
+    @staticmethod
+    def _key(platform: str, crawler_type: str, name: str) -> str:
+        return f"{KEY_PREFIX}:{platform}:{crawler_type}:{name}"
+
+    def _keys(self, platform: str, crawler_type: str, *names: str) -> List[str]:
+        return [self._key(platform, crawler_type, name) for name in names]
+
+    @staticmethod
+    def _dump(task: CrawlTask) -> str:
+        return json.dumps({"platform": task.platform, "crawler_type": task.crawler_type, "target": task.target},
+                          ensure_ascii=False)
+
+    async def enqueue(self, tasks: List[CrawlTask]) -> int:
+        # 按队列分组，lua 脚本访问的 key 需要在 KEYS 中声明
+        groups: Dict[tuple, List[CrawlTask]] = {}
+        for task in tasks:
+            groups.setdefault((task.platform, task.crawler_type), []).append(task)
+        added = 0
+        for (platform, crawler_type), group in groups.items():
+            args: List[str] = []
+            for task in group:
+                args.extend([task.task_id, self._dump(task)])
+            added += await self._enqueue(keys=self._keys(platform, crawler_type, "ready", "tasks", "done"), args=args)
+        return added
+
+    async def lease(self, platform: str, crawler_type: str, count: int,
+                    visibility_timeout: float) -> List[CrawlTask]:
+        now = time.time()
+        result = await self._lease(
+            keys=self._keys(platform, crawler_type, "ready", "leases", "tasks", "attempts", "dead", "errors"),
+            args=[now, now + visibility_timeout, count, self.max_attempts])
+        tasks = []
+        for index in range(0, len(result), 2):
+            tasks.append(CrawlTask(**json.loads(result[index]), attempts=int(result[index + 1])))
+        return tasks
+
+    async def extend(self, tasks: List[CrawlTask], visibility_timeout: float) -> None:
+        lease_until = time.time() + visibility_timeout
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            for task in tasks:
+                # xx：只更新仍在租约中的任务
+                pipe.zadd(self._key(task.platform, task.crawler_type, "leases"), {task.task_id: lease_until}, xx=True)
+            await pipe.execute()
+
+    async def ack(self, tasks: List[CrawlTask]) -> None:
+        async with self._redis_client.pipeline(transaction=True) as pipe:
+            for task in tasks:
+                leases, tasks_key, attempts, errors, done = self._keys(
+                    task.platform, task.crawler_type, "leases", "tasks", "attempts", "errors", "done")
+                pipe.zrem(leases, task.task_id)
+                pipe.hdel(tasks_key, task.task_id)
+                pipe.hdel(attempts, task.task_id)
+                pipe.hdel(errors, task.task_id)
+                pipe.sadd(done, task.task_id)
+            await pipe.execute()
+
+    async def nack(self, tasks: List[CrawlTask], error: str) -> None:
+        for task in tasks:
+            await self._nack(
+                keys=self._keys(task.platform, task.crawler_type, "ready", "leases", "attempts", "dead", "errors"),
+                args=[self.max_attempts, error, task.task_id])
+
+    async def dead_letters(self, platform: str, crawler_type: str) -> List[CrawlTask]:
+        dead, tasks_key, attempts, errors = self._keys(platform, crawler_type, "dead", "tasks", "attempts", "errors")
+        ids = await self._redis_client.lrange(dead, 0, -1)
+        if not ids:
+            return []
+        datas = await self._redis_client.hmget(tasks_key, ids)
+        attempt_counts = await self._redis_client.hmget(attempts, ids)
+        last_errors = await self._redis_client.hmget(errors, ids)
+        return [
+            CrawlTask(**json.loads(data), attempts=int(attempt_count or 0),
+                      last_error=(last_error or b"").decode("utf-8"))
+            for data, attempt_count, last_error in zip(datas, attempt_counts, last_errors) if data
+        ]
+
+    async def requeue_dead_letters(self, platform: str, crawler_type: str) -> int:
+        return await self._requeue_dead(keys=self._keys(platform, crawler_type, "dead", "ready", "attempts"))
+
+    async def stats(self, platform: str, crawler_type: str) -> Dict[str, int]:
+        ready, leases, dead, done = self._keys(platform, crawler_type, "ready", "leases", "dead", "done")
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            pipe.llen(ready)
+            pipe.zcard(leases)
+            pipe.llen(dead)
+            pipe.scard(done)
+            counts = await pipe.execute()
+        return dict(zip(("ready", "leased", "dead", "done"), counts))
+
+    async def close(self) -> None:
+        await self._redis_client.close()
@@ -0,0 +1,174 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : SQLite 任务队列，单机多进程共用一个数据库文件，适合一台机器上运行多个 worker
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, TypeVar
+
+from .abs_queue import AbstractTaskQueue, CrawlTask
+
+T = TypeVar("T")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_task (
+    task_id TEXT PRIMARY KEY,
+    platform TEXT NOT NULL,
+    crawler_type TEXT NOT NULL,
+    target TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_task_queue ON crawl_task (platform, crawler_type, status);
+"""
+
+# 任务状态
+STATUS_READY = "ready"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+
+class SqliteTaskQueue(AbstractTaskQueue):
+    def __init__(self, db_path: str, max_attempts: int):
+        """
+        :param db_path: 数据库文件路径，目录不存在时自动创建
+        :param max_attempts: 任务最多领取的次数
+        """
+        super().__init__(max_attempts)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # 手动管理事务：领取任务时用 BEGIN IMMEDIATE 加写锁，多个进程不会领取到同一个任务
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        # 同一个连接在线程池中使用，操作之间需要串行
+        self._lock = threading.Lock()
+
+    async def _run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """
+        在线程池中执行数据库操作，等待其他进程的写锁时不阻塞事件循环
+        :param func: 接收连接的函数，在一个事务中执行
+        :return:
+        """
+        def run_in_transaction() -> T:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = func(self._conn)
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self._conn.execute("COMMIT")
+                return result
+
+        return await asyncio.get_running_loop().run_in_executor(None, run_in_transaction)
+
+    @staticmethod
+    def _to_task(row) -> CrawlTask:
+        return CrawlTask(platform=row[0], crawler_type=row[1], target=row[2], attempts=row[3], last_error=row[4])
+
+    async def enqueue(self, tasks: List[CrawlTask]) -> int:
+        def insert(conn: sqlite3.Connection) -> int:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO crawl_task (task_id, platform, crawler_type, target, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(task.task_id, task.platform, task.crawler_type, task.target, STATUS_READY) for task in tasks])
+            return cursor.rowcount
+
+        return await self._run(insert)
+
+    async def lease(self, platform: str, crawler_type: str, count: int,
+                    visibility_timeout: float) -> List[CrawlTask]:
+        def lease_tasks(conn: sqlite3.Connection) -> List[CrawlTask]:
+            now = time.time()
+            conn.execute(
+                "UPDATE crawl_task SET "
+                "status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "last_error = CASE WHEN attempts >= ? THEN 'lease expired' ELSE last_error END "
+                "WHERE platform = ? AND crawler_type = ? AND status = ? AND lease_until <= ?",
+                (self.max_attempts, STATUS_DEAD, STATUS_READY, self.max_attempts,
+                 platform, crawler_type, STATUS_LEASED, now))
+            rows = conn.execute(
+                "SELECT platform, crawler_type, target, attempts, last_error, task_id FROM crawl_task "
+                "WHERE platform = ? AND crawler_type = ? AND status = ? ORDER BY rowid LIMIT ?",
+                (platform, crawler_type, STATUS_READY, count)).fetchall()
+            conn.executemany(
+                "UPDATE crawl_task SET status = ?, attempts = attempts + 1, lease_until = ? WHERE task_id = ?",
+                [(STATUS_LEASED, now + visibility_timeout, row[5]) for row in rows])
+            leased = [self._to_task(row) for row in rows]
+            for task in leased:
+                task.attempts += 1
+            return leased
+
+        return await self._run(lease_tasks)
+
+    async def extend(self, tasks: List[CrawlTask], visibility_timeout: float) -> None:
+        def update(conn: sqlite3.Connection):
+            conn.executemany(
+                "UPDATE crawl_task SET lease_until = ? WHERE task_id = ? AND status = ?",
+                [(time.time() + visibility_timeout, task.task_id, STATUS_LEASED) for task in tasks])
+
+        await self._run(update)
+
+    async def ack(self, tasks: List[CrawlTask]) -> None:
+        def update(conn: sqlite3.Connection):
+            conn.executemany("UPDATE crawl_task SET status = ?, last_error = '' WHERE task_id = ?",
+                             [(STATUS_DONE, task.task_id) for task in tasks])
+
+        await self._run(update)
+
+    async def nack(self, tasks: List[CrawlTask], error: str) -> None:
+        def update(conn: sqlite3.Connection):
+            # 只处理仍在租约中的任务，已经超时被重新分配的任务由新的 worker 负责
+            conn.executemany(
+                "UPDATE crawl_task SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, last_error = ? "
+                "WHERE task_id = ? AND status = ?",
+                [(self.max_attempts, STATUS_DEAD, STATUS_READY, error, task.task_id, STATUS_LEASED)
+                 for task in tasks])
+
+        await self._run(update)
+
+    async def dead_letters(self, platform: str, crawler_type: str) -> List[CrawlTask]:
+        def select(conn: sqlite3.Connection) -> List[CrawlTask]:
+            rows = conn.execute(
+                "SELECT platform, crawler_type, target, attempts, last_error FROM crawl_task "
+                "WHERE platform = ? AND crawler_type = ? AND status = ? ORDER BY rowid",
+                (platform, crawler_type, STATUS_DEAD)).fetchall()
+            return [self._to_task(row) for row in rows]
+
+        return await self._run(select)
+
+    async def requeue_dead_letters(self, platform: str, crawler_type: str) -> int:
+        def update(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                "UPDATE crawl_task SET status = ?, attempts = 0 WHERE platform = ? AND crawler_type = ? AND status = ?",
+                (STATUS_READY, platform, crawler_type, STATUS_DEAD)).rowcount
+
+        return await self._run(update)
+
+    async def stats(self, platform: str, crawler_type: str) -> Dict[str, int]:
+        def select(conn: sqlite3.Connection) -> Dict[str, int]:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM crawl_task WHERE platform = ? AND crawler_type = ? GROUP BY status",
+                (platform, crawler_type)).fetchall()
+            result = {status: 0 for status in (STATUS_READY, STATUS_LEASED, STATUS_DEAD, STATUS_DONE)}
+            result.update(dict(rows))
+            return result
+
+        return await self._run(select)
+
+    async def close(self) -> None:
+        self._conn.close()
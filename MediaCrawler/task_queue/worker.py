@@ -0,0 +1,164 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : 队列 worker：按 (平台, 爬取类型) 批量领取任务，写入对应的配置项后运行一次爬虫，
+#            一批任务共用一次浏览器启动和登录；运行期间定时延长租约，
+#            爬虫通过 mark_target_crawled 报告拿到数据的目标，只确认这些任务，其余任务退回重试
+
+import asyncio
+from typing import TYPE_CHECKING, Callable, Dict, List, Set, Tuple
+
+import config
+from tools import utils
+from var import crawled_targets_var
+
+from .abs_queue import AbstractTaskQueue, CrawlTask
+from .queue_factory import TaskQueueFactory
+
+if TYPE_CHECKING:
+    from base.base_crawler import AbstractCrawler
+
+# (平台, 爬取类型) -> 任务目标写入的配置项，search 类型写入 KEYWORDS
+TARGET_CONFIG_NAMES: Dict[Tuple[str, str], str] = {
+    ("xhs", "detail"): "XHS_SPECIFIED_NOTE_URL_LIST",
+    ("xhs", "creator"): "XHS_CREATOR_ID_LIST",
+    ("dy", "detail"): "DY_SPECIFIED_ID_LIST",
+    ("dy", "creator"): "DY_CREATOR_ID_LIST",
+    ("ks", "detail"): "KS_SPECIFIED_ID_LIST",
+    ("ks", "creator"): "KS_CREATOR_ID_LIST",
+    ("bili", "detail"): "BILI_SPECIFIED_ID_LIST",
+    ("bili", "creator"): "BILI_CREATOR_ID_LIST",
+    ("wb", "detail"): "WEIBO_SPECIFIED_ID_LIST",
+    ("wb", "creator"): "WEIBO_CREATOR_ID_LIST",
+    ("tieba", "detail"): "TIEBA_SPECIFIED_ID_LIST",
+    ("tieba", "creator"): "TIEBA_CREATOR_URL_LIST",
+    ("zhihu", "detail"): "ZHIHU_SPECIFIED_ID_LIST",
+    ("zhihu", "creator"): "ZHIHU_CREATOR_URL_LIST",
+}
+
+
+def get_config_targets(platform: str, crawler_type: str) -> List[str]:
+    """
+    读取配置中的任务目标，用于把现有配置批量入队
+    :param platform: 平台
+    :param crawler_type: 爬取类型
+    :return:
+    """
+    if crawler_type == "search":
+        return [keyword.strip() for keyword in config.KEYWORDS.split(",") if keyword.strip()]
+    config_name = TARGET_CONFIG_NAMES.get((platform, crawler_type))
+    if not config_name:
+        raise ValueError(f"Unsupported task type: {platform} {crawler_type}")
+    return [str(target) for target in getattr(config, config_name)]
+
+
+def apply_config_targets(tasks: List[CrawlTask]) -> None:
+    """
+    把领取到的任务写入配置项，爬虫按原有逻辑读取配置
+    :param tasks: 同一 (平台, 爬取类型) 的任务
+    :return:
+    """
+    platform, crawler_type = tasks[0].platform, tasks[0].crawler_type
+    targets = [task.target for task in tasks]
+    config.PLATFORM = platform
+    config.CRAWLER_TYPE = crawler_type
+    if crawler_type == "search":
+        config.KEYWORDS = ",".join(targets)
+        return
+    config_name = TARGET_CONFIG_NAMES.get((platform, crawler_type))
+    if not config_name:
+        raise ValueError(f"Unsupported task type: {platform} {crawler_type}")
+    setattr(config, config_name, targets)
+
+
+def mark_target_crawled(target) -> None:
+    """
+    爬虫拿到某个目标（关键词、内容 id/链接、创作者 id/链接）的数据后调用，不在队列模式下运行时不做任何事
+    :param target: 配置项中的目标
+    :return:
+    """
+    crawled_targets = crawled_targets_var.get()
+    if crawled_targets is not None:
+        crawled_targets.add(str(target))
+
+
+async def _keep_leases(task_queue: AbstractTaskQueue, tasks: List[CrawlTask], visibility_timeout: float):
+    # 每 1/3 个超时时间续租一次，单次续租失败不会导致租约过期
+    while True:
+        await asyncio.sleep(visibility_timeout / 3)
+        try:
+            await task_queue.extend(tasks, visibility_timeout)
+        except Exception as e:
+            utils.logger.warning(f"[task_queue.worker._keep_leases] extend leases error: {e}")
+
+
+async def run_batch(task_queue: AbstractTaskQueue, tasks: List[CrawlTask],
+                    create_crawler: Callable[[], "AbstractCrawler"]) -> bool:
+    """
+    运行一批任务，爬虫拿到数据的任务确认完成，其余任务（如登录失败、接口报错后爬虫正常返回）退回
+    :param task_queue: 任务队列
+    :param tasks: 已领取的任务
+    :param create_crawler: 创建爬虫的函数，每批任务创建一个新的爬虫
+    :return: 是否所有任务都拿到了数据
+    """
+    apply_config_targets(tasks)
+    crawled_targets: Set[str] = set()
+    # 爬虫内部创建的协程任务会复制上下文，共享同一个集合
+    token = crawled_targets_var.set(crawled_targets)
+    keep_leases_task = asyncio.create_task(
+        _keep_leases(task_queue, tasks, config.TASK_QUEUE_VISIBILITY_TIMEOUT_SEC))
+    try:
+        await create_crawler().start()
+    except asyncio.CancelledError:
+        # worker 退出时立即退回任务，不必等租约超时
+        await task_queue.nack(tasks, "worker cancelled")
+        raise
+    except Exception as e:
+        utils.logger.error(f"[task_queue.worker.run_batch] run {len(tasks)} tasks error: {e}")
+        await task_queue.nack(tasks, repr(e))
+        return False
+    finally:
+        keep_leases_task.cancel()
+        crawled_targets_var.reset(token)
+
+    done_tasks = [task for task in tasks if task.target in crawled_targets]
+    failed_tasks = [task for task in tasks if task.target not in crawled_targets]
+    if done_tasks:
+        await task_queue.ack(done_tasks)
+    if failed_tasks:
+        utils.logger.warning(f"[task_queue.worker.run_batch] no data crawled for "
+                             f"{[task.target for task in failed_tasks]}, return them to the queue")
+        await task_queue.nack(failed_tasks, "no data crawled")
+    return not failed_tasks
+
+
+async def run_queue_worker(create_crawler: Callable[[], "AbstractCrawler"]) -> None:
+    """
+    循环领取 config.PLATFORM 和 config.CRAWLER_TYPE 对应队列的任务并运行
+    :param create_crawler: 创建爬虫的函数
+    :return:
+    """
+    platform, crawler_type = config.PLATFORM, config.CRAWLER_TYPE
+    task_queue = TaskQueueFactory.create_task_queue()
+    try:
+        while True:
+            tasks = await task_queue.lease(platform, crawler_type, config.TASK_QUEUE_LEASE_BATCH_SIZE,
+                                           config.TASK_QUEUE_VISIBILITY_TIMEOUT_SEC)
+            if not tasks:
+                if config.TASK_QUEUE_EXIT_WHEN_EMPTY:
+                    utils.logger.info(f"[task_queue.worker.run_queue_worker] queue {platform}:{crawler_type} is empty, exit")
+                    return
+                await asyncio.sleep(config.TASK_QUEUE_POLL_INTERVAL_SEC)
+                continue
+            utils.logger.info(f"[task_queue.worker.run_queue_worker] leased {len(tasks)} tasks: "
+                              f"{[task.target for task in tasks]}")
+            await run_batch(task_queue, tasks, create_crawler)
+    finally:
+        await task_queue.close()
@@ -0,0 +1,68 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 对比每次签名都读取 localStorage 与使用 WbiKeyManager 缓存 key 时，每秒能完成的 wbi 签名次数
+#            用一个模拟往返延迟的假页面代替 playwright，不访问任何真实平台
+#            用法（在项目根目录执行）：python -m test.benchmark_bilibili_wbi_sign --requests 2000 --latency-ms 2
+
+import argparse
+import asyncio
+import time
+
+from media_platform.bilibili.client import BilibiliClient
+from media_platform.bilibili.help import BilibiliSign
+
+
+class FakePage:
+    """模拟 page.evaluate 读取 localStorage 的一次浏览器往返"""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    async def evaluate(self, expression: str):
+        await asyncio.sleep(self.latency_s)
+        return {
+            "wbi_img_urls": "https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png-"
+                            "https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png"
+        }
+
+
+async def sign_without_cache(client: BilibiliClient, req_data):
+    """改造前的写法：每次签名都读取 key 并重新计算 mixin key"""
+    img_key, sub_key = await client.get_wbi_keys()
+    return BilibiliSign(img_key, sub_key).sign(req_data)
+
+
+async def run_benchmark(sign_func, total: int) -> float:
+    start = time.perf_counter()
+    for i in range(total):
+        await sign_func({"keyword": "编程", "page": i, "search_type": "video"})
+    return total / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="bilibili wbi sign benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=2, help="simulated page.evaluate round trip")
+    args = parser.parse_args()
+
+    client = BilibiliClient(headers={}, playwright_page=FakePage(args.latency_ms / 1000), cookie_dict={})
+    before = await run_benchmark(lambda data: sign_without_cache(client, data), args.requests)
+    after = await run_benchmark(client.pre_request_data, args.requests)
+
+    print(f"requests: {args.requests}, simulated evaluate latency: {args.latency_ms}ms")
+    print(f"fetch keys on every sign: {before:10.1f} signs/s")
+    print(f"WbiKeyManager cached:     {after:10.1f} signs/s ({after / before:.1f}x)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
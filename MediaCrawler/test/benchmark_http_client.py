@@ -0,0 +1,110 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 对比每次请求新建 httpx.AsyncClient 与复用长连接客户端的吞吐量
+#            在本地起一个返回固定 JSON 的桩服务器，不访问任何真实平台
+#            用法（在项目根目录执行）：python -m test.benchmark_http_client --requests 500 --concurrency 10
+
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import httpx
+from playwright.async_api import BrowserContext
+
+from base.base_crawler import AbstractApiClient
+
+STUB_BODY = b'{"code": 0, "message": "0", "data": {}}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 才会保持连接，否则每个请求都会被服务端断开
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_BODY)))
+        self.end_headers()
+        self.wfile.write(STUB_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledClient(AbstractApiClient):
+    """与各平台客户端一样，通过 get_http_client 复用连接池"""
+
+    def __init__(self):
+        self.proxies = None
+
+    async def request(self, method, url, **kwargs) -> Dict:
+        response = await self.get_http_client(self.proxies).request(method, url, timeout=10, **kwargs)
+        return response.json()
+
+    async def update_cookies(self, browser_context: BrowserContext):
+        pass
+
+
+class PerRequestClient(PooledClient):
+    """改造前的写法：每次请求新建并关闭一个 httpx.AsyncClient"""
+
+    async def request(self, method, url, **kwargs) -> Dict:
+        async with httpx.AsyncClient(proxies=self.proxies) as client:
+            response = await client.request(method, url, timeout=10, **kwargs)
+        return response.json()
+
+
+async def run_benchmark(client: PooledClient, url: str, total: int, concurrency: int) -> float:
+    """
+    用 concurrency 个协程发出 total 个请求
+    :return: 每秒请求数
+    """
+    counter = iter(range(total))
+
+    async def worker():
+        for _ in counter:
+            await client.request("GET", url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return total / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="httpx client pooling benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/x/web-interface/view"
+
+    try:
+        before = await run_benchmark(PerRequestClient(), url, args.requests, args.concurrency)
+        after = await run_benchmark(PooledClient(), url, args.requests, args.concurrency)
+    finally:
+        server.shutdown()
+
+    print(f"requests: {args.requests}, concurrency: {args.concurrency}")
+    print(f"one client per request: {before:8.1f} req/s")
+    print(f"pooled keep-alive client: {after:8.1f} req/s ({after / before:.1f}x)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
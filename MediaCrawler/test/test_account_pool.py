@@ -0,0 +1,75 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多账号池
+import asyncio
+from unittest import IsolatedAsyncioTestCase, mock
+
+from media_platform.zhihu.client import ZhiHuClient
+from tools.account_pool import Account, AccountPool, AccountUnavailableError
+
+
+def create_pool(count: int, max_strikes: int = 3) -> AccountPool:
+    accounts = [Account(f"account_{i}", f"a1=a1_{i}; web_session=session_{i}") for i in range(count)]
+    return AccountPool(accounts, cooldown_sec=600, max_strikes=max_strikes)
+
+
+class TestAccountPool(IsolatedAsyncioTestCase):
+    async def test_tasks_spread_across_accounts(self):
+        pool = create_pool(3)
+
+        async def worker():
+            first = pool.current()
+            await asyncio.sleep(0)
+            # 同一个任务的后续请求沿用同一个账号
+            self.assertIs(pool.current(), first)
+            return first.name
+
+        # 父任务已绑定的账号不会被子任务继承
+        pool.current()
+        names = await asyncio.gather(*[worker() for _ in range(3)])
+        self.assertEqual(sorted(names), ["account_0", "account_1", "account_2"])
+        self.assertEqual(pool.accounts[0].cookie_dict["a1"], "a1_0")
+
+    async def test_risk_control_cools_down_and_retires(self):
+        pool = create_pool(2, max_strikes=2)
+        account = pool.current()
+        pool.report_risk(account)
+        self.assertGreater(account.cooldown_until, 0)
+        # 冷却中的账号不再使用，当前任务换到另一个账号
+        other = pool.current()
+        self.assertIsNot(other, account)
+        pool.report_risk(account)
+        self.assertTrue(account.retired)
+        pool.report_risk(other)
+        pool.report_risk(other)
+        with self.assertRaises(AccountUnavailableError):
+            pool.current()
+
+    async def test_health_check_retires_invalid_accounts(self):
+        pool = create_pool(3)
+
+        async def pong() -> bool:
+            return pool.current().name != "account_1"
+
+        await pool.health_check(pong)
+        self.assertEqual([account.retired for account in pool.accounts], [False, True, False])
+
+    async def test_zhihu_signs_with_bound_account_cookie(self):
+        accounts = [Account(f"account_{i}", f"d_c0=d_c0_{i}; z_c0=z_c0_{i}") for i in range(2)]
+        client = ZhiHuClient(headers={"cookie": "d_c0=default"}, playwright_page=None,
+                             cookie_dict={"d_c0": "default"})
+        client.account_pool = AccountPool(accounts, cooldown_sec=600, max_strikes=3)
+        sign = mock.AsyncMock(return_value={"x-zst-81": "", "x-zse-96": ""})
+        with mock.patch("media_platform.zhihu.client.sign", sign):
+            await client._pre_headers("/api/v4/search_v3")
+        self.assertEqual(sign.call_args.args[1], client.current_account().cookie_str)
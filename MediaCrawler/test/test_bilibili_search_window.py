@@ -0,0 +1,100 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : B站搜索时间窗口自适应切分
+
+import asyncio
+import unittest
+
+from media_platform.bilibili.help import split_search_windows
+
+DAY = 86400
+
+
+class TestSplitSearchWindows(unittest.TestCase):
+
+    def setUp(self):
+        # 第 0 天 2500 条视频，第 1-8 天没有视频，第 9 天 30 条视频
+        self.pubtimes = [i * DAY // 2500 for i in range(2500)] + [9 * DAY + i * 60 for i in range(30)]
+        self.probes = []
+
+    async def probe(self, begin_s, end_s):
+        self.probes.append((begin_s, end_s))
+        count = sum(1 for t in self.pubtimes if begin_s <= t <= end_s)
+        num_results = min(count, 1000)
+        return {
+            "numResults": num_results,
+            "numPages": (num_results + 19) // 20,
+            "result": [{"aid": i} for i in range(min(count, 20))],
+        }
+
+    def collect(self, begin_s, end_s):
+        async def run():
+            return [window async for window in split_search_windows(self.probe, begin_s, end_s)]
+        return asyncio.run(run())
+
+    def test_windows_cover_all_results_under_cap(self):
+        windows = self.collect(0, 10 * DAY - 1)
+        total = 0
+        for begin_s, end_s, first_page in windows:
+            self.assertLess(first_page["numResults"], 1000)
+            total += first_page["numResults"]
+        self.assertEqual(total, len(self.pubtimes))
+
+    def test_windows_are_ordered_and_disjoint(self):
+        windows = self.collect(0, 10 * DAY - 1)
+        for (_, prev_end, _), (next_begin, _, _) in zip(windows, windows[1:]):
+            self.assertLess(prev_end, next_begin)
+
+    def test_sparse_range_is_not_split(self):
+        windows = self.collect(DAY, 10 * DAY - 1)
+        self.assertEqual(len(windows), 1)
+        self.assertEqual(len(self.probes), 1)
+
+    def test_empty_range_yields_nothing(self):
+        self.assertEqual(self.collect(2 * DAY, 8 * DAY), [])
+
+    def test_failed_probe_retried(self):
+        failures = {(DAY, 10 * DAY - 1): 2}
+
+        async def flaky_probe(begin_s, end_s):
+            if failures.get((begin_s, end_s)):
+                failures[(begin_s, end_s)] -= 1
+                raise RuntimeError("network error")
+            return await self.probe(begin_s, end_s)
+
+        async def run():
+            return [window async for window in
+                    split_search_windows(flaky_probe, DAY, 10 * DAY - 1, probe_retry_wait_s=0)]
+
+        windows = asyncio.run(run())
+        self.assertEqual([first_page["numResults"] for _, _, first_page in windows], [30])
+
+    def test_probe_error_raised_after_retries(self):
+        attempts = []
+
+        async def broken_probe(begin_s, end_s):
+            attempts.append((begin_s, end_s))
+            raise RuntimeError("network error")
+
+        async def run():
+            return [window async for window in
+                    split_search_windows(broken_probe, 0, 10 * DAY - 1, probe_retry_times=3, probe_retry_wait_s=0)]
+
+        # 探测一直失败时抛出异常，而不是跳过这个时间窗口
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run())
+        self.assertEqual(len(attempts), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : B站 wbi 签名 key 缓存
+
+import asyncio
+import unittest
+
+from media_platform.bilibili.help import BilibiliSign, WbiKeyManager
+
+IMG_KEY = "7cd084941338484aae1ad9425b84077c"
+SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+
+
+class TestWbiKeyManager(unittest.TestCase):
+
+    def setUp(self):
+        self.fetch_count = 0
+
+    async def fetch_keys(self):
+        self.fetch_count += 1
+        await asyncio.sleep(0.01)
+        return IMG_KEY, SUB_KEY
+
+    def test_salt_matches_reference(self):
+        # 参考 bilibili-API-collect 文档中的示例
+        self.assertEqual(BilibiliSign(IMG_KEY, SUB_KEY).get_salt(), "ea1db124af3c7062474693fa704f4ff8")
+
+    def test_concurrent_signs_fetch_keys_once(self):
+        manager = WbiKeyManager(self.fetch_keys, ttl_s=3600)
+
+        async def run():
+            return await asyncio.gather(*[manager.sign({"keyword": str(i)}) for i in range(20)])
+
+        results = asyncio.run(run())
+        self.assertEqual(self.fetch_count, 1)
+        self.assertTrue(all("w_rid" in item for item in results))
+
+    def test_expired_keys_refresh_in_background(self):
+        manager = WbiKeyManager(self.fetch_keys, ttl_s=0)
+
+        async def run():
+            await manager.sign({"a": 1})
+            # 过期后立即用旧 key 返回，不等待刷新
+            signer = await manager.get_signer()
+            self.assertEqual(self.fetch_count, 1)
+            await asyncio.sleep(0.05)
+            return signer
+
+        self.assertIsNotNone(asyncio.run(run()))
+        self.assertEqual(self.fetch_count, 2)
+
+    def test_invalidate_forces_refetch(self):
+        manager = WbiKeyManager(self.fetch_keys, ttl_s=3600)
+
+        async def run():
+            await manager.sign({"a": 1})
+            manager.invalidate()
+            await manager.sign({"a": 1})
+
+        asyncio.run(run())
+        self.assertEqual(self.fetch_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
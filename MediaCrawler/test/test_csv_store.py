@@ -0,0 +1,68 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : csv 缓冲写入
+
+import asyncio
+import csv
+import os
+import tempfile
+import unittest
+
+from store.csv_store import CsvStore
+
+
+class TestCsvStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.tmp_dir.name, "bilibili", "1_search_comments_2024-01-14.csv")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read_rows(self):
+        with open(self.file_name, encoding="utf-8-sig", newline="") as file:
+            return list(csv.reader(file))
+
+    def test_rows_buffered_until_batch_size(self):
+        store = CsvStore(batch_size=3, flush_interval=3600)
+
+        async def run():
+            for i in range(2):
+                await store.append(self.file_name, {"comment_id": i, "content": "评论"})
+            # 2 行，未达到批量大小
+            self.assertEqual(os.path.getsize(self.file_name), 0)
+            await store.append(self.file_name, {"comment_id": 2, "content": "评论"})
+            self.assertEqual(len(self.read_rows()), 4)
+            await store.append(self.file_name, {"comment_id": 3, "content": "评论"})
+            await store.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.read_rows()[0], ["comment_id", "content"])
+        self.assertEqual(len(self.read_rows()), 5)
+
+    def test_header_written_once_across_runs(self):
+        async def run():
+            store = CsvStore(batch_size=100, flush_interval=3600)
+            await store.append(self.file_name, {"comment_id": 1})
+            await store.close()
+
+        asyncio.run(run())
+        asyncio.run(run())
+        self.assertEqual(self.read_rows(), [["comment_id"], ["1"], ["1"]])
+        with open(self.file_name, "rb") as file:
+            self.assertEqual(file.read().count(b"\xef\xbb\xbf"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
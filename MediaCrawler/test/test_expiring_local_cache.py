@@ -19,6 +19,7 @@ import time
 import unittest
 
 from cache.local_cache import ExpiringLocalCache
+from proxy.base_proxy import IpCache
 
 
 class TestExpiringLocalCache(unittest.TestCase):
@@ -42,6 +43,59 @@ class TestExpiringLocalCache(unittest.TestCase):
         time.sleep(12)
         self.assertIsNone(self.cache.get('key'))
 
+    def test_lru_eviction(self):
+        cache = ExpiringLocalCache(cron_interval=10, max_entries=2)
+        cache.set('a', 1, 10)
+        cache.set('b', 2, 10)
+        cache.get('a')
+        cache.set('c', 3, 10)
+        # b 最久未使用，被淘汰
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_expired_keys_evicted_before_lru(self):
+        cache = ExpiringLocalCache(cron_interval=10, max_entries=2)
+        cache.set('a', 1, 10)
+        cache.set('b', 2, 0)
+        time.sleep(0.01)
+        cache.set('c', 3, 10)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 0)
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_namespace_quota(self):
+        cache = ExpiringLocalCache(cron_interval=10, namespace_quotas={'ip_pool': 2})
+        for i in range(3):
+            cache.set(f'ip_pool:{i}', i, 10)
+        cache.set('other:0', 0, 10)
+        self.assertEqual(sorted(cache.keys('ip_pool:*')), ['ip_pool:1', 'ip_pool:2'])
+        self.assertEqual(cache.keys('other:*'), ['other:0'])
+
+    def test_namespace_index_with_ip_cache_keys(self):
+        cache = ExpiringLocalCache(cron_interval=10, namespace_sep='_')
+        cache.set('kuaidaili_127.0.0.1_8080', 1, 10)
+        cache.set('kuaidaili_127.0.0.2_8080', 2, 10)
+        cache.set('JISUHTTP_127.0.0.3_8080_u_p', 3, 10)
+        # IpCache 的 key 按代理商分到各自的命名空间，前缀查询只查找该命名空间
+        self.assertEqual(sorted(cache._namespaces), ['JISUHTTP', 'kuaidaili'])
+        self.assertEqual(sorted(cache.keys('kuaidaili_*')), ['kuaidaili_127.0.0.1_8080', 'kuaidaili_127.0.0.2_8080'])
+        self.assertEqual(IpCache().cache_client.local_cache._namespace_sep, '_')
+
+    def test_keys_skip_expired(self):
+        self.cache.set('ip_pool:1', 'value', 10)
+        self.cache.set('ip_pool:2', 'value', 0)
+        time.sleep(0.01)
+        self.assertEqual(self.cache.keys('ip_pool*'), ['ip_pool:1'])
+        self.assertEqual(self.cache.keys('*pool*'), ['ip_pool:1'])
+
+    def test_stats(self):
+        self.cache.set('key', 'value', 10)
+        self.cache.get('key')
+        self.cache.get('missing')
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (1, 1, 1))
+
     def tearDown(self):
         del self.cache
 
@@ -0,0 +1,65 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻 node 签名进程池
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Any, Sequence, Tuple
+from unittest import IsolatedAsyncioTestCase, mock
+
+from tools.js_sign_pool import JsSignPool, JsSignWorker, SignError
+
+
+@unittest.skipIf(shutil.which("node") is None, "node is not installed")
+class TestJsSignPool(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.script_path = os.path.join(self.tmp_dir.name, "sign.js")
+        with open(self.script_path, "w", encoding="utf-8") as file:
+            file.write("function get_sign(url, cookie) { return url + '|' + cookie; }\n"
+                       "function broken() { throw new Error('broken sign'); }\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_concurrent_calls_batched(self):
+        pool = JsSignPool(self.script_path, size=2)
+        batch_sizes = []
+        submit = JsSignWorker.submit
+
+        async def record_submit(worker: JsSignWorker, fn: str, batch: Sequence[Tuple[Sequence[Any], asyncio.Future]]):
+            batch_sizes.append(len(batch))
+            await submit(worker, fn, batch)
+
+        with mock.patch.object(JsSignWorker, "submit", record_submit):
+            results = await asyncio.gather(*[pool.call("get_sign", f"/api/{i}", "a=1") for i in range(10)])
+        self.assertEqual(results, [f"/api/{i}|a=1" for i in range(10)])
+        # 同一轮事件循环内的 10 次调用合并成一次提交
+        self.assertEqual(batch_sizes, [10])
+        await pool.close()
+
+    async def test_error_only_fails_its_call(self):
+        pool = JsSignPool(self.script_path, size=1)
+        ok, failed = await asyncio.gather(pool.call("get_sign", "/api", "a=1"), pool.call("broken"),
+                                          return_exceptions=True)
+        self.assertEqual(ok, "/api|a=1")
+        self.assertIsInstance(failed, SignError)
+        await pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
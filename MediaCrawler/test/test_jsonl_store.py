@@ -0,0 +1,86 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : jsonl 存储与压实
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+from store.jsonl_store import JsonlStore, compact_jsonl_file, iter_jsonl
+
+
+class TestJsonlStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.tmp_dir.name, "search_comments_2024-01-14.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @mock.patch.object(config, "JSONL_COMPACT_ON_CLOSE", True)
+    def test_append_and_compact_on_close(self):
+        store = JsonlStore(fsync_interval=3600)
+
+        async def run():
+            for i in range(3):
+                await store.append(self.file_name, {"comment_id": str(i), "content": "评论"})
+            await store.close()
+
+        asyncio.run(run())
+        self.assertEqual([item["comment_id"] for item in iter_jsonl(self.file_name)], ["0", "1", "2"])
+        with open(self.file_name[:-1], encoding="utf-8") as file:
+            self.assertEqual(len(json.load(file)), 3)
+
+    @mock.patch.object(config, "JSONL_COMPACT_ON_CLOSE", False)
+    def test_reopen_appends_to_existing_file(self):
+
+        async def run():
+            for i in range(2):
+                store = JsonlStore(fsync_interval=0)
+                await store.append(self.file_name, {"comment_id": str(i)})
+                await store.close()
+
+        asyncio.run(run())
+        self.assertEqual(len(list(iter_jsonl(self.file_name))), 2)
+        self.assertFalse(os.path.exists(self.file_name[:-1]))
+
+    @mock.patch.object(config, "JSONL_COMPACT_ON_CLOSE", True)
+    def test_compact_keeps_legacy_json(self):
+        # 当天先用 json 模式写过数据
+        with open(self.file_name[:-1], "w", encoding="utf-8") as file:
+            json.dump([{"comment_id": "a"}, {"comment_id": "b"}], file, ensure_ascii=False, indent=4)
+
+        async def run():
+            for i in range(2):
+                store = JsonlStore(fsync_interval=3600)
+                await store.append(self.file_name, {"comment_id": str(i)})
+                await store.close()
+
+        asyncio.run(run())
+        with open(self.file_name[:-1], encoding="utf-8") as file:
+            self.assertEqual([item["comment_id"] for item in json.load(file)], ["a", "b", "0", "1"])
+
+    def test_compact_skips_broken_line(self):
+        with open(self.file_name, "w", encoding="utf-8") as file:
+            file.write('{"comment_id": "1"}\n{"comment_id": "2"}\n{"comment_')
+        with open(compact_jsonl_file(self.file_name), encoding="utf-8") as file:
+            self.assertEqual(json.load(file), [{"comment_id": "1"}, {"comment_id": "2"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
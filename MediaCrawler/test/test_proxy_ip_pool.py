@@ -13,9 +13,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 14:42
 # @Desc    :
+import time
+from typing import Dict, List, Optional
 from unittest import IsolatedAsyncioTestCase
 
-from proxy.proxy_ip_pool import create_ip_pool
+from proxy.base_proxy import IpGetError, ProxyProvider
+from proxy.proxy_ip_pool import ProxyIpPool, create_ip_pool
 from proxy.types import IpInfoModel
 
 
@@ -28,3 +31,78 @@ class TestIpPool(IsolatedAsyncioTestCase):
             print(ip_proxy_info)
             self.assertIsNotNone(ip_proxy_info.ip, msg="验证 ip 是否获取成功")
 
+
+class FakeProvider(ProxyProvider):
+    def __init__(self, expired_time_ts: Optional[Dict[int, int]] = None):
+        self.next_port = 8000
+        self.calls = 0
+        self.expired_time_ts = expired_time_ts or {}
+
+    async def get_proxies(self, num: int) -> List[IpInfoModel]:
+        self.calls += 1
+        proxies = []
+        for _ in range(num):
+            self.next_port += 1
+            proxies.append(IpInfoModel(ip="127.0.0.1", port=self.next_port, user="", password="",
+                                       expired_time_ts=self.expired_time_ts.get(self.next_port, 0)))
+        return proxies
+
+
+class FakeValidatePool(ProxyIpPool):
+    def __init__(self, ip_pool_count: int, latencies: Dict[int, Optional[float]],
+                 expired_time_ts: Optional[Dict[int, int]] = None):
+        super().__init__(ip_pool_count=ip_pool_count, enable_validate_ip=True,
+                         ip_provider=FakeProvider(expired_time_ts))
+        self.latencies = latencies
+
+    async def _validate_proxy(self, proxy: IpInfoModel) -> Optional[float]:
+        return self.latencies.get(proxy.port, 0.1)
+
+
+class TestProxyScoring(IsolatedAsyncioTestCase):
+    async def test_invalid_proxies_not_handed_out(self):
+        pool = FakeValidatePool(ip_pool_count=3, latencies={8002: None})
+        await pool.load_proxies()
+        self.assertEqual(sorted(proxy.port for proxy in pool.proxy_list), [8001, 8003])
+        for _ in range(20):
+            self.assertNotEqual((await pool.get_proxy()).port, 8002)
+        await pool.close()
+
+    async def test_prefers_faster_proxy(self):
+        pool = FakeValidatePool(ip_pool_count=2, latencies={8001: 5.0, 8002: 0.1})
+        await pool.load_proxies()
+        ports = [(await pool.get_proxy()).port for _ in range(200)]
+        self.assertGreater(ports.count(8002), ports.count(8001))
+        await pool.close()
+
+    async def test_blocked_proxy_quarantined_and_refilled(self):
+        pool = FakeValidatePool(ip_pool_count=1, latencies={})
+        await pool.load_proxies()
+        proxy = await pool.get_proxy()
+        pool.report_result(proxy, success=False, blocked=True)
+        self.assertEqual(pool.proxy_list, [])
+        # 后台补充一个新的代理，隔离中的代理不会被重新验证
+        await pool._refill_task
+        self.assertEqual([p.port for p in pool.proxy_list], [8002])
+        self.assertNotEqual((await pool.get_proxy()).port, proxy.port)
+        await pool.close()
+
+    async def test_no_proxy_raises(self):
+        pool = FakeValidatePool(ip_pool_count=1, latencies={8001: None})
+        with self.assertRaises(IpGetError):
+            await pool.get_proxy()
+
+    async def test_expired_proxies_dropped(self):
+        now = int(time.time())
+        # 8001 已过期，8002 在安全余量内即将过期，都不会进入可用列表
+        pool = FakeValidatePool(ip_pool_count=3, latencies={},
+                                expired_time_ts={8001: now - 1, 8002: now + 1, 8003: now + 3600})
+        await pool.load_proxies()
+        self.assertEqual([proxy.port for proxy in pool.proxy_list], [8003])
+
+        # 可用列表里的代理到期后，get_proxy 丢弃它并等待补充新的代理
+        pool.proxy_list[0].expired_time_ts = now - 1
+        proxy = await pool.get_proxy()
+        self.assertNotEqual(proxy.port, 8003)
+        self.assertNotIn("127.0.0.1:8003", pool._stats)
+        await pool.close()
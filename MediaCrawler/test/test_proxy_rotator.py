@@ -0,0 +1,166 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 请求级代理轮换与封禁后换代理重发
+import asyncio
+from typing import Dict, List, Optional
+from unittest import IsolatedAsyncioTestCase, mock
+
+import httpx
+
+import config
+from base.base_crawler import BLOCKED_BODY_MAX_BYTES, AbstractApiClient
+from proxy.base_proxy import ProxyProvider
+from proxy.proxy_ip_pool import ProxyIpPool
+from proxy.proxy_rotator import ProxyRotator
+from proxy.types import IpInfoModel
+
+
+class FakeProvider(ProxyProvider):
+    def __init__(self):
+        self.next_port = 8000
+
+    async def get_proxies(self, num: int) -> List[IpInfoModel]:
+        proxies = []
+        for _ in range(num):
+            self.next_port += 1
+            proxies.append(IpInfoModel(ip="127.0.0.1", port=self.next_port, user="", password="", expired_time_ts=0))
+        return proxies
+
+
+class FakeClient(AbstractApiClient):
+    def __init__(self, blocked_ports: List[int]):
+        self.blocked_ports = blocked_ports
+        self.used_ports: List[int] = []
+
+    async def request(self, method, url, **kwargs):
+        return await self.send_request(method, url, **kwargs)
+
+    async def update_cookies(self, browser_context):
+        pass
+
+    def get_http_client(self, proxies: Optional[Dict] = None) -> httpx.AsyncClient:
+        port = int(list(proxies.values())[0].rsplit(":", 1)[1])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.used_ports.append(port)
+            if port in self.blocked_ports:
+                return httpx.Response(461)
+            return httpx.Response(200, json={"ok": 1})
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class PooledClient(AbstractApiClient):
+    """使用基类按代理缓存的连接池"""
+
+    async def request(self, method, url, **kwargs):
+        return await self.send_request(method, url, **kwargs)
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+async def create_pool(count: int) -> ProxyIpPool:
+    pool = ProxyIpPool(ip_pool_count=count, enable_validate_ip=False, ip_provider=FakeProvider())
+    await pool.load_proxies()
+    return pool
+
+
+class TestProxyRotator(IsolatedAsyncioTestCase):
+    async def test_round_robin_rotates_every_n_requests(self):
+        pool = await create_pool(1)
+        rotator = ProxyRotator(pool, policy="round_robin", rotate_every=2)
+        first = await rotator.acquire()
+        self.assertIs(await rotator.acquire(), first)
+        # 第三个请求重新从代理池取代理
+        pool.report_result(first, success=False, blocked=True)
+        self.assertNotEqual((await rotator.acquire()).port, first.port)
+        await pool.close()
+
+    async def test_blocked_request_retried_on_another_proxy(self):
+        pool = await create_pool(1)
+        client = FakeClient(blocked_ports=[8001])
+        client.proxy_rotator = ProxyRotator(pool, policy="on_block", rotate_every=10)
+        response = await client.request("GET", "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.used_ports, [8001, 8002])
+        # 被封禁的代理已隔离，后续请求继续使用新代理
+        await client.request("GET", "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes")
+        self.assertEqual(client.used_ports, [8001, 8002, 8002])
+        await pool.close()
+
+    async def test_sticky_does_not_failover(self):
+        pool = await create_pool(2)
+        initial = pool.proxy_list[0]
+        client = FakeClient(blocked_ports=[initial.port])
+        client.proxy_rotator = ProxyRotator(pool, policy="sticky", rotate_every=10, initial_proxy=initial)
+        response = await client.request("GET", "https://www.bilibili.com")
+        self.assertEqual(response.status_code, 461)
+        self.assertEqual(client.used_ports, [initial.port])
+        await pool.close()
+
+    async def test_retired_client_closed_after_inflight_requests(self):
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/slow":
+                await release.wait()
+            return httpx.Response(200)
+
+        real_async_client = httpx.AsyncClient
+        created: List[httpx.AsyncClient] = []
+
+        def create_client(**kwargs) -> httpx.AsyncClient:
+            created.append(real_async_client(transport=httpx.MockTransport(handler)))
+            return created[-1]
+
+        client = PooledClient()
+        proxies = [{"http://": f"http://127.0.0.1:{port}"} for port in range(8001, 8005)]
+        with mock.patch.object(httpx, "AsyncClient", side_effect=create_client), \
+                mock.patch.object(config, "IP_PROXY_POOL_COUNT", 1):
+            slow = asyncio.create_task(client.send_request("GET", "https://example.com/slow", proxies=proxies[0]))
+            await asyncio.sleep(0.01)
+            # 只保留 2 个连接池，第一个被淘汰，但上面还有进行中的请求
+            for proxy in proxies[1:]:
+                await client.send_request("GET", "https://example.com/", proxies=proxy)
+            self.assertFalse(created[0].is_closed)
+            self.assertTrue(created[1].is_closed)
+            release.set()
+            await slow
+            self.assertTrue(created[0].is_closed)
+            self.assertEqual(client._retired_http_clients, [])
+            await client.close()
+
+    async def test_retired_clients_not_shared_between_instances(self):
+        first, second = PooledClient(), PooledClient()
+        # 没有创建过连接池时关闭不会碰到其他实例的列表
+        await second.close()
+        with mock.patch.object(config, "IP_PROXY_POOL_COUNT", 1):
+            for port in range(8001, 8004):
+                first.get_http_client({"http://": f"http://127.0.0.1:{port}"})
+        self.assertEqual(len(first._retired_http_clients), 1)
+        self.assertIsNone(second._retired_http_clients)
+        self.assertIsNone(PooledClient._retired_http_clients)
+        await first.close()
+
+    def test_blocked_body_checked_only_for_small_responses(self):
+        client = PooledClient()
+        self.assertTrue(client.is_blocked_response(httpx.Response(461)))
+        self.assertTrue(client.is_blocked_response(httpx.Response(200, content=b"blocked")))
+        self.assertFalse(client.is_blocked_response(httpx.Response(200, json={"ok": 1})))
+        # 媒体和大响应体不检查内容
+        self.assertFalse(client.is_blocked_response(
+            httpx.Response(200, content=b"blocked", headers={"content-type": "video/mp4"})))
+        self.assertFalse(client.is_blocked_response(
+            httpx.Response(200, content=b"blocked", headers={"content-length": str(BLOCKED_BODY_MAX_BYTES + 1)})))
+        self.assertFalse(client.is_blocked_response(httpx.Response(200, content=b"x" * (BLOCKED_BODY_MAX_BYTES + 1))))
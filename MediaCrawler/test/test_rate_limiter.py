@@ -0,0 +1,84 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 全局令牌桶限流器
+
+import unittest
+
+from tools.rate_limiter import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_wait(self):
+        bucket = TokenBucket(rate=2.0, burst=3, backoff_base=5, backoff_max=60)
+        waits = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        # 第 4、5 个请求依次排在 0.5s、1s 之后
+        self.assertAlmostEqual(waits[3], 0.5, places=2)
+        self.assertAlmostEqual(waits[4], 1.0, places=2)
+
+    def test_penalize_and_recover(self):
+        bucket = TokenBucket(rate=1.0, burst=3, backoff_base=5, backoff_max=8)
+        self.assertEqual(bucket.penalize(), 5)
+        self.assertEqual(bucket.rate, 0.5)
+        self.assertGreaterEqual(bucket.reserve(), 4.9)
+        # 连续被风控时暂停时间翻倍，但不超过上限
+        self.assertEqual(bucket.penalize(), 8)
+        for _ in range(10):
+            bucket.reward()
+        self.assertEqual(bucket.rate, 1.0)
+        bucket.reward()
+        self.assertEqual(bucket.strikes, 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter(
+            rates={"default": 1.0, "search": 0.5, "m.weibo.cn": 0.3, "api.bilibili.com/comment": 4.0},
+            burst=3, backoff_base=5, backoff_max=60,
+        )
+
+    def test_classify(self):
+        self.assertEqual(self.limiter.classify("https://api.bilibili.com/x/web-interface/wbi/search/type"),
+                         ("api.bilibili.com", "search"))
+        self.assertEqual(self.limiter.classify("https://api.bilibili.com/x/v2/reply/wbi/main"),
+                         ("api.bilibili.com", "comment"))
+        self.assertEqual(self.limiter.classify("https://api.bilibili.com/x/web-interface/view"),
+                         ("api.bilibili.com", "default"))
+        self.assertEqual(self.limiter.classify("https://upos.bilivideo.com/a.mp4", "media"),
+                         ("upos.bilivideo.com", "media"))
+
+    def test_bucket_rate_lookup_order(self):
+        self.assertEqual(self.limiter.get_bucket("api.bilibili.com", "comment").rate, 4.0)
+        self.assertEqual(self.limiter.get_bucket("m.weibo.cn", "search").rate, 0.3)
+        self.assertEqual(self.limiter.get_bucket("edith.xiaohongshu.com", "search").rate, 0.5)
+        self.assertEqual(self.limiter.get_bucket("edith.xiaohongshu.com", "media").rate, 1.0)
+
+    def test_buckets_are_shared_per_host_and_class(self):
+        url = "https://api.bilibili.com/x/web-interface/view"
+        self.assertIs(self.limiter.get_bucket(*self.limiter.classify(url)),
+                      self.limiter.get_bucket("api.bilibili.com", "default"))
+        self.assertIsNot(self.limiter.get_bucket("api.bilibili.com", "default"),
+                         self.limiter.get_bucket("api.bilibili.com", "search"))
+
+    def test_feedback_throttles_only_on_block(self):
+        url = "https://api.bilibili.com/x/web-interface/wbi/search/type"
+        self.limiter.feedback(url, status_code=200)
+        self.assertEqual(self.limiter.get_bucket("api.bilibili.com", "search").strikes, 0)
+        self.limiter.feedback(url, status_code=412)
+        self.assertEqual(self.limiter.get_bucket("api.bilibili.com", "search").strikes, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,10 +15,18 @@
 # @Time    : 2024/6/2 19:54
 # @Desc    :
 
+import json
 import time
 import unittest
+from unittest import IsolatedAsyncioTestCase
 
-from cache.redis_cache import RedisCache
+from cache.redis_cache import AsyncRedisCache, RedisCache
+from proxy.base_proxy import IpCache
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
 
 
 class TestRedisCache(unittest.TestCase):
@@ -47,5 +55,54 @@ class TestRedisCache(unittest.TestCase):
         pass
 
 
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisCacheBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.client = fakeredis.FakeRedis()
+        self.redis_cache = RedisCache(redis_client=self.client)
+
+    def test_json_encoding(self):
+        self.redis_cache.set('key', {'ip': '127.0.0.1', 'port': 8080}, 10)
+        self.assertEqual(self.client.get('key'), b'{"ip":"127.0.0.1","port":8080}')
+        self.assertEqual(self.redis_cache.get('key'), {'ip': '127.0.0.1', 'port': 8080})
+
+    def test_mset_and_mget(self):
+        self.redis_cache.mset({'key1': 'value1', 'key2': [1, 2]}, 10)
+        self.assertEqual(self.redis_cache.mget(['key1', 'missing', 'key2']), ['value1', None, [1, 2]])
+        self.assertGreater(self.client.ttl('key1'), 0)
+
+    def test_keys_by_scan(self):
+        self.redis_cache.mset({f'kuaidaili_{i}': i for i in range(2500)}, 10)
+        self.redis_cache.set('other', 1, 10)
+        self.assertEqual(len(self.redis_cache.keys('kuaidaili_*')), 2500)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestAsyncRedisCache(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis_cache = AsyncRedisCache(redis_client=fakeredis.FakeAsyncRedis())
+
+    async def test_set_get_and_batch(self):
+        await self.redis_cache.set('key', 'value', 10)
+        self.assertEqual(await self.redis_cache.get('key'), 'value')
+        await self.redis_cache.mset({'key1': 1, 'key2': 2}, 10)
+        keys = await self.redis_cache.keys('key*')
+        self.assertEqual(sorted(keys), ['key', 'key1', 'key2'])
+        self.assertEqual(await self.redis_cache.mget(['key1', 'key2']), [1, 2])
+
+    async def test_ip_cache_load_all_ip(self):
+        ip_cache = IpCache(cache_client=self.redis_cache)
+        for i in range(3):
+            ip_info = {"ip": f"127.0.0.{i}", "port": 8080, "user": "u", "password": "p", "expired_time_ts": 0}
+            await ip_cache.set_ip(f"kuaidaili_127.0.0.{i}_8080", json.dumps(ip_info), ex=10)
+        self.assertEqual(sorted(ip.ip for ip in await ip_cache.load_all_ip("kuaidaili")),
+                         ["127.0.0.0", "127.0.0.1", "127.0.0.2"])
+
+    async def asyncTearDown(self):
+        await self.redis_cache.close()
+
+
 if __name__ == '__main__':
     unittest.main()
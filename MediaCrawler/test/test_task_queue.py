@@ -0,0 +1,142 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : 分布式任务队列
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from task_queue.abs_queue import CrawlTask
+from task_queue.sqlite_queue import SqliteTaskQueue
+from task_queue.worker import mark_target_crawled, run_batch
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def create_tasks(*targets: str):
+    return [CrawlTask(platform="xhs", crawler_type="search", target=target) for target in targets]
+
+
+class TaskQueueCases:
+    """两种后端共用的用例，子类实现 create_queue"""
+
+    def create_queue(self, max_attempts: int = 2):
+        raise NotImplementedError
+
+    async def asyncTearDown(self):
+        await self.queue.close()
+
+    async def test_lease_ack_and_dedupe(self):
+        self.queue = self.create_queue()
+        self.assertEqual(await self.queue.enqueue(create_tasks("a", "b", "c")), 3)
+        # 已在队列中的任务不重复入队
+        self.assertEqual(await self.queue.enqueue(create_tasks("a")), 0)
+
+        tasks = await self.queue.lease("xhs", "search", 2, visibility_timeout=60)
+        self.assertEqual([task.target for task in tasks], ["a", "b"])
+        self.assertEqual(tasks[0].attempts, 1)
+        # 已领取的任务对其他 worker 不可见
+        others = await self.queue.lease("xhs", "search", 5, visibility_timeout=60)
+        self.assertEqual([task.target for task in others], ["c"])
+        self.assertEqual(await self.queue.lease("dy", "search", 5, visibility_timeout=60), [])
+
+        await self.queue.ack(tasks)
+        # 已完成的任务不再入队
+        self.assertEqual(await self.queue.enqueue(create_tasks("a")), 0)
+        self.assertEqual(await self.queue.stats("xhs", "search"), {"ready": 0, "leased": 1, "dead": 0, "done": 2})
+
+    async def test_expired_lease_retried_then_dead_letter(self):
+        self.queue = self.create_queue(max_attempts=2)
+        await self.queue.enqueue(create_tasks("a"))
+        await self.queue.lease("xhs", "search", 1, visibility_timeout=-1)
+        # worker 异常退出，租约超时后重新分配
+        tasks = await self.queue.lease("xhs", "search", 1, visibility_timeout=60)
+        self.assertEqual([(task.target, task.attempts) for task in tasks], [("a", 2)])
+
+        await self.queue.nack(tasks, "timeout")
+        self.assertEqual(await self.queue.lease("xhs", "search", 1, visibility_timeout=60), [])
+        dead = await self.queue.dead_letters("xhs", "search")
+        self.assertEqual([(task.target, task.last_error) for task in dead], [("a", "timeout")])
+
+        self.assertEqual(await self.queue.requeue_dead_letters("xhs", "search"), 1)
+        tasks = await self.queue.lease("xhs", "search", 1, visibility_timeout=60)
+        self.assertEqual([(task.target, task.attempts) for task in tasks], [("a", 1)])
+
+    async def test_nack_requeues_until_max_attempts(self):
+        self.queue = self.create_queue(max_attempts=2)
+        await self.queue.enqueue(create_tasks("a"))
+        await self.queue.nack(await self.queue.lease("xhs", "search", 1, visibility_timeout=60), "error")
+        tasks = await self.queue.lease("xhs", "search", 1, visibility_timeout=60)
+        self.assertEqual(len(tasks), 1)
+        await self.queue.extend(tasks, visibility_timeout=60)
+        # 续租后的任务不会被当作超时任务重新分配
+        self.assertEqual(await self.queue.lease("xhs", "search", 1, visibility_timeout=60), [])
+        self.assertEqual((await self.queue.stats("xhs", "search"))["leased"], 1)
+
+
+class TestSqliteTaskQueue(TaskQueueCases, IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def create_queue(self, max_attempts: int = 2):
+        return SqliteTaskQueue(os.path.join(self.tmp_dir.name, "task_queue.db"), max_attempts)
+
+
+class FakeCrawler:
+    """只拿到部分关键词的数据后正常返回，和真实爬虫记录错误日志后返回的行为一致"""
+
+    def __init__(self, crawled_keywords):
+        self.crawled_keywords = crawled_keywords
+
+    async def start(self):
+        for keyword in config.KEYWORDS.split(","):
+            if keyword in self.crawled_keywords:
+                mark_target_crawled(keyword)
+
+
+class TestRunBatch(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = SqliteTaskQueue(os.path.join(self.tmp_dir.name, "task_queue.db"), max_attempts=1)
+        self.origin_config = config.PLATFORM, config.CRAWLER_TYPE, config.KEYWORDS
+
+    async def asyncTearDown(self):
+        await self.queue.close()
+
+    def tearDown(self):
+        config.PLATFORM, config.CRAWLER_TYPE, config.KEYWORDS = self.origin_config
+        self.tmp_dir.cleanup()
+
+    async def test_only_crawled_targets_acked(self):
+        await self.queue.enqueue(create_tasks("a", "b"))
+        tasks = await self.queue.lease("xhs", "search", 2, visibility_timeout=60)
+        self.assertFalse(await run_batch(self.queue, tasks, lambda: FakeCrawler({"a"})))
+        self.assertEqual(await self.queue.stats("xhs", "search"), {"ready": 0, "leased": 0, "dead": 1, "done": 1})
+        dead = await self.queue.dead_letters("xhs", "search")
+        self.assertEqual([(task.target, task.last_error) for task in dead], [("b", "no data crawled")])
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisTaskQueue(TaskQueueCases, IsolatedAsyncioTestCase):
+    def create_queue(self, max_attempts: int = 2):
+        from task_queue.redis_queue import RedisTaskQueue
+        return RedisTaskQueue(max_attempts, redis_client=fakeredis.FakeAsyncRedis())
+
+
+if __name__ == '__main__':
+    unittest.main()
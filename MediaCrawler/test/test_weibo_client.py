@@ -0,0 +1,56 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+# -*- coding: utf-8 -*-
+# @Desc    : 微博客户端请求走 AbstractApiClient 的连接池、限流和关闭流程
+# -*- coding: utf-8 -*-
+# @Desc    : 微博客户端通过 AbstractApiClient 发请求
+
+from typing import List
+from unittest import IsolatedAsyncioTestCase, mock
+
+import httpx
+
+from base.base_crawler import AbstractApiClient
+from media_platform.weibo.client import WeiboClient
+from media_platform.weibo.exception import DataFetchError
+
+
+class TestWeiboClient(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.responses: List[httpx.Response] = []
+        self.sent_requests: List[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.sent_requests.append(request)
+            return self.responses.pop(0)
+
+        async_client = httpx.AsyncClient
+
+        def create_mock_client(*args, **kwargs) -> httpx.AsyncClient:
+            kwargs.pop("proxies", None)
+            return async_client(transport=httpx.MockTransport(handler), **kwargs)
+
+        patcher = mock.patch.object(httpx, "AsyncClient", create_mock_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = WeiboClient(headers={"Cookie": "SUB=sub"}, playwright_page=None, cookie_dict={"SUB": "sub"})
+
+    async def test_request_through_api_client(self):
+        self.responses.append(httpx.Response(200, json={"ok": 1, "data": {"login": True}}))
+        self.assertIsInstance(self.client, AbstractApiClient)
+        data = await self.client.request("GET", "https://m.weibo.cn/api/config", headers=self.client.headers)
+        self.assertEqual(data, {"login": True})
+        self.assertEqual(self.sent_requests[0].headers["Cookie"], "SUB=sub")
+
+    async def test_error_response_raises(self):
+        self.responses.append(httpx.Response(200, json={"ok": 0, "msg": "error"}))
+        with self.assertRaises(DataFetchError):
+            await self.client.get("/api/container/getIndex", {"page": 1})
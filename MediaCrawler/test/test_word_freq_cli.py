@@ -0,0 +1,57 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 离线词频统计的文件读取
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.word_freq_cli import find_data_files, iter_json_array
+
+
+class TestWordFreqCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.json_dir = Path(self.tmp_dir.name) / "xhs" / "json"
+        self.json_dir.mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_iter_json_array_across_chunks(self):
+        items = [{"comment_id": str(i), "content": "评论[内容], {}" * i} for i in range(50)]
+        file_name = self.json_dir / "search_comments_2024-01-14.json"
+        file_name.write_text(json.dumps(items, ensure_ascii=False, indent=4), encoding="utf-8")
+        # 读取块远小于单个元素，元素会被截断在多次读取之间
+        self.assertEqual(list(iter_json_array(str(file_name), chunk_size=7)), items)
+
+    def test_iter_json_array_empty(self):
+        file_name = self.json_dir / "search_comments_2024-01-14.json"
+        file_name.write_text("[]", encoding="utf-8")
+        self.assertEqual(list(iter_json_array(str(file_name))), [])
+
+    def test_find_data_files_prefers_jsonl(self):
+        for name in ("search_comments_2024-01-14.json", "search_comments_2024-01-14.jsonl",
+                     "search_comments_2024-01-15.json", "search_contents_2024-01-14.jsonl"):
+            (self.json_dir / name).write_text("", encoding="utf-8")
+        files = find_data_files(self.tmp_dir.name, "comments", [])
+        self.assertEqual(sorted(os.path.basename(f) for f in files),
+                         ["search_comments_2024-01-14.jsonl", "search_comments_2024-01-15.json"])
+        self.assertEqual(find_data_files(self.tmp_dir.name, "comments", ["bilibili"]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
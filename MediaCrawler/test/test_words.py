@@ -0,0 +1,55 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 增量词频统计
+
+import json
+import os
+import tempfile
+from collections import Counter
+from typing import Callable
+from unittest import IsolatedAsyncioTestCase
+
+from tools.words import AsyncWordCloudGenerator, count_words
+
+
+class FakeWordCloudGenerator(AsyncWordCloudGenerator):
+    async def _run_in_worker(self, func: Callable, *args):
+        if func is count_words:
+            return Counter(word for text in args[0] for word in text.split())
+        return None
+
+
+class TestAsyncWordCloudGenerator(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.tmp_dir.name, "search_comments_2024-01-14")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_add_item_continues_existing_word_freq(self):
+        # 同一天之前运行写下的词频
+        with open(f"{self.prefix}_word_freq.json", "w", encoding="utf-8") as file:
+            json.dump({"旧词": 3, "新词": 1}, file, ensure_ascii=False)
+
+        generator = FakeWordCloudGenerator()
+        await generator.add_item({"content": "新词 新词"}, self.prefix)
+        await generator.add_item({"content": "新词"}, self.prefix)
+        self.assertEqual(generator.word_freqs[self.prefix], Counter({"旧词": 3, "新词": 4}))
+
+    async def test_add_item_without_existing_word_freq(self):
+        generator = FakeWordCloudGenerator()
+        await generator.add_item({"content": "新词"}, self.prefix)
+        await generator.add_item({"title": "没有内容"}, self.prefix)
+        self.assertEqual(generator.word_freqs[self.prefix], Counter({"新词": 1}))
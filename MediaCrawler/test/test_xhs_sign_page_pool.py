@@ -0,0 +1,85 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 小红书签名页面池
+
+import asyncio
+from typing import Any, Dict, List, Optional
+from unittest import IsolatedAsyncioTestCase
+
+from media_platform.xhs.client import XiaoHongShuClient
+from media_platform.xhs.help import XhsSignPagePool
+
+
+class FakePage:
+    def __init__(self, name: str):
+        """
+        模拟已打开小红书首页的页面，记录每次 evaluate 提交的签名请求
+        :param name: 页面名，写进签名结果里区分是哪个页面签的
+        """
+        self.name = name
+        # 真实的 b1 是一长串设备指纹，sign() 计算 x9 时依赖它的长度
+        self.b1 = f"b1-{name}-" + "0" * 64
+        self.sign_batches: List[List[List[Any]]] = []
+        self.local_storage_reads = 0
+
+    async def evaluate(self, expression: str, arg: Optional[List[List[Any]]] = None) -> Any:
+        if "localStorage" in expression:
+            self.local_storage_reads += 1
+            return {"b1": self.b1}
+        self.sign_batches.append(arg)
+        # 让出一次事件循环，模拟页面执行签名脚本的耗时
+        await asyncio.sleep(0)
+        return [{"X-s": f"{self.name}:{url}", "X-t": 1700000000000} for url, _ in arg]
+
+
+class TestXhsSignPagePool(IsolatedAsyncioTestCase):
+
+    async def test_sign_sent_to_least_loaded_page(self):
+        pages = [FakePage("p0"), FakePage("p1")]
+        pool = XhsSignPagePool(pages)
+        first = asyncio.create_task(pool.sign("/api/a"))
+        await asyncio.sleep(0)
+        # 第一个页面还在签名，新请求交给空闲的第二个页面
+        second = asyncio.create_task(pool.sign("/api/b", {"page": 1}))
+        self.assertEqual(await first, {"X-s": "p0:/api/a", "X-t": 1700000000000})
+        self.assertEqual(await second, {"X-s": "p1:/api/b", "X-t": 1700000000000})
+        self.assertEqual(pages[0].sign_batches, [[["/api/a", None]]])
+        self.assertEqual(pages[1].sign_batches, [[["/api/b", {"page": 1}]]])
+
+    async def test_concurrent_signs_batched_into_one_evaluate(self):
+        page = FakePage("p0")
+        pool = XhsSignPagePool([page])
+        results = await asyncio.gather(*[pool.sign(f"/api/{i}") for i in range(5)])
+        self.assertEqual([result["X-s"] for result in results], [f"p0:/api/{i}" for i in range(5)])
+        self.assertEqual(len(page.sign_batches), 1)
+        self.assertEqual(len(page.sign_batches[0]), 5)
+
+    async def test_get_b1_cached(self):
+        page = FakePage("p0")
+        pool = XhsSignPagePool([page, FakePage("p1")])
+        self.assertEqual(await pool.get_b1(), page.b1)
+        self.assertEqual(await pool.get_b1(), page.b1)
+        self.assertEqual(page.local_storage_reads, 1)
+        pool.invalidate_b1()
+        await pool.get_b1()
+        self.assertEqual(page.local_storage_reads, 2)
+
+    async def test_pre_headers_returns_copy(self):
+        headers: Dict[str, str] = {"Cookie": "a1=a1", "User-Agent": "Mozilla/5.0"}
+        client = XiaoHongShuClient(headers=headers, playwright_page=None, cookie_dict={"a1": "a1"},
+                                   sign_page_pool=XhsSignPagePool([FakePage("p0")]))
+        first, second = await asyncio.gather(client._pre_headers("/api/a"), client._pre_headers("/api/b"))
+        self.assertNotEqual(first["X-S"], second["X-S"])
+        first["Cookie"] = "changed"
+        self.assertEqual(client.headers, {"Cookie": "a1=a1", "User-Agent": "Mozilla/5.0"})
+        self.assertEqual(second["Cookie"], "a1=a1")
@@ -0,0 +1,209 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多账号池：加载多组 cookie 或多个登录态目录，按协程任务分配账号，被风控的账号冷却，多次被风控后停用
+
+import asyncio
+import glob
+import os
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from playwright.async_api import BrowserType
+
+import config
+from tools import utils
+
+
+class AccountUnavailableError(Exception):
+    """所有账号都已停用"""
+
+
+class Account:
+    def __init__(self, name: str, cookie_str: str):
+        """
+        :param name: 账号名，用于日志和按账号限流
+        :param cookie_str: 账号的 cookie 字符串
+        """
+        self.name = name
+        self.cookie_str = cookie_str
+        self.cookie_dict: Dict[str, str] = utils.convert_str_cookie_to_dict(cookie_str)
+        # 分配给协程任务的次数，用于在账号之间均匀分配
+        self.assigned = 0
+        # 连续被风控的次数
+        self.strikes = 0
+        self.cooldown_until = 0.0
+        self.retired = False
+
+    def is_available(self, now: float) -> bool:
+        return not self.retired and self.cooldown_until <= now
+
+
+# 当前协程任务绑定的账号：(任务, 账号)
+# 子任务会继承父任务的 context，记录任务用于区分绑定是不是当前任务自己的
+current_account_var: ContextVar[Optional[Tuple[asyncio.Task, Account]]] = ContextVar("current_account", default=None)
+
+
+class AccountPool:
+    def __init__(self, accounts: List[Account], cooldown_sec: float, max_strikes: int):
+        """
+        :param accounts: 账号列表
+        :param cooldown_sec: 第一次被风控后的冷却时间（秒），连续被风控时翻倍
+        :param max_strikes: 连续被风控达到该次数后停用账号
+        """
+        self.accounts = accounts
+        self.cooldown_sec = cooldown_sec
+        self.max_strikes = max_strikes
+
+    def _pick(self) -> Account:
+        candidates = [account for account in self.accounts if not account.retired]
+        if not candidates:
+            raise AccountUnavailableError("[AccountPool._pick] all accounts are retired")
+        now = time.time()
+        available = [account for account in candidates if account.is_available(now)]
+        if available:
+            account = min(available, key=lambda item: item.assigned)
+        else:
+            # 全部在冷却中时分配最先结束冷却的账号，由 wait_cooldown 等待
+            account = min(candidates, key=lambda item: item.cooldown_until)
+        account.assigned += 1
+        return account
+
+    def current(self) -> Account:
+        """
+        获取当前协程任务绑定的账号，任务第一次请求时分配一个账号，之后的请求沿用，
+        绑定的账号被冷却或停用时重新分配
+        :return:
+        """
+        task = asyncio.current_task()
+        binding = current_account_var.get()
+        if binding is not None and binding[0] is task and binding[1].is_available(time.time()):
+            return binding[1]
+        account = self._pick()
+        current_account_var.set((task, account))
+        return account
+
+    @staticmethod
+    def bound() -> Optional[Account]:
+        """
+        当前协程任务已绑定的账号，不触发分配
+        :return:
+        """
+        binding = current_account_var.get()
+        if binding is not None and binding[0] is asyncio.current_task():
+            return binding[1]
+        return None
+
+    @staticmethod
+    async def wait_cooldown(account: Account):
+        """
+        账号在冷却中时等待冷却结束
+        :param account:
+        :return:
+        """
+        wait = account.cooldown_until - time.time()
+        if wait > 0:
+            utils.logger.info(f"[AccountPool.wait_cooldown] all accounts cooling down, wait {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    def report_risk(self, account: Account):
+        """
+        账号被风控：冷却 cooldown_sec * 2^(n-1) 秒，连续 max_strikes 次后停用
+        :param account:
+        :return:
+        """
+        account.strikes += 1
+        if account.strikes >= self.max_strikes:
+            account.retired = True
+            utils.logger.warning(f"[AccountPool.report_risk] account {account.name} hit risk control "
+                                 f"{account.strikes} times, retired")
+            return
+        cooldown = self.cooldown_sec * 2 ** (account.strikes - 1)
+        account.cooldown_until = max(account.cooldown_until, time.time() + cooldown)
+        utils.logger.warning(f"[AccountPool.report_risk] account {account.name} hit risk control, "
+                             f"cool down {cooldown:.0f}s")
+
+    @staticmethod
+    def report_success(account: Account):
+        account.strikes = 0
+
+    async def health_check(self, pong: Callable[[], Awaitable[bool]]):
+        """
+        用平台客户端的 pong() 并发检查每个账号的登录态，失效的账号停用
+        :param pong: 客户端的 pong 方法，调用时请求使用当前任务绑定的账号
+        :return:
+        """
+        async def check(account: Account) -> bool:
+            # gather 为每个协程创建单独的任务，绑定只影响这次检查
+            current_account_var.set((asyncio.current_task(), account))
+            try:
+                return await pong()
+            except Exception as e:
+                utils.logger.error(f"[AccountPool.health_check] account {account.name} pong err: {e}")
+                return False
+
+        results = await asyncio.gather(*[check(account) for account in self.accounts])
+        for account, ok in zip(self.accounts, results):
+            if not ok:
+                account.retired = True
+                utils.logger.warning(f"[AccountPool.health_check] account {account.name} login state invalid, retired")
+        utils.logger.info(f"[AccountPool.health_check] {results.count(True)}/{len(self.accounts)} accounts available")
+
+
+async def load_profile_accounts(chromium: BrowserType, platform: str, user_agent: Optional[str]) -> List[Account]:
+    """
+    从 browser_data 下保存的其他登录态目录（{platform}_user_data_dir_*）读取 cookie，每个目录作为一个账号
+    新账号可以把 USER_DATA_DIR 临时改成 "%s_user_data_dir_2" 后登录一次生成
+    :param chromium: playwright chromium
+    :param platform: 平台名
+    :param user_agent: 浏览器 UA
+    :return:
+    """
+    accounts: List[Account] = []
+    pattern = os.path.join(os.getcwd(), "browser_data", f"{config.USER_DATA_DIR % platform}_*")
+    for user_data_dir in sorted(glob.glob(pattern)):
+        browser_context = await chromium.launch_persistent_context(
+            user_data_dir=user_data_dir, headless=True, user_agent=user_agent)
+        try:
+            cookie_str, _ = utils.convert_cookies(await browser_context.cookies())
+        finally:
+            await browser_context.close()
+        if cookie_str:
+            accounts.append(Account(os.path.basename(user_data_dir), cookie_str))
+    return accounts
+
+
+async def create_account_pool(cookie_str: str, pong: Optional[Callable[[], Awaitable[bool]]],
+                              chromium: Optional[BrowserType] = None,
+                              user_agent: Optional[str] = None) -> Optional[AccountPool]:
+    """
+    按配置创建账号池：当前登录的账号 + ACCOUNT_COOKIES_LIST + 其他登录态目录（ENABLE_ACCOUNT_PROFILES）
+    :param cookie_str: 当前登录账号的 cookie
+    :param pong: 客户端的 pong 方法，为 None 时跳过登录态检查
+    :param chromium: playwright chromium，不传时不加载登录态目录
+    :param user_agent: 浏览器 UA
+    :return: 只有一个账号时返回 None，保持单账号的行为
+    """
+    accounts = [Account("default", cookie_str)]
+    for index, account_cookie in enumerate(config.ACCOUNT_COOKIES_LIST, 1):
+        if account_cookie.strip():
+            accounts.append(Account(f"cookie_{index}", account_cookie.strip()))
+    if config.ENABLE_ACCOUNT_PROFILES and chromium is not None:
+        accounts.extend(await load_profile_accounts(chromium, config.PLATFORM, user_agent))
+    if len(accounts) == 1:
+        return None
+
+    pool = AccountPool(accounts, config.ACCOUNT_COOLDOWN_SEC, config.ACCOUNT_MAX_STRIKES)
+    if pong is not None:
+        await pool.health_check(pong)
+    return pool
@@ -0,0 +1,201 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻 node 签名进程池，签名脚本只加载一次，通过管道按行收发 JSON，替代每次调用都启动 node 进程的 execjs
+
+import asyncio
+import itertools
+import json
+import shutil
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import config
+from tools import utils
+
+SIGN_WORKER_JS = "libs/sign_worker.js"
+
+
+class SignError(Exception):
+    """签名脚本执行出错或签名进程退出"""
+
+
+class JsSignWorker:
+    def __init__(self, script_path: str):
+        """
+        一个常驻的 node 进程，启动时加载 script_path，之后按请求 id 把结果分发给等待中的协程
+        :param script_path: 签名脚本路径，如 libs/douyin.js
+        """
+        self.script_path = script_path
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        node = shutil.which("node")
+        if not node:
+            raise SignError("node is not installed, please install Node.js to run the sign scripts")
+        self._process = await asyncio.create_subprocess_exec(
+            node, SIGN_WORKER_JS, self.script_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        self._reader_task = asyncio.create_task(self._read_responses())
+        utils.logger.info(f"[JsSignWorker.start] sign worker started, pid: {self._process.pid}, script: {self.script_path}")
+
+    async def _read_responses(self):
+        while True:
+            line = await self._process.stdout.readline()
+            if not line:
+                break
+            try:
+                resp = json.loads(line)
+            except ValueError:
+                utils.logger.error(f"[JsSignWorker._read_responses] invalid response: {line[:200]}")
+                continue
+            future = self._pending.pop(resp.get("id"), None)
+            if future is None or future.done():
+                continue
+            if "error" in resp:
+                future.set_exception(SignError(resp["error"]))
+            else:
+                future.set_result(resp["result"])
+        # 进程退出，唤醒所有还在等待的请求
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(SignError(f"sign worker exited, script: {self.script_path}"))
+        self._pending.clear()
+
+    async def submit(self, fn: str, batch: Sequence[Tuple[Sequence[Any], asyncio.Future]]):
+        """
+        批量提交：所有请求一次写入管道，node 端按行依次执行，结果分别写回各自的 future
+        :param fn: 签名脚本中的函数名
+        :param batch: 每次调用的参数和等待结果的 future
+        :return:
+        """
+        process = self._process
+        if process is None or process.stdin is None or process.returncode is not None:
+            raise SignError(f"sign worker is not running, script: {self.script_path}")
+        lines = []
+        for args, future in batch:
+            req_id = next(self._ids)
+            self._pending[req_id] = future
+            lines.append(json.dumps({"id": req_id, "fn": fn, "args": list(args)}, ensure_ascii=False))
+        process.stdin.write(("\n".join(lines) + "\n").encode("utf-8"))
+        await process.stdin.drain()
+
+    async def close(self):
+        if not self.alive:
+            return
+        self._process.stdin.close()
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=3)
+        except asyncio.TimeoutError:
+            self._process.kill()
+        await self._reader_task
+
+
+class JsSignPool:
+    def __init__(self, script_path: str, size: int):
+        """
+        签名进程池，按需启动，最多 size 个进程，每次把请求交给当前待处理请求最少的进程
+        :param script_path: 签名脚本路径
+        :param size: 进程数上限
+        """
+        self.script_path = script_path
+        self.size = max(1, size)
+        self._workers: List[JsSignWorker] = []
+        self._lock: Optional[asyncio.Lock] = None
+        # 按函数名暂存还没提交的调用
+        self._batches: Dict[str, List[Tuple[Sequence[Any], asyncio.Future]]] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def _get_worker(self) -> JsSignWorker:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._workers = [worker for worker in self._workers if worker.alive]
+            idle = [worker for worker in self._workers if worker.load == 0]
+            if idle:
+                return idle[0]
+            if len(self._workers) < self.size:
+                worker = JsSignWorker(self.script_path)
+                await worker.start()
+                self._workers.append(worker)
+                return worker
+            return min(self._workers, key=lambda w: w.load)
+
+    async def call(self, fn: str, *args) -> Any:
+        """
+        调用签名脚本中的函数，同一轮事件循环内到达的同名函数调用合并成一批写入同一个进程
+        :param fn: 函数名
+        :param args: 参数，需要能被 JSON 序列化
+        :return:
+        """
+        future = asyncio.get_running_loop().create_future()
+        batch = self._batches.setdefault(fn, [])
+        batch.append((args, future))
+        if len(batch) == 1:
+            # 延后到下一轮事件循环再提交，期间到达的签名请求一起写入管道
+            task = asyncio.create_task(self._flush(fn))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        return await future
+
+    async def _flush(self, fn: str):
+        batch = self._batches.pop(fn, [])
+        try:
+            worker = await self._get_worker()
+            await worker.submit(fn, batch)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def close(self):
+        for worker in self._workers:
+            await worker.close()
+        self._workers = []
+
+
+_sign_pools: Dict[str, JsSignPool] = {}
+
+
+def get_sign_pool(script_path: str) -> JsSignPool:
+    """
+    获取签名脚本对应的进程池，首次调用时创建
+    :param script_path: 签名脚本路径
+    :return:
+    """
+    pool = _sign_pools.get(script_path)
+    if pool is None:
+        pool = JsSignPool(script_path, config.SIGN_WORKER_POOL_SIZE)
+        _sign_pools[script_path] = pool
+    return pool
+
+
+async def close_sign_pools():
+    """
+    关闭所有签名进程，在 crawler.close() 中调用
+    :return:
+    """
+    for pool in _sign_pools.values():
+        await pool.close()
+    _sign_pools.clear()
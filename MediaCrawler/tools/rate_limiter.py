@@ -0,0 +1,184 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 全局令牌桶限流器，按 (域名, 接口类别) 分桶，所有平台客户端共享
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import config
+from tools import utils
+
+# 命中后视为被风控的 HTTP 状态码：412(B站)、429、461/471(小红书验证码)
+THROTTLE_STATUS_CODES = (412, 429, 461, 471)
+
+# 按 URL 路径中的关键字划分接口类别，未命中的归为 default
+ENDPOINT_CLASS_KEYWORDS = (
+    ("search", "search"),
+    ("comment", "comment"),
+    ("reply", "comment"),
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, backoff_base: float, backoff_max: float):
+        """
+        令牌桶：以 rate 个/秒的速度生成令牌，最多积攒 burst 个
+        被风控时速率减半并暂停一段指数增长的时间，之后每次成功请求逐步恢复到初始速率
+        :param rate: 每秒生成的令牌数
+        :param burst: 桶容量，即允许的突发请求数
+        :param backoff_base: 第一次被风控时的暂停秒数
+        :param backoff_max: 暂停秒数上限
+        """
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tokens = float(burst)
+        self.strikes = 0
+        self.blocked_until = 0.0
+        self._last = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌，返回需要等待的秒数
+        令牌不足时余额记为负数，后来者依次排在后面，整个过程没有 await，协程之间不需要加锁
+        :return:
+        """
+        now = time.monotonic()
+        self.tokens = min(float(self.burst), self.tokens + (now - self._last) * self.rate)
+        self._last = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def penalize(self) -> float:
+        """
+        被风控：速率减半、清空突发额度，并暂停 backoff_base * 2^(n-1) 秒
+        :return: 本次暂停的秒数
+        """
+        self.strikes += 1
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** (self.strikes - 1))
+        self.blocked_until = max(self.blocked_until, time.monotonic() + backoff)
+        return backoff
+
+    def reward(self):
+        """
+        请求成功：速率按初始速率的 1/10 线性恢复，恢复满后清零风控次数
+        :return:
+        """
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+        elif self.strikes:
+            self.strikes = 0
+
+
+class RateLimiter:
+    def __init__(self, rates: Dict[str, float], burst: int, backoff_base: float, backoff_max: float):
+        """
+        :param rates: 速率配置，key 可以是接口类别（search/comment/default）、域名，或 "域名/接口类别"，
+                      查找顺序为 "域名/接口类别" > 域名 > 接口类别 > default
+        :param burst: 每个桶的突发容量
+        :param backoff_base: 第一次被风控时的暂停秒数
+        :param backoff_max: 暂停秒数上限
+        """
+        self.rates = rates
+        self.burst = burst
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets: Dict[Tuple[str, str, str], TokenBucket] = {}
+
+    @staticmethod
+    def classify(url: str, endpoint_class: Optional[str] = None) -> Tuple[str, str]:
+        """
+        解析 URL 得到 (域名, 接口类别)
+        :param url: 请求地址
+        :param endpoint_class: 调用方显式指定的接口类别
+        :return:
+        """
+        parsed = urlparse(url)
+        if endpoint_class:
+            return parsed.netloc, endpoint_class
+        path = parsed.path.lower()
+        for keyword, name in ENDPOINT_CLASS_KEYWORDS:
+            if keyword in path:
+                return parsed.netloc, name
+        return parsed.netloc, "default"
+
+    def get_bucket(self, host: str, endpoint_class: str, scope: str = "") -> TokenBucket:
+        # scope 用于区分账号，多账号时每个账号各自一个桶，速率配置相同
+        key = (host, endpoint_class, scope)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate = self.rates.get(f"{host}/{endpoint_class}",
+                                  self.rates.get(host,
+                                                 self.rates.get(endpoint_class, self.rates.get("default", 1.0))))
+            bucket = TokenBucket(rate, self.burst, self.backoff_base, self.backoff_max)
+            self._buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, url: str, endpoint_class: Optional[str] = None, scope: str = ""):
+        """
+        请求前取一个令牌，桶内有余额时立即返回，否则等待到令牌生成
+        :param url: 请求地址
+        :param endpoint_class: 接口类别，不传时根据 URL 路径推断
+        :param scope: 限流范围，多账号时传账号名
+        :return:
+        """
+        wait = self.get_bucket(*self.classify(url, endpoint_class), scope).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def feedback(self, url: str, status_code: Optional[int] = None, throttled: bool = False,
+                 endpoint_class: Optional[str] = None, scope: str = ""):
+        """
+        请求完成后回报结果，用于自适应调整速率
+        :param url: 请求地址
+        :param status_code: HTTP 状态码
+        :param throttled: 平台在响应体中返回了风控错误码（如小红书 IP_ERROR_CODE）
+        :param endpoint_class: 接口类别，不传时根据 URL 路径推断
+        :param scope: 限流范围，需与 acquire 时一致
+        :return:
+        """
+        host, name = self.classify(url, endpoint_class)
+        bucket = self.get_bucket(host, name, scope)
+        if throttled or status_code in THROTTLE_STATUS_CODES:
+            backoff = bucket.penalize()
+            utils.logger.warning(
+                f"[RateLimiter.feedback] {host}/{name}{'@' + scope if scope else ''} throttled (status: {status_code}), "
+                f"rate down to {bucket.rate:.2f}/s, pause {backoff:.1f}s")
+        else:
+            bucket.reward()
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    获取全局限流器，首次调用时按配置创建
+    :return:
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            rates=config.RATE_LIMIT_RATES,
+            burst=config.RATE_LIMIT_BURST,
+            backoff_base=config.RATE_LIMIT_BACKOFF_BASE_SEC,
+            backoff_max=config.RATE_LIMIT_BACKOFF_MAX_SEC,
+        )
+    return _rate_limiter
@@ -0,0 +1,227 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 离线词频统计：流式读取 data 目录下的评论文件，按平台/关键词/日期分组，分片交给进程池分词后合并，
+#            输出词频表和词云图
+#            用法（在项目根目录执行）：python -m tools.word_freq_cli --data-dir data --out-dir data/word_freq --workers 8
+
+import argparse
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+import config
+from store.jsonl_store import iter_jsonl
+from tools import utils
+from tools.words import count_words, init_word_worker, render_word_cloud
+
+# 评论和内容中关联内容 id 的字段，各平台不同
+CONTENT_ID_FIELDS = ("note_id", "video_id", "aweme_id", "content_id")
+# 文件名形如 search_comments_2024-01-14.json
+DATE_PATTERN = re.compile(r"_(\d{4}-\d{2}-\d{2})$")
+NO_KEYWORD = "no_keyword"
+JSON_ARRAY_CHUNK_SIZE = 1024 * 1024
+
+# (平台, 关键词, 日期)
+GroupKey = Tuple[str, str, str]
+
+
+def iter_json_array(file_name: str, chunk_size: int = JSON_ARRAY_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    流式读取 JSON 数组文件中的每个元素，内存占用与单个元素大小相关，与文件大小无关
+    :param file_name: json 文件路径
+    :param chunk_size: 每次读取的字符数
+    :return:
+    """
+    decoder = json.JSONDecoder()
+    with open(file_name, "r", encoding="utf-8-sig") as file:
+        buffer = ""
+        started = False
+        while True:
+            chunk = file.read(chunk_size)
+            buffer += chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and (buffer[pos] in " \t\r\n," or (buffer[pos] == "[" and not started)):
+                    started = started or buffer[pos] == "["
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if buffer[pos] == "]":
+                    return
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if not chunk:
+                        utils.logger.warning(f"[iter_json_array] skip broken tail in {file_name}")
+                        return
+                    # 元素被截断在两次读取之间，读入更多内容后再解析
+                    break
+                yield item
+            if not chunk:
+                return
+            buffer = buffer[pos:]
+
+
+def iter_items(file_name: Path) -> Iterator[Dict]:
+    if file_name.suffix == ".jsonl":
+        return iter_jsonl(str(file_name))
+    return iter_json_array(str(file_name))
+
+
+def find_data_files(data_dir: str, store_type: str, platforms: List[str]) -> List[Path]:
+    """
+    查找 data/{platform}/json 下的数据文件，同名的 .jsonl 和压实后的 .json 只取 .jsonl
+    :param data_dir: 数据目录
+    :param store_type: comments 或 contents
+    :param platforms: 只统计这些平台，为空时统计全部
+    :return:
+    """
+    files: Dict[Path, Path] = {}
+    for file_name in sorted(Path(data_dir).glob(f"*/json/*_{store_type}_*.json*")):
+        if file_name.suffix not in (".json", ".jsonl"):
+            continue
+        if platforms and file_name.parent.parent.name not in platforms:
+            continue
+        stem = file_name.with_suffix("")
+        if file_name.suffix == ".jsonl" or stem not in files:
+            files[stem] = file_name
+    return list(files.values())
+
+
+def get_content_id(item: Dict) -> str:
+    for field in CONTENT_ID_FIELDS:
+        if item.get(field):
+            return str(item[field])
+    return ""
+
+
+def load_content_keywords(data_dir: str, platforms: List[str]) -> Dict[Tuple[str, str], str]:
+    """
+    评论中没有搜索关键词，从内容文件中建立 (平台, 内容 id) -> 关键词 的映射
+    :return:
+    """
+    keywords: Dict[Tuple[str, str], str] = {}
+    for file_name in find_data_files(data_dir, "contents", platforms):
+        platform = file_name.parent.parent.name
+        for item in iter_items(file_name):
+            content_id = get_content_id(item)
+            if content_id and item.get("source_keyword"):
+                keywords[(platform, content_id)] = item["source_keyword"]
+    return keywords
+
+
+class WordFreqJob:
+    def __init__(self, workers: int, shard_size: int):
+        """
+        :param workers: 分词进程数
+        :param shard_size: 每个分片包含的评论条数
+        """
+        self.workers = workers
+        self.shard_size = shard_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_word_worker,
+            initargs=(config.STOP_WORDS_FILE, list(config.CUSTOM_WORDS.keys())),
+        )
+        self.word_freqs: Dict[GroupKey, Counter] = {}
+        self._pending_texts: Dict[GroupKey, List[str]] = {}
+        self._running: Dict[Future, GroupKey] = {}
+        self.comment_count = 0
+
+    def add(self, group: GroupKey, text: str):
+        texts = self._pending_texts.setdefault(group, [])
+        texts.append(text)
+        self.comment_count += 1
+        if len(texts) >= self.shard_size:
+            self._submit(group, self._pending_texts.pop(group))
+
+    def _submit(self, group: GroupKey, texts: List[str]):
+        # 限制同时在途的分片数，读取速度快于分词时不会把整个文件堆在内存里
+        while len(self._running) >= self.workers * 2:
+            self._collect(wait(self._running, return_when=FIRST_COMPLETED).done)
+        self._running[self.executor.submit(count_words, texts)] = group
+
+    def _collect(self, done: Set[Future]):
+        for future in done:
+            group = self._running.pop(future)
+            self.word_freqs.setdefault(group, Counter()).update(future.result())
+
+    def finish(self) -> Dict[GroupKey, Counter]:
+        for group, texts in list(self._pending_texts.items()):
+            self._submit(group, texts)
+        self._pending_texts = {}
+        self._collect(wait(self._running).done)
+        return self.word_freqs
+
+    def render(self, out_dir: str, top_n: int):
+        """
+        每个分组输出 {date}_{keyword}_word_freq.json 和 {date}_{keyword}_word_cloud.png
+        :param out_dir: 输出目录，按平台分子目录
+        :param top_n: 词云使用的词数
+        :return:
+        """
+        futures = []
+        for (platform, keyword, date), word_freq in self.word_freqs.items():
+            platform_dir = Path(out_dir) / platform
+            platform_dir.mkdir(parents=True, exist_ok=True)
+            name = re.sub(r"[\s/\\:*?\"<>|]+", "_", keyword) or NO_KEYWORD
+            prefix = str(platform_dir / f"{date}_{name}")
+            futures.append(self.executor.submit(render_word_cloud, dict(word_freq), prefix, config.FONT_PATH, top_n))
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def run(data_dir: str, out_dir: str, platforms: List[str], workers: int, shard_size: int, top_n: int):
+    keywords = load_content_keywords(data_dir, platforms)
+    job = WordFreqJob(workers, shard_size)
+    try:
+        for file_name in find_data_files(data_dir, "comments", platforms):
+            platform = file_name.parent.parent.name
+            match = DATE_PATTERN.search(file_name.stem)
+            date = match.group(1) if match else file_name.stem
+            utils.logger.info(f"[word_freq_cli.run] reading {file_name}")
+            for item in iter_items(file_name):
+                content = item.get("content")
+                if not content:
+                    continue
+                keyword = keywords.get((platform, get_content_id(item)), "")
+                job.add((platform, keyword, date), content)
+        job.finish()
+        job.render(out_dir, top_n)
+    finally:
+        job.close()
+    utils.logger.info(f"[word_freq_cli.run] counted {job.comment_count} comments into {len(job.word_freqs)} groups, "
+                      f"output: {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline word frequency and word cloud over crawled comments")
+    parser.add_argument("--data-dir", default="data", help="directory containing {platform}/json/*_comments_*.json(l)")
+    parser.add_argument("--out-dir", default="data/word_freq")
+    parser.add_argument("--platforms", nargs="*", default=[], help="e.g. xhs bilibili, default all")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=2000, help="comments per tokenization task")
+    parser.add_argument("--top-n", type=int, default=20, help="words used in each word cloud")
+    args = parser.parse_args()
+    run(args.data_dir, args.out_dir, args.platforms, args.workers, args.shard_size, args.top_n)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,72 +12,221 @@
 import asyncio
 import json
 import logging
+import signal
+import time
 from collections import Counter
-
-import aiofiles
-import jieba
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
 
 import config
 from tools import utils
 
-plot_lock = asyncio.Lock()
+# jieba、matplotlib 只在分词进程中导入和使用，不阻塞主进程的事件循环
+# 以下为分词进程内的全局状态，由 init_word_worker 初始化
+_worker_stop_words: Set[str] = set()
+
+
+def load_stop_words(stop_words_file: str) -> Set[str]:
+    with open(stop_words_file, 'r', encoding='utf-8') as f:
+        return set(f.read().strip().split('\n'))
+
+
+def init_word_worker(stop_words_file: str, custom_words: List[str]):
+    """
+    分词进程初始化：加载停用词和自定义词，jieba 词典在每个进程中只加载一次
+    :param stop_words_file: 停用词文件路径
+    :param custom_words: 自定义词语
+    :return:
+    """
+    import jieba
+    global _worker_stop_words
+    # Ctrl+C 交给主进程处理，分词进程要继续完成退出前的词云生成
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.getLogger('jieba').setLevel(logging.WARNING)
+    _worker_stop_words = load_stop_words(stop_words_file)
+    for word in custom_words:
+        jieba.add_word(word)
+
+
+def count_words(texts: List[str]) -> Counter:
+    """
+    对一批文本分词并统计词频，在分词进程中执行
+    :param texts: 文本列表
+    :return:
+    """
+    import jieba
+    word_freq = Counter()
+    for text in texts:
+        word_freq.update(word for word in jieba.lcut(text) if word not in _worker_stop_words and len(word.strip()) > 0)
+    return word_freq
+
+
+def load_word_freq(save_words_prefix: str) -> Counter:
+    """
+    读取之前运行写下的词频文件，让同一天多次运行的词频继续累加而不是被覆盖
+    :param save_words_prefix: 文件前缀，读取 {prefix}_word_freq.json
+    :return: 文件不存在或无法解析时返回空的词频
+    """
+    file_name = f"{save_words_prefix}_word_freq.json"
+    try:
+        with open(file_name, 'r', encoding='utf-8') as file:
+            return Counter(json.load(file))
+    except FileNotFoundError:
+        return Counter()
+    except ValueError as e:
+        utils.logger.warning(f"[load_word_freq] ignore broken word freq file {file_name}: {e}")
+        return Counter()
+
+
+def render_word_cloud(word_freq: Dict[str, int], save_words_prefix: str, font_path: str, top_n: int = 20):
+    """
+    写入词频文件并用前 top_n 个词生成词云图，在分词进程中执行
+    :param word_freq: 词频
+    :param save_words_prefix: 文件前缀，生成 {prefix}_word_freq.json 和 {prefix}_word_cloud.png
+    :param font_path: 中文字体文件路径
+    :param top_n: 词云使用的词数
+    :return:
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    sorted_word_freq = Counter(word_freq).most_common()
+    with open(f"{save_words_prefix}_word_freq.json", 'w', encoding='utf-8') as file:
+        file.write(json.dumps(dict(sorted_word_freq), ensure_ascii=False, indent=4))
+    if not sorted_word_freq:
+        return
+
+    wordcloud = WordCloud(
+        font_path=font_path,
+        width=800,
+        height=400,
+        background_color='white',
+        max_words=200,
+        stopwords=_worker_stop_words,
+        colormap='viridis',
+        contour_color='steelblue',
+        contour_width=1
+    ).generate_from_frequencies(dict(sorted_word_freq[:top_n]))
+
+    # Save word cloud image
+    plt.figure(figsize=(10, 5), facecolor='white')
+    plt.imshow(wordcloud, interpolation='bilinear')
+
+    plt.axis('off')
+    plt.tight_layout(pad=0)
+    plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
+    plt.close()
+
 
 class AsyncWordCloudGenerator:
     def __init__(self):
-        logging.getLogger('jieba').setLevel(logging.WARNING)
+        """
+        增量词频统计：每条新数据只分词一次，按文件前缀累加词频，词云在退出时或按间隔生成
+        分词和绘图都在一个常驻的子进程中执行
+        """
         self.stop_words_file = config.STOP_WORDS_FILE
-        self.lock = asyncio.Lock()
-        self.stop_words = self.load_stop_words()
         self.custom_words = config.CUSTOM_WORDS
-        for word, group in self.custom_words.items():
-            jieba.add_word(word)
+        self.render_interval = config.WORDCLOUD_RENDER_INTERVAL_SEC
+        self.word_freqs: Dict[str, Counter] = {}
+        self._dirty_prefixes: Set[str] = set()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._render_task: Optional[asyncio.Task] = None
+        self._last_render = time.monotonic()
 
-    def load_stop_words(self):
-        with open(self.stop_words_file, 'r', encoding='utf-8') as f:
-            return set(f.read().strip().split('\n'))
+    async def _run_in_worker(self, func: Callable, *args):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                initializer=init_word_worker,
+                initargs=(self.stop_words_file, list(self.custom_words.keys())),
+            )
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
 
-    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
-        all_text = ' '.join(item['content'] for item in data)
-        words = [word for word in jieba.lcut(all_text) if word not in self.stop_words and len(word.strip()) > 0]
-        word_freq = Counter(words)
-
-        # Save word frequency to file
-        freq_file = f"{save_words_prefix}_word_freq.json"
-        async with aiofiles.open(freq_file, 'w', encoding='utf-8') as file:
-            await file.write(json.dumps(word_freq, ensure_ascii=False, indent=4))
-
-        # Try to acquire the plot lock without waiting
-        if plot_lock.locked():
-            utils.logger.info("Skipping word cloud generation as the lock is held.")
+    async def add_item(self, item: Dict, save_words_prefix: str):
+        """
+        对一条新数据分词并累加到对应文件的词频中
+        :param item: 一条数据，没有 content 字段时忽略
+        :param save_words_prefix: 词频和词云文件前缀
+        :return:
+        """
+        content = item.get('content')
+        if not content:
             return
+        word_freq = await self._run_in_worker(count_words, [content])
+        if save_words_prefix not in self.word_freqs:
+            # 每个前缀第一次出现时接着已有的词频文件累加
+            existing = await asyncio.get_running_loop().run_in_executor(None, load_word_freq, save_words_prefix)
+            # 读取期间其他数据可能已经初始化了同一个前缀，以先初始化的为准
+            self.word_freqs.setdefault(save_words_prefix, existing)
+        self.word_freqs[save_words_prefix].update(word_freq)
+        self._dirty_prefixes.add(save_words_prefix)
+        if (self.render_interval > 0 and time.monotonic() - self._last_render >= self.render_interval
+                and (self._render_task is None or self._render_task.done())):
+            # 后台生成，不阻塞数据保存
+            self._render_task = asyncio.create_task(self.render())
+
+    async def render(self):
+        """
+        为上次生成之后有新数据的文件写入词频并生成词云
+        :return:
+        """
+        self._last_render = time.monotonic()
+        dirty_prefixes, self._dirty_prefixes = self._dirty_prefixes, set()
+        for save_words_prefix in dirty_prefixes:
+            try:
+                await self._run_in_worker(render_word_cloud, dict(self.word_freqs[save_words_prefix]),
+                                          save_words_prefix, config.FONT_PATH)
+            except Exception as e:
+                utils.logger.error(f"[AsyncWordCloudGenerator.render] render {save_words_prefix} error: {e}")
+
+    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
+        """
+        对整份数据重新统计词频并生成词云
+        :param data: 数据列表，每条需要包含 content 字段
+        :param save_words_prefix: 词频和词云文件前缀
+        :return:
+        """
+        word_freq = await self._run_in_worker(count_words, [item['content'] for item in data])
+        self.word_freqs[save_words_prefix] = word_freq
+        self._dirty_prefixes.discard(save_words_prefix)
+        await self._run_in_worker(render_word_cloud, dict(word_freq), save_words_prefix, config.FONT_PATH)
+
+    async def close(self):
+        """
+        生成剩余的词云并关闭分词进程
+        :return:
+        """
+        if self._render_task is not None:
+            await self._render_task
+            self._render_task = None
+        await self.render()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+_word_cloud_generator: Optional[AsyncWordCloudGenerator] = None
+
+
+def get_word_cloud_generator() -> AsyncWordCloudGenerator:
+    """
+    获取全局词云生成器，所有存储共用一个分词进程
+    :return:
+    """
+    global _word_cloud_generator
+    if _word_cloud_generator is None:
+        _word_cloud_generator = AsyncWordCloudGenerator()
+    return _word_cloud_generator
+
 
-        await self.generate_word_cloud(word_freq, save_words_prefix)
-
-    async def generate_word_cloud(self, word_freq, save_words_prefix):
-        await plot_lock.acquire()
-        top_20_word_freq = {word: freq for word, freq in
-                            sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
-        wordcloud = WordCloud(
-            font_path=config.FONT_PATH,
-            width=800,
-            height=400,
-            background_color='white',
-            max_words=200,
-            stopwords=self.stop_words,
-            colormap='viridis',
-            contour_color='steelblue',
-            contour_width=1
-        ).generate_from_frequencies(top_20_word_freq)
-
-        # Save word cloud image
-        plt.figure(figsize=(10, 5), facecolor='white')
-        plt.imshow(wordcloud, interpolation='bilinear')
-
-        plt.axis('off')
-        plt.tight_layout(pad=0)
-        plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
-        plt.close()
-
-        plot_lock.release()
\ No newline at end of file
+async def close_word_cloud_generator():
+    """
+    生成剩余的词云，在 main 退出时调用
+    :return:
+    """
+    global _word_cloud_generator
+    if _word_cloud_generator is not None:
+        await _word_cloud_generator.close()
+        _word_cloud_generator = None
@@ -11,10 +11,23 @@ import sys
 import traceback
 import re
 import pickle
+import queue
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Set, Tuple
+from typing import List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
 import shutil
+import httpx
+
+# HTTP/2 需要可选依赖 h2 (pip install httpx[http2])，未安装时退回 HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 # 添加进度条显示
 def print_progress(current, total, title, length=50):
@@ -64,8 +77,328 @@ def generate_weekly_ranges(start_date_str, end_date_str):
     
     return weekly_ranges
 
+class HostPacer:
+    """按主机统一调度请求间隔，多个下载线程共享同一条时间线"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, host, min_seconds, max_seconds):
+        """为 host 预约下一个请求时间点并阻塞到该时间点"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + random.uniform(min_seconds, max_seconds)
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+class AsyncHttpClient:
+    """在独立事件循环线程上运行的 httpx.AsyncClient，所有请求共享同一个连接池。
+    爬虫的主流程是同步的（下载线程、流水线线程），main 本身又运行在另一个事件循环里，
+    因此请求统一提交到后台循环执行：同步代码用 *_sync 方法阻塞等待，协程用 await 等待。
+    每次请求前从 requests.Session 同步cookie和默认请求头，登录逻辑无需改动。"""
+
+    # HTTP/2 禁止携带的逐跳请求头
+    HOP_BY_HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"}
+
+    def __init__(self, session_getter, max_connections=10, timeout=10):
+        self._session_getter = session_getter
+        self.http2 = HTTP2_AVAILABLE
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="http-loop", daemon=True)
+        self._thread.start()
+        self._client = self._submit(self._create_client(max_connections, timeout)).result()
+
+    async def _create_client(self, max_connections, timeout):
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+        )
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def _request(self, method, url, headers=None, **kwargs):
+        session = self._session_getter()
+        for cookie in session.cookies:
+            self._client.cookies.set(cookie.name, cookie.value, domain=cookie.domain or "", path=cookie.path or "/")
+        merged = {k: v for k, v in session.headers.items() if k.lower() not in self.HOP_BY_HOP_HEADERS}
+        if headers:
+            merged.update({k: v for k, v in headers.items() if k.lower() not in self.HOP_BY_HOP_HEADERS})
+        return await self._client.request(method, url, headers=merged, **kwargs)
+
+    async def get(self, url, **kwargs):
+        """在调用方的事件循环中 await，实际请求在后台循环上执行"""
+        return await asyncio.wrap_future(self._submit(self._request("GET", url, **kwargs)))
+
+    def get_sync(self, url, **kwargs):
+        return self._submit(self._request("GET", url, **kwargs)).result()
+
+    def gather_sync(self, requests_args):
+        """并发执行一组GET请求，按输入顺序返回响应；失败的请求对应位置为异常对象。
+        :param requests_args: [(url, kwargs), ...]"""
+        async def run():
+            return await asyncio.gather(*(self._request("GET", url, **kwargs) for url, kwargs in requests_args),
+                                        return_exceptions=True)
+        return self._submit(run()).result()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._submit(self._client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+class DownloadLedger:
+    """基于SQLite的下载台账，记录每个BV的状态、本地路径、文件大小和校验值。
+    打开时把全部状态载入内存字典，之后的查询都是O(1)的字典访问，写入时同步落盘。
+    状态流转: searched -> downloading -> downloaded -> processed，任一环节失败记为 failed。
+    同一个库中还保存批量下载的检查点：每次运行(关键词+日期范围)下每周的搜索状态，
+    以及每个搜索页抓取到的视频和是否已入队，供 --resume 从中断处继续。"""
+
+    STATES = ("searched", "downloading", "downloaded", "processed", "failed")
+    FINISHED_STATES = ("processed", "failed")
+    WEEK_STATES = ("searching", "searched", "done")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                bvid TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                title TEXT,
+                path TEXT,
+                size INTEGER,
+                checksum TEXT,
+                error TEXT,
+                updated_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS runs (
+                run_key TEXT PRIMARY KEY,
+                keyword TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                status TEXT,
+                started_at TEXT,
+                updated_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS weeks (
+                run_key TEXT NOT NULL,
+                begin_date TEXT NOT NULL,
+                end_date TEXT,
+                status TEXT NOT NULL,
+                updated_at TEXT,
+                PRIMARY KEY (run_key, begin_date)
+            );
+            CREATE TABLE IF NOT EXISTS search_pages (
+                run_key TEXT NOT NULL,
+                begin_date TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                videos TEXT NOT NULL,
+                enqueued INTEGER NOT NULL DEFAULT 0,
+                fetched_at TEXT,
+                PRIMARY KEY (run_key, begin_date, page)
+            );
+        """)
+        self._conn.commit()
+        self._states = dict(self._conn.execute("SELECT bvid, state FROM videos"))
+
+    def state(self, bvid):
+        return self._states.get(bvid)
+
+    def is_processed(self, bvid):
+        return self._states.get(bvid) == "processed"
+
+    def processed_count(self):
+        with self._lock:
+            return sum(1 for state in self._states.values() if state == "processed")
+
+    def mark(self, bvid, state, title=None, path=None, size=None, checksum=None, error=None):
+        """更新BV状态；未传入的字段保留台账中原有的值"""
+        if state not in self.STATES:
+            raise ValueError(f"未知的台账状态: {state}")
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO videos (bvid, state, title, path, size, checksum, error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(bvid) DO UPDATE SET
+                    state = excluded.state,
+                    title = COALESCE(excluded.title, videos.title),
+                    path = COALESCE(excluded.path, videos.path),
+                    size = COALESCE(excluded.size, videos.size),
+                    checksum = COALESCE(excluded.checksum, videos.checksum),
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+                """,
+                (bvid, state, title, path, size, checksum, error, datetime.now().isoformat(timespec="seconds")),
+            )
+            self._conn.commit()
+            self._states[bvid] = state
+
+    def mark_searched(self, videos):
+        """批量登记搜索到的视频，已有记录的BV保持原状态不变"""
+        rows = []
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            for video in videos:
+                bvid = video.get('bvid', '')
+                if bvid and bvid not in self._states:
+                    rows.append((bvid, "searched", video.get('title', ''), now))
+                    self._states[bvid] = "searched"
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO videos (bvid, state, title, updated_at) VALUES (?, ?, ?, ?)", rows)
+                self._conn.commit()
+        return len(rows)
+
+    def mark_processed(self, bvid, path, title=None):
+        """登记处理完成的视频，同时记录文件大小和sha256校验值"""
+        size = os.path.getsize(path) if path and os.path.isfile(path) else None
+        checksum = self.file_checksum(path) if size else None
+        self.mark(bvid, "processed", title=title, path=path, size=size, checksum=checksum)
+
+    def update_path(self, bvid, path):
+        """文件被移动后更新台账中的路径，其余字段不变"""
+        with self._lock:
+            self._conn.execute("UPDATE videos SET path = ? WHERE bvid = ?", (path, bvid))
+            self._conn.commit()
+
+    def import_legacy(self, downloaded):
+        """一次性导入旧版 video_info.csv + 文件系统扫描的结果。
+        :param downloaded: {bvid: 本地路径} 字典
+        :return: 本次导入的数量，已导入过则返回 None"""
+        if self.get_meta("legacy_imported"):
+            return None
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = []
+        for bvid, path in downloaded.items():
+            size = os.path.getsize(path) if path and os.path.isfile(path) else None
+            rows.append((bvid, "processed", path, size, now))
+        with self._lock:
+            # 旧数据不计算校验值，避免首次启动时把整个归档读一遍
+            self._conn.executemany(
+                """
+                INSERT INTO videos (bvid, state, path, size, updated_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(bvid) DO UPDATE SET state = excluded.state, path = excluded.path, size = excluded.size
+                """,
+                rows,
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)", (now,))
+            self._conn.commit()
+            for bvid in downloaded:
+                self._states[bvid] = "processed"
+        return len(rows)
+
+    def start_run(self, run_key, keyword, start_date, end_date, resume=False):
+        """登记一次批量运行。resume=True 且存在旧检查点时沿用之并返回 True；
+        否则清空该运行的旧检查点，从头开始并返回 False"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+            resumed = bool(resume and exists)
+            if not resumed:
+                self._conn.execute("DELETE FROM weeks WHERE run_key = ?", (run_key,))
+                self._conn.execute("DELETE FROM search_pages WHERE run_key = ?", (run_key,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO runs (run_key, keyword, start_date, end_date, status, started_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'running', ?, ?)",
+                    (run_key, keyword, start_date, end_date, now, now))
+            else:
+                self._conn.execute("UPDATE runs SET status = 'running', updated_at = ? WHERE run_key = ?", (now, run_key))
+            self._conn.commit()
+        return resumed
+
+    def finish_run(self, run_key):
+        """整个运行结束：已搜索完的周全部记为完成"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute("UPDATE weeks SET status = 'done', updated_at = ? WHERE run_key = ? AND status = 'searched'",
+                               (now, run_key))
+            self._conn.execute("UPDATE runs SET status = 'done', updated_at = ? WHERE run_key = ?", (now, run_key))
+            self._conn.commit()
+
+    def mark_week(self, run_key, time_range, status):
+        if status not in self.WEEK_STATES:
+            raise ValueError(f"未知的周状态: {status}")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO weeks (run_key, begin_date, end_date, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (run_key, time_range['begin_date'], time_range['end_date'], status,
+                 datetime.now().isoformat(timespec="seconds")))
+            self._conn.commit()
+
+    def save_search_page(self, run_key, begin_date, page, videos):
+        """记录某周某页抓取到的（已筛选的）视频"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_pages (run_key, begin_date, page, videos, enqueued, fetched_at) "
+                "VALUES (?, ?, ?, ?, 0, ?)",
+                (run_key, begin_date, page, json.dumps(videos, ensure_ascii=False),
+                 datetime.now().isoformat(timespec="seconds")))
+            self._conn.commit()
+
+    def mark_page_enqueued(self, run_key, begin_date, page):
+        with self._lock:
+            self._conn.execute("UPDATE search_pages SET enqueued = 1 WHERE run_key = ? AND begin_date = ? AND page = ?",
+                               (run_key, begin_date, page))
+            self._conn.commit()
+
+    def week_checkpoint(self, run_key, begin_date):
+        """返回某周的检查点 {'status', 'pages': [(页码, 视频列表), ...], 'enqueued': 已入队页数}，没有记录时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM weeks WHERE run_key = ? AND begin_date = ?",
+                                     (run_key, begin_date)).fetchone()
+            if not row:
+                return None
+            pages = self._conn.execute(
+                "SELECT page, videos, enqueued FROM search_pages WHERE run_key = ? AND begin_date = ? ORDER BY page",
+                (run_key, begin_date)).fetchall()
+        return {
+            'status': row[0],
+            'pages': [(page, json.loads(videos)) for page, videos, _ in pages],
+            'enqueued': sum(enqueued for _, _, enqueued in pages),
+        }
+
+    def count_finished(self, videos):
+        """统计一组视频中已处理完成或已记为失败的数量"""
+        return sum(1 for video in videos if self._states.get(video.get('bvid', '')) in self.FINISHED_STATES)
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def file_checksum(path, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
 # Add log file for debugging
 log_file = "crawler_log.txt"
+log_lock = threading.Lock()
 with open(log_file, "w", encoding="utf-8") as f:
     f.write(f"Starting 哈基米 video crawler at {datetime.now()}\n")
     f.write(f"Python version: {sys.version}\n")
@@ -103,6 +436,20 @@ try:
             self.end_date = "2025-06-06"    # Default end date
             self.re_encode_videos = False   # True: 重新编码视频(耗时但格式统一) / False: 仅重命名(速度快，保留原始质量)
             
+            # 并发下载配置，可通过命令行 --workers N 覆盖
+            self.download_workers = 1
+            # 流水线模式下ffmpeg/重命名阶段的线程数，可通过 --process-workers N 覆盖
+            self.process_workers = 1
+            # 并发模式下每个BV单独的下载暂存目录，避免同一作者目录下的任务互相清理文件
+            self.staging_dir = os.path.join(self.output_dir, ".staging")
+            # 批量下载检查点：run_key 标识本次运行，resume 为 True 时从上次中断处继续
+            self.run_key = None
+            self.resume = False
+            
+            # 全局请求节流（按主机，不按线程）以及CSV的写锁
+            self.pacer = HostPacer()
+            self.csv_lock = threading.Lock()
+            
             # 登录状态
             self.is_logged_in = False
             
@@ -113,8 +460,14 @@ try:
             # 创建会话
             self.session = self._get_session()
             
-            # 存储已下载视频的BV号
-            self.downloaded_videos = self._load_downloaded_videos()
+            # 搜索和视频信息请求走异步连接池，cookie和请求头随时从 self.session 同步
+            self.http = AsyncHttpClient(lambda: self.session)
+            # 已知总页数后，每批并发请求的搜索页数
+            self.search_concurrency = 3
+            
+            # 下载台账：首次运行时从旧的CSV和目录结构导入一次，之后只查内存索引
+            self.ledger_file = os.path.join(self.output_dir, "download_ledger.db")
+            self.ledger = self._open_ledger()
             
             # Create directories
             self.create_directories()
@@ -457,9 +810,18 @@ try:
                 traceback.print_exc()
                 return False
         
-        def _load_downloaded_videos(self) -> Set[str]:
-            """从CSV文件和文件系统加载已下载的视频"""
-            downloaded_bvids = set()
+        def _open_ledger(self):
+            """打开下载台账，首次打开时导入旧版CSV/文件系统中的已下载记录"""
+            ledger = DownloadLedger(self.ledger_file)
+            if not ledger.get_meta("legacy_imported"):
+                imported = ledger.import_legacy(self._scan_legacy_downloads())
+                self.log(f"已从旧版CSV/目录结构导入 {imported} 个已下载视频到台账")
+            self.log(f"下载台账中已完成 {ledger.processed_count()} 个视频")
+            return ledger
+        
+        def _scan_legacy_downloads(self) -> Dict[str, str]:
+            """从CSV文件和文件系统扫描已下载的视频（仅用于一次性导入台账），返回 {bvid: 本地路径}"""
+            downloaded = {}
             
             # 1. 从CSV文件加载
             if os.path.exists(self.csv_file):
@@ -474,29 +836,29 @@ try:
                             for row in reader:
                                 bvid = row.get('bvid', '').strip()
                                 if bvid:
-                                    downloaded_bvids.add(bvid)
-                            self.log(f"从CSV文件加载了 {len(downloaded_bvids)} 个已下载视频")
+                                    downloaded[bvid] = row.get('local_path', '')
+                            self.log(f"从CSV文件加载了 {len(downloaded)} 个已下载视频")
                         else:
                             # 无表头，按首列处理
                             reader = csv.reader(f)
                             for row in reader:
                                 if row and row[0].startswith('BV'):
-                                    downloaded_bvids.add(row[0].strip())
-                            self.log(f"从无表头CSV加载了 {len(downloaded_bvids)} 个已下载视频")
+                                    downloaded[row[0].strip()] = ''
+                            self.log(f"从无表头CSV加载了 {len(downloaded)} 个已下载视频")
                 except Exception as e:
                     self.log(f"读取CSV文件时出错: {e}")
             
-            # 2. 从文件系统扫描目录名中的BV号
+            # 2. 从文件系统扫描目录名中的BV号（文件路径比CSV中的目录更精确，覆盖之）
             for root, dirs, files in os.walk(self.output_dir):
                 for file in files:
                     if file.endswith("_final.mp4"):
                         # 尝试从文件名中提取BV号
                         bv_match = re.search(r'(BV[a-zA-Z0-9]{10})_.*final\.mp4', file)
                         if bv_match:
-                            downloaded_bvids.add(bv_match.group(1))
+                            downloaded[bv_match.group(1)] = os.path.join(root, file)
             
-            self.log(f"总共找到 {len(downloaded_bvids)} 个已下载视频")
-            return downloaded_bvids
+            self.log(f"总共找到 {len(downloaded)} 个已下载视频")
+            return downloaded
         
         def _get_session(self):
             """Create a session with cookies and headers"""
@@ -547,9 +909,10 @@ try:
             
         def log(self, message):
             """Log a message to the log file and print it"""
-            print(message)
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(f"{datetime.now()}: {message}\n")
+            with log_lock:
+                print(message)
+                with open(log_file, "a", encoding="utf-8") as f:
+                    f.write(f"{datetime.now()}: {message}\n")
             
         def random_sleep(self, min_seconds=1, max_seconds=3):
             """Sleep for a random amount of time to avoid detection"""
@@ -557,6 +920,12 @@ try:
             self.log(f"Sleeping for {sleep_time:.2f} seconds...")
             time.sleep(sleep_time)
             
+        async def async_random_sleep(self, min_seconds=1, max_seconds=3):
+            """random_sleep 的协程版本，等待期间不阻塞事件循环"""
+            sleep_time = random.uniform(min_seconds, max_seconds)
+            self.log(f"Sleeping for {sleep_time:.2f} seconds...")
+            await asyncio.sleep(sleep_time)
+            
         def create_directories(self):
             # Create main output directory
             os.makedirs(self.output_dir, exist_ok=True)
@@ -606,7 +975,7 @@ try:
                         "Referer": "https://search.bilibili.com/",
                     })
                     
-                    response = self.session.get(full_url, headers=headers, timeout=15)
+                    response = await self.http.get(full_url, headers=headers, timeout=15)
                     
                     self.log(f"搜索响应状态码: {response.status_code}")
                     
@@ -620,7 +989,7 @@ try:
                     self.log(f"已保存搜索结果到: {debug_file}")
                     
                     # 随机延迟
-                    self.random_sleep()
+                    await self.async_random_sleep()
                     
                     if response.status_code == 200:
                         # 解析所有视频
@@ -648,14 +1017,14 @@ try:
                             return {"videos": [], "has_next_page": False}
                     elif response.status_code == 412:  # 反爬虫保护
                         self.log("检测到反爬虫保护，等待更长时间后重试...")
-                        self.random_sleep(10, 20)  # 更长的等待时间
+                        await self.async_random_sleep(10, 20)  # 更长的等待时间
                     else:
                         self.log(f"请求失败，状态码: {response.status_code}")
-                        self.random_sleep(3, 7)
+                        await self.async_random_sleep(3, 7)
                 except Exception as e:
                     self.log(f"搜索过程中出现异常: {e}")
                     traceback.print_exc()
-                    self.random_sleep(5, 10)
+                    await self.async_random_sleep(5, 10)
             
             self.log("达到最大重试次数，搜索失败")
             return {"videos": [], "has_next_page": False}
@@ -824,11 +1193,11 @@ try:
         
         def is_video_downloaded(self, bvid) -> bool:
             """检查视频是否已经下载过"""
-            # 检查已下载视频集合
-            return bvid in self.downloaded_videos
+            # 台账在内存中维护状态索引，查询为O(1)
+            return self.ledger.is_processed(bvid)
         
         def process_video(self, video_dir, bvid):
-            """使用ffmpeg处理或重命名视频"""
+            """使用ffmpeg处理或重命名视频，成功时返回final文件路径，失败返回False"""
             all_mp4_files = glob.glob(os.path.join(video_dir, "*.mp4"))
             
             if not all_mp4_files:
@@ -853,7 +1222,7 @@ try:
                 cleaned_files = glob.glob(os.path.join(video_dir, "*_final.mp4"))
                 non_double_final_cleaned_files = [f for f in cleaned_files if not os.path.basename(f).endswith("_final_final.mp4")]
                 if non_double_final_cleaned_files and os.path.getsize(non_double_final_cleaned_files[0]) > 0:
-                    return True
+                    return non_double_final_cleaned_files[0]
                 self.log(f"清理后 {video_dir} 未找到有效的final文件。")
                 return False
 
@@ -879,7 +1248,7 @@ try:
                     self.log(f"重命名成功。")
                     # After renaming, clean up any other stray files.
                     self._clean_non_final_files(video_dir)
-                    return True
+                    return output_file
                 except Exception as e:
                     self.log(f"重命名文件失败: {e}")
                     return False
@@ -888,7 +1257,7 @@ try:
             if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
                 self.log(f"输出文件 {output_file} 已存在，跳过处理。确保清理。")
                 self._clean_non_final_files(video_dir) # This will clean input_file_to_process and any other stragglers
-                return True
+                return output_file
             
             self.log(f"使用ffmpeg处理视频: {input_file_to_process} -> {output_file}")
             
@@ -931,7 +1300,7 @@ try:
                     self._clean_non_final_files(video_dir)
                     
                     self.log(f"视频处理完成: {output_file}")
-                    return True
+                    return output_file
                 except subprocess.CalledProcessError as e:
                     self.log(f"使用ffmpeg处理视频失败: {e} (尝试 {attempt+1}/{self.max_retries})")
                     self.log(f"命令错误: {e.stderr if hasattr(e, 'stderr') else '无错误输出'}")
@@ -1012,8 +1381,9 @@ try:
                 self.log(f"清理非final文件时出错: {e}")
                 return False
         
-        def download_video(self, bvid, mid, author, target_dir, title=""):
-            """使用BBDown下载视频"""
+        def download_video(self, bvid, mid, author, target_dir, title="", process=True, pub_date=None):
+            """使用BBDown下载视频，process=False 时只下载不做ffmpeg/重命名处理。
+            pub_date 为搜索结果中已有的发布日期(YYYYMMDD)，未提供时才请求视频详情接口"""
             # 检查是否已下载
             if self.is_video_downloaded(bvid):
                 self.log(f"视频 {bvid} 已经下载过，跳过")
@@ -1025,28 +1395,30 @@ try:
             # 在播放量目录内创建上传者目录
             os.makedirs(target_dir, exist_ok=True)
             
+            # 上次运行已下载完但未来得及后处理（暂存目录中还留着原始文件），直接进入后处理
+            if self.ledger.state(bvid) == "downloaded" and any(
+                    not f.endswith("_final.mp4") for f in glob.glob(os.path.join(target_dir, "*.mp4"))):
+                self.log(f"视频 {bvid} 上次已下载完成，跳过BBDown直接后处理")
+                if not process:
+                    return True
+                final_path = self.process_video(target_dir, bvid)
+                if final_path:
+                    self.ledger.mark_processed(bvid, final_path, title=title)
+                    return True
+            
             # 构建BBDown命令
             url = f"https://www.bilibili.com/video/{bvid}"
             
-            # 获取视频详情来获取发布日期
-            api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
-            try:
-                response = self.session.get(api_url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    pub_timestamp = data.get("data", {}).get("pubdate", 0)
-                    pub_date = datetime.fromtimestamp(pub_timestamp).strftime('%Y%m%d') if pub_timestamp else ''
-                    file_pattern = f"{pub_date}_{title}" if pub_date else title
-                else:
-                    file_pattern = title
-            except Exception as e:
-                self.log(f"获取视频发布日期出错: {e}")
-                file_pattern = title
+            # 文件名使用 年月日_标题，发布日期优先取自搜索结果
+            if pub_date is None:
+                pub_date = self._fetch_pub_date(bvid)
+            file_pattern = f"{pub_date}_{title}" if pub_date else title
             
             # 清理文件名模式中的特殊字符
             file_pattern = ''.join(c if c.isalnum() or c in ' _-.' else '_' for c in file_pattern)
             
             self.log(f"下载视频: {url} 到 {target_dir}")
+            self.ledger.mark(bvid, "downloading", title=title)
             
             # 使用BBDown下载视频
             for attempt in range(self.max_retries):
@@ -1115,9 +1487,15 @@ try:
                         self.random_sleep(2, 5)
                         continue
                     
+                    # 流水线模式下由后处理阶段负责ffmpeg/重命名
+                    if not process:
+                        self.ledger.mark(bvid, "downloaded")
+                        return True
+                    
                     # 处理下载的视频
-                    if self.process_video(target_dir, bvid):
-                        self.downloaded_videos.add(bvid)
+                    final_path = self.process_video(target_dir, bvid)
+                    if final_path:
+                        self.ledger.mark_processed(bvid, final_path, title=title)
                         return True
                     else:
                         self.log(f"视频处理失败，重试下载 (尝试 {attempt+1}/{self.max_retries})")
@@ -1129,26 +1507,54 @@ try:
             self.log(f"达到最大重试次数，下载失败: {bvid}")
             return False
         
+        def _fetch_pub_date(self, bvid):
+            """搜索结果中没有发布日期时，通过视频详情接口获取(YYYYMMDD)，失败返回空字符串"""
+            api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
+            try:
+                response = self.http.get_sync(api_url, timeout=10)
+                if response.status_code == 200:
+                    pub_timestamp = response.json().get("data", {}).get("pubdate", 0)
+                    return datetime.fromtimestamp(pub_timestamp).strftime('%Y%m%d') if pub_timestamp else ''
+            except Exception as e:
+                self.log(f"获取视频发布日期出错: {e}")
+            return ''
+        
+        def _video_pub_date(self, video):
+            """从搜索结果的 upload_time 中取出发布日期(YYYYMMDD)，缺失或无法解析时返回 None"""
+            try:
+                return datetime.strptime(str(video.get('upload_time', ''))[:10], '%Y-%m-%d').strftime('%Y%m%d')
+            except ValueError:
+                return None
+        
         def write_to_csv(self, video_data):
             """将视频信息写入CSV文件"""
-            # 检查文件是否存在以确定是否需要写入表头
-            file_exists = os.path.isfile(self.csv_file)
-            
-            with open(self.csv_file, 'a', newline='', encoding='utf-8') as file:
-                fieldnames = [
-                    'bvid', 'aid', 'title', 'author', 'mid', 'duration', 
-                    'view_count', 'danmaku', 'reply', 'favorite', 'coin', 
-                    'share', 'like', 'upload_time', 'url', 'local_path'
-                ]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
+            # 多个下载线程可能同时完成，表头判断和写入必须在同一把锁内完成
+            with self.csv_lock:
+                # 检查文件是否存在以确定是否需要写入表头
+                file_exists = os.path.isfile(self.csv_file)
                 
-                if not file_exists:
-                    writer.writeheader()
+                with open(self.csv_file, 'a', newline='', encoding='utf-8') as file:
+                    fieldnames = [
+                        'bvid', 'aid', 'title', 'author', 'mid', 'duration', 
+                        'view_count', 'danmaku', 'reply', 'favorite', 'coin', 
+                        'share', 'like', 'upload_time', 'url', 'local_path'
+                    ]
+                    writer = csv.DictWriter(file, fieldnames=fieldnames)
                     
-                writer.writerow(video_data)
+                    if not file_exists:
+                        writer.writeheader()
+                        
+                    writer.writerow(video_data)
         
         def write_to_failed_downloads_csv(self, video_data, error_message):
             """将下载失败的视频信息写入CSV文件"""
+            if video_data.get('bvid'):
+                self.ledger.mark(video_data['bvid'], "failed", error=error_message)
+            with self.csv_lock:
+                self._append_failed_row(video_data, error_message)
+        
+        def _append_failed_row(self, video_data, error_message):
+            """写入一条失败记录（调用方需持有 csv_lock）"""
             file_exists = os.path.isfile(self.failed_csv_file)
             
             with open(self.failed_csv_file, 'a', newline='', encoding='utf-8') as file:
@@ -1178,152 +1584,292 @@ try:
         
         def search_videos_by_timeframe(self, time_range):
             """使用B站API直接按时间段搜索哈基米视频"""
+            filtered_videos = []
+            for page, page_videos in self.iter_search_pages(time_range):
+                filtered_videos.extend(page_videos)
+            
+            self.log(f"筛选后剩余 {len(filtered_videos)} 个视频")
+            self._save_week_search_results(time_range, filtered_videos)
+            return filtered_videos
+        
+        def iter_search_pages(self, time_range, start_page=1):
+            """逐页搜索指定时间段，每解析完一页就产出 (页码, 该页筛选后的视频列表)。
+            时间段的结果数达到搜索上限时先拆分为多个子窗口（见 _split_search_windows），
+            子窗口的页码记为 窗口序号*100+页码，未拆分时页码不变，续跑时据此定位到子窗口和页"""
             keyword = "哈基米"
             self.log(f"搜索关键词 '{keyword}' 在 {time_range['begin_date']} 至 {time_range['end_date']} 期间的视频")
             
             # 使用B站搜索API + UNIX时间戳
             url = "https://api.bilibili.com/x/web-interface/search/type"
             
-            # 处理的视频列表
-            all_videos = []
+            # 累计解析出的视频数量（筛选前）
+            found = [0]
             
-            # 页码
-            page = 1
+            page_stride = 100
+            windows = self._split_search_windows(keyword, url, time_range)
+            for index, (window, first_response) in enumerate(windows):
+                window_start_page = max(1, start_page - index * page_stride)
+                if window_start_page > page_stride:
+                    continue
+                if len(windows) > 1:
+                    self.log(f"子窗口 {index+1}/{len(windows)}: {window['begin_date']} 至 {window['end_date']}")
+                for page, videos in self._iter_window_pages(keyword, url, window, window_start_page,
+                                                            first_response, found):
+                    yield index * page_stride + page, videos
+            
+            self.log(f"搜索完成，共找到 {found[0]} 个视频")
+        
+        def _split_search_windows(self, keyword, url, time_range):
+            """探测时间段第一页的 numResults，达到搜索上限(1000条)的窗口对半拆分后继续探测，
+            直到不超限或窗口不足1分钟；同一轮的探测按 search_concurrency 分批并发。
+            返回按时间排序的 [(窗口time_range, 第一页响应)]，没有结果的窗口直接丢弃；
+            第一页响应留给翻页逻辑作为第1页使用，探测失败的窗口也原样返回，由翻页逻辑按原有方式处理"""
+            result_cap = 1000
+            windows = []
+            pending = [time_range]
+            while pending:
+                batch, pending = pending[:self.search_concurrency], pending[self.search_concurrency:]
+                responses = self.http.gather_sync([
+                    (url, {"params": self._search_api_params(keyword, window, 1), "timeout": 10}) for window in batch
+                ])
+                for window, response in zip(batch, responses):
+                    data = None
+                    if not isinstance(response, Exception) and response.status_code == 200:
+                        try:
+                            json_data = response.json()
+                            if json_data.get("code") == 0:
+                                data = json_data.get("data") or {}
+                        except ValueError:
+                            pass
+                    if data is None:
+                        windows.append((window, response))
+                        continue
+                    
+                    num_results = int(data.get("numResults") or 0)
+                    if not num_results or not data.get("result"):
+                        self.log(f"时间窗口 {window['begin_date']} 至 {window['end_date']} 没有结果，跳过")
+                        continue
+                    begin_ts, end_ts = window['begin_timestamp'], window['end_timestamp']
+                    if num_results >= result_cap:
+                        if end_ts - begin_ts > 60:
+                            mid_ts = (begin_ts + end_ts) // 2
+                            self.log(f"时间窗口 {window['begin_date']} 至 {window['end_date']} 结果数达到上限 {result_cap}，对半拆分")
+                            pending.append(self._time_range_from_timestamps(begin_ts, mid_ts))
+                            pending.append(self._time_range_from_timestamps(mid_ts + 1, end_ts))
+                            continue
+                        self.log(f"时间窗口 {begin_ts}-{end_ts} 已无法再拆分，结果将被截断")
+                    windows.append((window, response))
+                if pending:
+                    self.random_sleep(2, 5)  # 适当延迟，避免请求过快
+            return sorted(windows, key=lambda w: w[0]['begin_timestamp'])
+        
+        def _time_range_from_timestamps(self, begin_timestamp, end_timestamp):
+            return {
+                'begin_date': datetime.fromtimestamp(begin_timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+                'end_date': datetime.fromtimestamp(end_timestamp).strftime("%Y-%m-%d %H:%M:%S"),
+                'begin_timestamp': begin_timestamp,
+                'end_timestamp': end_timestamp
+            }
+        
+        def _iter_window_pages(self, keyword, url, time_range, start_page, first_response, found):
+            """翻页获取一个时间窗口的结果，产出 (页码, 该页筛选后的视频列表)，found[0] 累计筛选前的视频数。
+            第一次响应给出总页数后，剩余页面按 search_concurrency 分批并发请求，仍按页码顺序产出"""
+            # 页码（续跑时从检查点的下一页开始）
+            page = start_page
             max_pages = 100  # 增加最大页码数，确保获取所有结果
+            total_pages = None  # 首次成功响应后由 numPages/numResults 得出
             has_more = True
+            prefetched = {1: first_response} if start_page == 1 and first_response is not None else {}
             
             while page <= max_pages and has_more:
-                self.log(f"获取第 {page} 页...")
+                if total_pages is None:
+                    batch = [page]
+                else:
+                    batch = list(range(page, min(total_pages, max_pages, page + self.search_concurrency - 1) + 1))
+                if len(batch) > 1:
+                    self.log(f"并发获取第 {batch[0]}-{batch[-1]} 页...")
+                else:
+                    self.log(f"获取第 {page} 页...")
                 
-                params = {
-                    "search_type": "video",
-                    "keyword": keyword,
-                    "order": "pubdate",  # 按发布时间排序
-                    "duration": "0",     # 不限时长
-                    "tids": "0",         # 不限分区
-                    "page": str(page),
-                    "pubdate": "1",      # 启用时间筛选
-                    "pubtime_begin_s": str(time_range['begin_timestamp']),
-                    "pubtime_end_s": str(time_range['end_timestamp'])
-                }
+                # 发送请求（探测窗口时已取得的第1页不再重复请求）
+                to_fetch = [p for p in batch if p not in prefetched]
+                fetched = dict(zip(to_fetch, self.http.gather_sync([
+                    (url, {"params": self._search_api_params(keyword, time_range, p), "timeout": 10}) for p in to_fetch
+                ]))) if to_fetch else {}
+                responses = [prefetched.pop(p) if p in prefetched else fetched[p] for p in batch]
                 
-                # 发送请求
-                try:
-                    response = self.session.get(url, params=params, timeout=10)
-                    self.log(f"响应状态码: {response.status_code}")
-                    
-                    if response.status_code == 200:
-                        try:
-                            json_data = response.json()
-                            
-                            if json_data.get("code") == 0 and json_data.get("data") and json_data["data"].get("result"):
-                                results = json_data["data"]["result"]
-                                self.log(f"找到 {len(results)} 个结果")
-                                
-                                # 检查是否有结果
-                                if not results:
-                                    self.log("没有更多结果，退出翻页")
-                                    has_more = False
-                                    break
-                                
-                                # 提取视频信息并添加到列表（先不筛选，收集所有数据）
-                                for item in results:
-                                    try:
-                                        # 从HTML标签中提取纯文本
-                                        title = item.get('title', '').replace('<em class="keyword">', '').replace('</em>', '')
-                                        pubdate = item.get('pubdate', 0)
-                                        pubdate_str = datetime.fromtimestamp(pubdate).strftime('%Y-%m-%d %H:%M:%S') if pubdate else 'N/A'
-                                        
-                                        # 解析播放量和时长
-                                        try:
-                                            view_count = int(item.get('play', 0))
-                                        except (ValueError, TypeError):
-                                            view_count = 0
-
-                                        # 解析时长：支持字符串格式（如 'HH:MM:SS' 或 'MM:SS'）
-                                        raw_duration = item.get('duration', 0)
-                                        if isinstance(raw_duration, str) and ':' in raw_duration:
-                                            duration = self.parse_duration(raw_duration)
-                                        else:
-                                            try:
-                                                duration = int(raw_duration)
-                                            except (ValueError, TypeError):
-                                                duration = 0
-                                        
-                                        # 提取发布日期，用于文件名
-                                        pub_date = datetime.fromtimestamp(pubdate).strftime('%Y%m%d') if pubdate else ''
-                                        
-                                        # 解析视频数据
-                                        video_data = {
-                                            'bvid': item.get('bvid', ''),
-                                            'aid': item.get('aid', ''),
-                                            'title': title,
-                                            'author': item.get('author', ''),
-                                            'mid': item.get('mid', ''),
-                                            'duration': duration,
-                                            'view_count': view_count,
-                                            'danmaku': item.get('video_review', 0),
-                                            'reply': item.get('review', 0),
-                                            'favorite': item.get('favorites', 0),
-                                            'coin': item.get('coins', 0),
-                                            'share': item.get('share', 0),
-                                            'like': item.get('like', 0),
-                                            'upload_time': pubdate_str,
-                                            'url': f"https://www.bilibili.com/video/{item.get('bvid', '')}",
-                                            'local_path': ''  # 初始化，本地路径留空
-                                        }
-                                        
-                                        # 添加到列表
-                                        all_videos.append(video_data)
-                                    except Exception as e:
-                                        self.log(f"处理视频数据时出错: {e}")
-                                
-                                # 检查是否有下一页
-                                # 判断是否有更多页 - B站API通常每页返回20条结果
-                                has_more = len(results) >= 20
-                                if not has_more:
-                                    self.log(f"当前页结果数量为 {len(results)}，少于20条，可能没有下一页")
-                                
-                                # 检查是否已到达总数上限
-                                if json_data.get("data") and json_data["data"].get("numResults"):
-                                    total_results = int(json_data["data"]["numResults"])
-                                    current_count = (page - 1) * 20 + len(results)
-                                    if current_count >= total_results:
-                                        self.log(f"已获取全部结果: {current_count}/{total_results}")
-                                        has_more = False
-                                
-                            else:
-                                self.log("API未返回结果")
-                                has_more = False
-                                break
-                        except Exception as e:
-                            self.log(f"解析响应数据时出错: {e}")
-                            self.random_sleep(3, 7)
+                for p, response in zip(batch, responses):
+                    if isinstance(response, Exception):
+                        self.log(f"发送请求时出错: {response}")
+                        self.random_sleep(5, 10)
+                        if p > 1:  # 如果已经获取了一些结果，可以继续处理
+                            has_more = False
                             break
-                    else:
+                        continue
+                    
+                    self.log(f"响应状态码: {response.status_code}")
+                    if response.status_code != 200:
                         self.log(f"请求失败，状态码: {response.status_code}")
                         self.random_sleep(5, 10)
                         # 连续失败不要立即退出，而是尝试其他页
-                        if page > 1:  # 如果已经获取了一些结果，可以继续处理
+                        if p > 1:  # 如果已经获取了一些结果，可以继续处理
                             has_more = False
                             break
-                except Exception as e:
-                    self.log(f"发送请求时出错: {e}")
-                    self.random_sleep(5, 10)
-                    if page > 1:  # 如果已经获取了一些结果，可以继续处理
+                        continue
+                    
+                    try:
+                        json_data = response.json()
+                        data = json_data.get("data") or {}
+                        results = data.get("result") if json_data.get("code") == 0 else None
+                        if not results:
+                            self.log("API未返回结果")
+                            has_more = False
+                            break
+                        self.log(f"找到 {len(results)} 个结果")
+                        
+                        # 提取视频信息，整页解析完成后筛选并立即产出
+                        page_videos = self._parse_search_api_results(results)
+                        found[0] += len(page_videos)
+                        filtered_videos = self._filter_search_videos(page_videos)
+                        self.ledger.mark_searched(filtered_videos)
+                        yield p, filtered_videos
+                        
+                        # 判断是否有更多页 - B站API通常每页返回20条结果
+                        if len(results) < 20:
+                            self.log(f"当前页结果数量为 {len(results)}，少于20条，可能没有下一页")
+                            has_more = False
+                            break
+                        
+                        # 检查是否已到达总数上限
+                        if data.get("numResults"):
+                            total_results = int(data["numResults"])
+                            current_count = (p - 1) * 20 + len(results)
+                            if current_count >= total_results:
+                                self.log(f"已获取全部结果: {current_count}/{total_results}")
+                                has_more = False
+                                break
+                            total_pages = int(data.get("numPages") or (total_results + 19) // 20)
+                    except Exception as e:
+                        self.log(f"解析响应数据时出错: {e}")
+                        self.random_sleep(3, 7)
                         has_more = False
                         break
                 
                 # 翻页
-                page += 1
-                self.random_sleep(2, 5)  # 适当延迟，避免请求过快
-            
-            # 搜索完成后，筛选视频
-            self.log(f"搜索完成，共找到 {len(all_videos)} 个视频，开始筛选...")
-            
-            # 筛选播放量大于500，时长小于10分钟的视频
+                page = batch[-1] + 1
+                if has_more:
+                    self.random_sleep(2, 5)  # 适当延迟，避免请求过快
+        
+        def _search_api_params(self, keyword, time_range, page):
+            return {
+                "search_type": "video",
+                "keyword": keyword,
+                "order": "pubdate",  # 按发布时间排序
+                "duration": "0",     # 不限时长
+                "tids": "0",         # 不限分区
+                "page": str(page),
+                "pubdate": "1",      # 启用时间筛选
+                "pubtime_begin_s": str(time_range['begin_timestamp']),
+                "pubtime_end_s": str(time_range['end_timestamp'])
+            }
+        
+        def _parse_search_api_results(self, results):
+            """把搜索API一页的结果转换为视频数据字典列表"""
+            page_videos = []
+            for item in results:
+                try:
+                    # 从HTML标签中提取纯文本
+                    title = item.get('title', '').replace('<em class="keyword">', '').replace('</em>', '')
+                    pubdate = item.get('pubdate', 0)
+                    pubdate_str = datetime.fromtimestamp(pubdate).strftime('%Y-%m-%d %H:%M:%S') if pubdate else 'N/A'
+                    
+                    # 解析播放量和时长
+                    try:
+                        view_count = int(item.get('play', 0))
+                    except (ValueError, TypeError):
+                        view_count = 0
+
+                    # 解析时长：支持字符串格式（如 'HH:MM:SS' 或 'MM:SS'）
+                    raw_duration = item.get('duration', 0)
+                    if isinstance(raw_duration, str) and ':' in raw_duration:
+                        duration = self.parse_duration(raw_duration)
+                    else:
+                        try:
+                            duration = int(raw_duration)
+                        except (ValueError, TypeError):
+                            duration = 0
+                    
+                    # 解析视频数据
+                    video_data = {
+                        'bvid': item.get('bvid', ''),
+                        'aid': item.get('aid', ''),
+                        'title': title,
+                        'author': item.get('author', ''),
+                        'mid': item.get('mid', ''),
+                        'duration': duration,
+                        'view_count': view_count,
+                        'danmaku': item.get('video_review', 0),
+                        'reply': item.get('review', 0),
+                        'favorite': item.get('favorites', 0),
+                        'coin': item.get('coins', 0),
+                        'share': item.get('share', 0),
+                        'like': item.get('like', 0),
+                        'upload_time': pubdate_str,
+                        'url': f"https://www.bilibili.com/video/{item.get('bvid', '')}",
+                        'local_path': ''  # 初始化，本地路径留空
+                    }
+                    
+                    # 添加到列表
+                    page_videos.append(video_data)
+                except Exception as e:
+                    self.log(f"处理视频数据时出错: {e}")
+            return page_videos
+        
+        def iter_week_pages(self, time_range):
+            """产出某周的 (页码, 候选视频列表, 是否请求了搜索API)，并在台账中维护该周的检查点。
+            续跑时已搜索完的周直接回放检查点；搜索到一半的周先回放已记录的页，再从下一页继续请求；
+            没有检查点时优先使用 search_results 缓存（记为第0页），最后才请求搜索API。"""
+            run_key = self.run_key
+            begin = time_range['begin_date']
+            replayed = []
+            checkpoint = self.ledger.week_checkpoint(run_key, begin) if run_key and self.resume else None
+            if checkpoint:
+                replayed = checkpoint['pages']
+                for page, videos in replayed:
+                    yield page, videos, False
+                if checkpoint['status'] != "searching":
+                    return
+                if replayed:
+                    self.log(f"续跑：{begin} 已记录 {len(replayed)} 页，从第 {replayed[-1][0] + 1} 页继续搜索")
+            
+            if not replayed:
+                cached = self._load_cached_week_videos(time_range)
+                if cached is not None:
+                    if run_key:
+                        self.ledger.save_search_page(run_key, begin, 0, cached)
+                        self.ledger.mark_week(run_key, time_range, "searched")
+                    yield 0, cached, False
+                    return
+            
+            if run_key:
+                self.ledger.mark_week(run_key, time_range, "searching")
+            week_videos = [video for _, videos in replayed for video in videos]
+            start_page = replayed[-1][0] + 1 if replayed else 1
+            for page, videos in self.iter_search_pages(time_range, start_page):
+                if run_key:
+                    self.ledger.save_search_page(run_key, begin, page, videos)
+                week_videos.extend(videos)
+                yield page, videos, True
+            
+            self.log(f"筛选后剩余 {len(week_videos)} 个视频")
+            self._save_week_search_results(time_range, week_videos)
+            if run_key:
+                self.ledger.mark_week(run_key, time_range, "searched")
+        
+        def _filter_search_videos(self, videos):
+            """筛选播放量不低于下限、时长不超过上限的视频"""
             filtered_videos = []
-            for video in all_videos:
+            for video in videos:
                 view_count = video.get('view_count', 0)
                 duration = video.get('duration', 0)
                 
@@ -1337,10 +1883,10 @@ try:
                         reason.append(f"时长({duration}秒)超过{self.max_duration}秒")
                     
                     self.log(f"筛选掉视频 {video.get('bvid', '')}: {video.get('title', '')} - 原因: {', '.join(reason)}")
-            
-            self.log(f"筛选后剩余 {len(filtered_videos)} 个视频")
-            
-            # 保存搜索结果到CSV
+            return filtered_videos
+        
+        def _save_week_search_results(self, time_range, videos):
+            """保存某个时间段筛选后的搜索结果到CSV，作为下次运行的缓存"""
             result_dir = os.path.join(self.output_dir, "search_results")
             os.makedirs(result_dir, exist_ok=True)
             result_file = os.path.join(result_dir, f"{time_range['begin_date']}_{time_range['end_date']}_哈基米.csv")
@@ -1355,52 +1901,60 @@ try:
                 ]
                 writer = csv.DictWriter(f, fieldnames=fieldnames)
                 writer.writeheader()
-                for video in filtered_videos:
+                for video in videos:
                     # video_dict 已含 local_path 字段
                     writer.writerow(video)
             
             self.log(f"筛选后的视频列表已保存到 {result_file}")
-            return filtered_videos
+            return result_file
         
-        def download_videos_by_timeframe(self, time_range):
-            """下载指定时间范围内的视频"""
+        def _load_cached_week_videos(self, time_range):
+            """读取某周已保存的搜索结果并重新筛选；缓存不存在或读取失败时返回 None"""
+            begin = time_range['begin_date']
+            end = time_range['end_date']
+            result_file = os.path.join(self.output_dir, 'search_results', f"{begin}_{end}_哈基米.csv")
+            if not os.path.exists(result_file):
+                self.log("周表不存在，开始搜索该时间段的视频...")
+                return None
+            
+            self.log(f"加载每周搜索结果: {result_file}")
+            try:
+                with open(result_file, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    videos = list(reader)
+                self.log(f"从周表加载了 {len(videos)} 条记录")
+                # 过滤缓存中的视频，确保符合播放量和时长要求
+                original_count = len(videos)
+                filtered_videos = []
+                for video in videos:
+                    try:
+                        vc = int(video.get('view_count', 0))
+                    except:
+                        vc = 0
+                    try:
+                        dur = int(video.get('duration', 0))
+                    except:
+                        dur = self.parse_duration(video.get('duration', '0'))
+                    if vc >= self.min_view_count and dur <= self.max_duration:
+                        filtered_videos.append(video)
+                    else:
+                        self.log(f"缓存中过滤掉视频 {video.get('bvid', '')} ({video.get('title', '')}): 时长{dur}s, 播放量{vc}")
+                self.log(f"缓存视频过滤后剩余 {len(filtered_videos)}/{original_count} 条")
+                return filtered_videos
+            except Exception as e:
+                self.log(f"读取周表出错: {e}, 将重新搜索")
+                return None
+        
+        def download_videos_by_timeframe(self, time_range, videos=None):
+            """下载指定时间范围内的视频；videos 为 None 时先读缓存或搜索"""
             begin = time_range['begin_date']
             end = time_range['end_date']
             self.log(f"开始下载 {begin} 至 {end} 期间的哈基米视频")
             
             # 尝试加载每周预先保存的搜索结果CSV
-            result_file = os.path.join(self.output_dir, 'search_results', f"{begin}_{end}_哈基米.csv")
-            videos = []
-            if os.path.exists(result_file):
-                self.log(f"加载每周搜索结果: {result_file}")
-                try:
-                    with open(result_file, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        videos = list(reader)
-                    self.log(f"从周表加载了 {len(videos)} 条记录")
-                    # 过滤缓存中的视频，确保符合播放量和时长要求
-                    original_count = len(videos)
-                    filtered_videos = []
-                    for video in videos:
-                        try:
-                            vc = int(video.get('view_count', 0))
-                        except:
-                            vc = 0
-                        try:
-                            dur = int(video.get('duration', 0))
-                        except:
-                            dur = self.parse_duration(video.get('duration', '0'))
-                        if vc >= self.min_view_count and dur <= self.max_duration:
-                            filtered_videos.append(video)
-                        else:
-                            self.log(f"缓存中过滤掉视频 {video.get('bvid', '')} ({video.get('title', '')}): 时长{dur}s, 播放量{vc}")
-                    videos = filtered_videos
-                    self.log(f"缓存视频过滤后剩余 {len(videos)}/{original_count} 条")
-                except Exception as e:
-                    self.log(f"读取周表出错: {e}, 将重新搜索")
-                    videos = self.search_videos_by_timeframe(time_range)
-            else:
-                self.log("周表不存在，开始搜索该时间段的视频...")
+            if videos is None:
+                videos = self._load_cached_week_videos(time_range)
+            if videos is None:
                 videos = self.search_videos_by_timeframe(time_range)
             
             if not videos:
@@ -1410,117 +1964,195 @@ try:
             # 按播放量排序（降序）
             videos = sorted(videos, key=lambda x: int(x.get('view_count', 0)), reverse=True)
             
-            # 检查video_info.csv是否存在，加载已下载视频
-            self.log("重新加载已下载视频列表...")
-            self.downloaded_videos = self._load_downloaded_videos()
-            
             # 显示将要下载的视频
             self.log(f"找到 {len(videos)} 个视频，开始下载（按播放量排序）：")
             for i, video in enumerate(videos[:10]):  # 只显示前10个
                 self.log(f"{i+1}. {video['title']} - 播放: {video['view_count']} - UP: {video['author']}")
             
+            # 同一BV可能出现在多个搜索页中，去重后再分配，避免两个线程下载同一个视频
+            unique_videos = []
+            seen_bvids = set()
+            for video in videos:
+                bvid = video.get('bvid', '')
+                if bvid and bvid not in seen_bvids:
+                    seen_bvids.add(bvid)
+                    unique_videos.append(video)
+            videos = unique_videos
+            
             # 开始下载视频
             total_videos = len(videos)
-            success_count = 0
-            skip_count = 0
-            fail_count = 0
+            counts = {'success': 0, 'skip': 0, 'fail': 0}
             
-            for i, video in enumerate(videos):
-                bvid = video.get('bvid', '')
-                if not bvid:
-                    continue
-                
-                print_progress(i+1, total_videos, f"下载进度 ({begin}~{end})")
-                self.log(f"处理视频 {i+1}/{len(videos)}: {video['title']}")
-                # Debug: 打印原始 video 参数
-                self.log(f"DEBUG video dict: {video}")
-                
-                # 检查是否已下载
-                if self.is_video_downloaded(bvid):
-                    self.log(f"视频 {bvid} 已经下载过，跳过")
-                    skip_count += 1
-                    continue
-                
-                # 获取视频信息
-                try:
-                    view_count = int(video.get('view_count', 0))
-                except:
-                    view_count = 0
-                author = video.get('author', '')
-                mid = video.get('mid', '')
-                title = video.get('title', '')
-
-                # 过滤超长视频（超过10分钟）
-                try:
-                    dur = int(video.get('duration', 0))
-                except (ValueError, TypeError):
-                    dur = self.parse_duration(video.get('duration', '0'))
-                if dur > self.max_duration:
-                    self.log(f"跳过超长视频 {video.get('bvid', '')}：时长 {dur} 秒")
-                    skip_count += 1
-                    continue
-
-                # 根据播放量确定目标目录
-                view_dir = self.get_target_directory(view_count)
-                
-                # 在播放量目录下创建作者目录
-                author_dir = os.path.join(view_dir, f"{author}_{mid}")
-                os.makedirs(author_dir, exist_ok=True)
-                
-                # 构建下载目标目录 (保持原样，不再创建额外子目录)
-                target_dir = author_dir
-                
-                # 下载视频
-                self.log(f"下载视频: {video['title']} 到 {target_dir}")
-                download_success = self.download_video(bvid, mid, author, target_dir, title)
-                
-                if download_success:
-                    # 准备视频数据以写入CSV
-                    video_data = {
-                        'bvid': bvid,
-                        'aid': video.get('aid', ''),
-                        'title': title,
-                        'author': author,
-                        'mid': mid,
-                        'duration': video.get('duration', 0),
-                        'view_count': view_count,
-                        'danmaku': video.get('danmaku', 0),
-                        'reply': video.get('reply', 0),
-                        'favorite': video.get('favorite', 0),
-                        'coin': video.get('coin', 0),
-                        'share': video.get('share', 0),
-                        'like': video.get('like', 0),
-                        'upload_time': video.get('upload_time', ''),
-                        'url': video.get('url', ''),
-                        'local_path': target_dir
-                    }
+            if self.download_workers <= 1:
+                for i, video in enumerate(videos):
+                    print_progress(i+1, total_videos, f"下载进度 ({begin}~{end})")
+                    status = self._download_single_video(video, i+1, total_videos)
+                    counts[status] += 1
                     
-                    # 写入CSV
-                    self.write_to_csv(video_data)
-                    success_count += 1
-                    
-                    # 清理非final的文件
-                    self._clean_non_final_files(target_dir)
-                else:
-                    # 下载失败，记录到失败列表
-                    self.log(f"下载失败: {bvid} - {title}")
-                    fail_count += 1
-                    error_message = f"下载失败，可能的原因：网络问题、视频被删除或设为私有"
-                    self.write_to_failed_downloads_csv(video, error_message)
+                    # 视频间随机延迟
+                    if status != 'skip' and i < len(videos) - 1:  # 如果不是最后一个视频
+                        self.random_sleep(3, 6)
+            else:
+                self.log(f"并发下载模式：{self.download_workers} 个工作线程")
+                with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix="bbdown") as pool:
+                    futures = {
+                        pool.submit(self._download_single_video, video, i+1, total_videos): video
+                        for i, video in enumerate(videos)
+                    }
+                    for done, future in enumerate(as_completed(futures), 1):
+                        video = futures[future]
+                        try:
+                            status = future.result()
+                        except Exception as e:
+                            self.log(f"下载线程异常: {video.get('bvid', '')} - {e}")
+                            traceback.print_exc()
+                            self.write_to_failed_downloads_csv(video, f"下载线程异常: {e}")
+                            status = 'fail'
+                        counts[status] += 1
+                        print_progress(done, total_videos, f"下载进度 ({begin}~{end})")
+            
+            self.log(f"本周期视频下载完成：成功 {counts['success']}，跳过 {counts['skip']}，失败 {counts['fail']}")
+            return
+        
+        def _download_single_video(self, video, index, total):
+            """下载单个视频并登记结果，返回 'success' / 'skip' / 'fail'"""
+            bvid = video.get('bvid', '')
+            if not bvid:
+                return 'skip'
+            
+            self.log(f"处理视频 {index}/{total}: {video['title']}")
+            # Debug: 打印原始 video 参数
+            self.log(f"DEBUG video dict: {video}")
+            
+            if self._should_skip_video(video):
+                return 'skip'
+            
+            author = video.get('author', '')
+            mid = video.get('mid', '')
+            title = video.get('title', '')
+            target_dir = self._prepare_target_dir(video)
+            
+            # 下载视频
+            self.log(f"下载视频: {video['title']} 到 {target_dir}")
+            pub_date = self._video_pub_date(video)
+            if self.download_workers <= 1:
+                download_success = self.download_video(bvid, mid, author, target_dir, title, pub_date=pub_date)
+            else:
+                # 所有线程共享同一条B站请求时间线，而不是每个线程各自sleep
+                self.pacer.wait("www.bilibili.com", 3, 6)
+                download_success = self._download_via_staging(bvid, mid, author, target_dir, title, pub_date)
+            
+            if download_success:
+                # 写入CSV
+                self.write_to_csv(self._build_video_record(video, target_dir))
                 
-                # 视频间随机延迟
-                if i < len(videos) - 1:  # 如果不是最后一个视频
-                    self.random_sleep(3, 6)
+                # 清理非final的文件（并发模式下文件已在暂存目录中处理完毕）
+                if self.download_workers <= 1:
+                    self._clean_non_final_files(target_dir)
+                return 'success'
             
-            self.log(f"本周期视频下载完成：成功 {success_count}，跳过 {skip_count}，失败 {fail_count}")
-            return
+            # 下载失败，记录到失败列表
+            self.log(f"下载失败: {bvid} - {title}")
+            error_message = f"下载失败，可能的原因：网络问题、视频被删除或设为私有"
+            self.write_to_failed_downloads_csv(video, error_message)
+            return 'fail'
+        
+        def _should_skip_video(self, video):
+            """已下载或超长的视频直接跳过"""
+            bvid = video.get('bvid', '')
+            # 检查是否已下载
+            if self.is_video_downloaded(bvid):
+                self.log(f"视频 {bvid} 已经下载过，跳过")
+                return True
+            
+            # 续跑时不重试上次已记为失败的视频，普通运行仍会重试
+            if self.resume and self.ledger.state(bvid) == "failed":
+                self.log(f"续跑模式：视频 {bvid} 上次已记为失败，跳过")
+                return True
+            
+            # 过滤超长视频（超过10分钟）
+            try:
+                dur = int(video.get('duration', 0))
+            except (ValueError, TypeError):
+                dur = self.parse_duration(video.get('duration', '0'))
+            if dur > self.max_duration:
+                self.log(f"跳过超长视频 {bvid}：时长 {dur} 秒")
+                return True
+            return False
+        
+        def _video_view_count(self, video):
+            try:
+                return int(video.get('view_count', 0))
+            except:
+                return 0
+        
+        def _prepare_target_dir(self, video):
+            """根据播放量和作者创建并返回视频的目标目录"""
+            # 根据播放量确定目标目录
+            view_dir = self.get_target_directory(self._video_view_count(video))
+            
+            # 在播放量目录下创建作者目录 (保持原样，不再创建额外子目录)
+            author_dir = os.path.join(view_dir, f"{video.get('author', '')}_{video.get('mid', '')}")
+            os.makedirs(author_dir, exist_ok=True)
+            return author_dir
+        
+        def _build_video_record(self, video, target_dir):
+            """准备写入 video_info.csv 的视频数据"""
+            return {
+                'bvid': video.get('bvid', ''),
+                'aid': video.get('aid', ''),
+                'title': video.get('title', ''),
+                'author': video.get('author', ''),
+                'mid': video.get('mid', ''),
+                'duration': video.get('duration', 0),
+                'view_count': self._video_view_count(video),
+                'danmaku': video.get('danmaku', 0),
+                'reply': video.get('reply', 0),
+                'favorite': video.get('favorite', 0),
+                'coin': video.get('coin', 0),
+                'share': video.get('share', 0),
+                'like': video.get('like', 0),
+                'upload_time': video.get('upload_time', ''),
+                'url': video.get('url', ''),
+                'local_path': target_dir
+            }
+        
+        def _download_via_staging(self, bvid, mid, author, target_dir, title="", pub_date=None):
+            """在BV独占的暂存目录中下载并处理视频，完成后把final文件移入目标目录。
+            process_video 和 _clean_non_final_files 按目录匹配mp4，同一作者的多个视频
+            并发写入同一目录时会互相误处理、误删，因此并发模式下每个BV单独一个目录。"""
+            staging_dir = os.path.join(self.staging_dir, bvid)
+            os.makedirs(staging_dir, exist_ok=True)
+            try:
+                if not self.download_video(bvid, mid, author, staging_dir, title, pub_date=pub_date):
+                    return False
+                moved = self._promote_staged_files(staging_dir, target_dir)
+                if moved:
+                    self.ledger.update_path(bvid, moved[0])
+                return True
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        
+        def _promote_staged_files(self, staging_dir, target_dir):
+            """把暂存目录中处理完成的final文件移入目标目录，返回移动后的路径列表"""
+            os.makedirs(target_dir, exist_ok=True)
+            moved = []
+            for fpath in glob.glob(os.path.join(staging_dir, "*_final.mp4")):
+                dpath = os.path.join(target_dir, os.path.basename(fpath))
+                if os.path.exists(dpath):
+                    os.remove(dpath)
+                shutil.move(fpath, dpath)
+                self.log(f"移动文件 {fpath} -> {dpath}")
+                moved.append(dpath)
+            return moved
         
         def delete_downloaded_videos(self):
             """删除所有已下载的视频"""
             self.log("正在删除整个hachimi_videos目录...")
             
-            # 直接删除整个输出目录
+            # 直接删除整个输出目录（台账文件也在其中，先关闭连接）
             try:
+                self.ledger.close()
                 if os.path.exists(self.output_dir):
                     import shutil
                     shutil.rmtree(self.output_dir)
@@ -1532,12 +2164,12 @@ try:
                 os.makedirs(self.output_dir, exist_ok=True)
                 self.log(f"已重新创建输出目录: {self.output_dir}")
                 
-                # 清空已下载视频集合
-                self.downloaded_videos = set()
-                
                 # 重置CSV文件路径
                 self.csv_file = os.path.join(self.output_dir, "video_info.csv")
                 
+                # 重新创建空的下载台账
+                self.ledger = self._open_ledger()
+                
                 # 重新创建子目录
                 self.create_directories()
                 
@@ -1545,6 +2177,16 @@ try:
             except Exception as e:
                 self.log(f"删除目录失败: {e}")
         
+        def _start_checkpointed_run(self, start_date, end_date):
+            """在台账中登记本次批量运行，返回是否从上次的检查点续跑"""
+            self.run_key = f"{self.search_keyword}:{start_date}:{end_date}"
+            resumed = self.ledger.start_run(self.run_key, self.search_keyword, start_date, end_date, self.resume)
+            if resumed:
+                self.log(f"从检查点续跑: {self.run_key}")
+            elif self.resume:
+                self.log(f"未找到 {self.run_key} 的检查点，从头开始")
+            return resumed
+        
         def generate_weekly_timeframes(self, start_date_str, end_date_str):
             """生成从起始日期到结束日期的每7天的时间范围"""
             # 将字符串转换为日期对象
@@ -1594,18 +2236,18 @@ try:
             search_results_dir = os.path.join(self.output_dir, "search_results")
             os.makedirs(search_results_dir, exist_ok=True)
             
-            # 刷新已下载视频列表
-            self.downloaded_videos = self._load_downloaded_videos()
-            self.log(f"已加载 {len(self.downloaded_videos)} 个已下载视频")
+            # 已下载视频由台账维护，无需重新扫描CSV和目录
+            self.log(f"台账中已下载 {self.ledger.processed_count()} 个视频")
             
             # 生成时间段列表
             time_frames = self.generate_weekly_timeframes(start_date, end_date)
             self.log(f"共生成 {len(time_frames)} 个时间段")
+            resumed = self._start_checkpointed_run(start_date, end_date)
             
-            # 创建总体进度文件
+            # 创建总体进度文件（续跑时追加）
             progress_file = os.path.join(self.output_dir, "download_progress.txt")
-            with open(progress_file, 'w', encoding='utf-8') as f:
-                f.write(f"开始时间: {datetime.now()}\n")
+            with open(progress_file, 'a' if resumed else 'w', encoding='utf-8') as f:
+                f.write(f"{'续跑' if resumed else '开始'}时间: {datetime.now()}\n")
                 f.write(f"计划下载时间段: {start_date} - {end_date}\n")
                 f.write(f"总时间段数: {len(time_frames)}\n\n")
             
@@ -1624,49 +2266,22 @@ try:
                 self.log(f"处理第 {i+1}/{len(time_frames)} 个时间段: {week_start} 到 {week_end}")
                 print_progress(i+1, len(time_frames), "总体进度")
                 
+                checkpoint = self.ledger.week_checkpoint(self.run_key, week_start) if resumed else None
+                if checkpoint and checkpoint['status'] == "done":
+                    self.log(f"续跑：时间段 {week_start} - {week_end} 已完成，跳过")
+                    continue
+                
                 # 更新进度文件
                 with open(progress_file, 'a', encoding='utf-8') as f:
                     f.write(f"开始处理时间段 {i+1}/{len(time_frames)}: {week_start} - {week_end} 于 {datetime.now()}\n")
                 
+                searched_live = False
                 try:
-                    # 先检查该周的search_results是否已存在
-                    result_file = os.path.join(search_results_dir, f"{week_start}_{week_end}_哈基米.csv")
-                    videos_from_cache = []
-                    
-                    if os.path.exists(result_file):
-                        self.log(f"发现缓存的搜索结果: {result_file}")
-                        try:
-                            # 尝试从缓存加载
-                            with open(result_file, 'r', encoding='utf-8') as f:
-                                reader = csv.DictReader(f)
-                                videos_from_cache = list(reader)
-                            
-                            self.log(f"从缓存加载了 {len(videos_from_cache)} 个视频信息")
-                            
-                            # 验证是否需要重新筛选
-                            needs_filtering = False
-                            for video in videos_from_cache:
-                                view_count = int(video.get('view_count', 0))
-                                duration = int(video.get('duration', 0))
-                                
-                                if view_count < self.min_view_count or duration > self.max_duration:
-                                    needs_filtering = True
-                                    break
-                            
-                            if needs_filtering:
-                                self.log("缓存的结果需要重新筛选，将重新搜索")
-                                videos_from_cache = []
-                        except Exception as e:
-                            self.log(f"读取缓存文件出错: {e}")
-                            videos_from_cache = []
-                    
-                    # 如果没有缓存或缓存无效，重新搜索
-                    if not videos_from_cache:
-                        self.log("开始搜索该时间段的视频...")
-                        videos = self.search_videos_by_timeframe(time_frame)
-                    else:
-                        self.log("使用缓存的搜索结果")
-                        videos = videos_from_cache
+                    # 依次使用检查点、search_results缓存、搜索API获取该周的视频
+                    videos = []
+                    for page, page_videos, live in self.iter_week_pages(time_frame):
+                        videos.extend(page_videos)
+                        searched_live = searched_live or live
                     
                     # 记录找到的视频数量
                     videos_found = len(videos)
@@ -1674,23 +2289,24 @@ try:
                     
                     if not videos:
                         self.log(f"时间段 {week_start} - {week_end} 未找到符合条件的视频，跳过")
+                        self.ledger.mark_week(self.run_key, time_frame, "done")
                         with open(progress_file, 'a', encoding='utf-8') as f:
                             f.write(f"  时间段 {week_start} - {week_end} 未找到视频\n")
                         continue
                     
+                    if checkpoint:
+                        self.log(f"续跑：该时间段已完成 {self.ledger.count_finished(videos)}/{videos_found} 个视频")
                     self.log(f"开始下载 {videos_found} 个视频...")
+                    processed_before = self.ledger.processed_count()
                     
                     # 下载该时间段的视频
-                    self.download_videos_by_timeframe(time_frame)
+                    self.download_videos_by_timeframe(time_frame, videos)
+                    self.ledger.mark_week(self.run_key, time_frame, "done")
                     
-                    # 统计下载结果
-                    # 注意：这里的统计不太准确，因为download_videos_by_timeframe没有返回统计数据
-                    # 我们在这里通过对比下载前后的downloaded_videos集合大小来估算
-                    new_downloaded = self._load_downloaded_videos()
-                    videos_added = len(new_downloaded) - len(self.downloaded_videos)
+                    # 统计下载结果：对比下载前后台账中已完成的数量
+                    videos_added = self.ledger.processed_count() - processed_before
                     if videos_added > 0:
                         total_downloaded += videos_added
-                        self.downloaded_videos = new_downloaded
                     
                     # 更新进度文件
                     with open(progress_file, 'a', encoding='utf-8') as f:
@@ -1702,8 +2318,8 @@ try:
                     with open(progress_file, 'a', encoding='utf-8') as f:
                         f.write(f"  处理时间段 {week_start} - {week_end} 出错: {str(e)}\n")
                 
-                # 时间段之间的延迟，避免请求过快
-                if i < len(time_frames) - 1:  # 如果不是最后一个时间段
+                # 时间段之间的延迟，避免请求过快（检查点和缓存不发请求，无需等待）
+                if searched_live and i < len(time_frames) - 1:  # 如果不是最后一个时间段
                     delay = random.randint(5, 15)
                     self.log(f"等待 {delay} 秒后继续下一个时间段...")
                     time.sleep(delay)
@@ -1713,6 +2329,7 @@ try:
             self.log(f"所有时间段处理完成")
             self.log(f"总计找到视频: {total_found}")
             self.log(f"总计下载成功: {total_downloaded}")
+            self.ledger.finish_run(self.run_key)
             
             # 更新进度文件
             with open(progress_file, 'a', encoding='utf-8') as f:
@@ -1722,16 +2339,198 @@ try:
             
             return True
         
+        def run_pipeline(self, start_date, end_date):
+            """流水线批量下载：搜索、下载、后处理三个阶段通过有界队列并行执行。
+            搜索每解析完一页就把视频送入下载队列，下载完成的视频再送入后处理队列，
+            各阶段跨周重叠运行，总耗时接近最慢的一个阶段而不是各阶段之和。"""
+            self.log(f"流水线模式批量下载从 {start_date} 到 {end_date} 的所有哈基米视频")
+            
+            # 确保输出目录及子目录存在
+            self.create_directories()
+            os.makedirs(os.path.join(self.output_dir, "search_results"), exist_ok=True)
+            
+            time_frames = self.generate_weekly_timeframes(start_date, end_date)
+            self.log(f"共生成 {len(time_frames)} 个时间段，下载线程 {self.download_workers} 个，后处理线程 {self.process_workers} 个")
+            resumed = self._start_checkpointed_run(start_date, end_date)
+            
+            progress_file = os.path.join(self.output_dir, "download_progress.txt")
+            with open(progress_file, 'a' if resumed else 'w', encoding='utf-8') as f:
+                f.write(f"{'续跑' if resumed else '开始'}时间: {datetime.now()}\n")
+                f.write(f"计划下载时间段: {start_date} - {end_date}\n")
+                f.write(f"总时间段数: {len(time_frames)}\n")
+                f.write(f"运行模式: 流水线\n\n")
+            
+            # 有界队列提供背压：下载跟不上时搜索自动放慢，不会把整周结果堆在内存里
+            download_queue = queue.Queue(maxsize=self.download_workers * 4)
+            process_queue = queue.Queue(maxsize=self.process_workers * 4)
+            stats = {'found': 0, 'success': 0, 'skip': 0, 'fail': 0}
+            stats_lock = threading.Lock()
+            
+            def bump(key):
+                with stats_lock:
+                    stats[key] += 1
+            
+            def append_progress(line):
+                with stats_lock:
+                    with open(progress_file, 'a', encoding='utf-8') as f:
+                        f.write(line + "\n")
+            
+            def search_stage():
+                enqueued = set()
+                
+                def enqueue(video):
+                    bvid = video.get('bvid', '')
+                    if not bvid or bvid in enqueued:
+                        return False
+                    enqueued.add(bvid)
+                    bump('found')
+                    download_queue.put(video)
+                    return True
+                
+                try:
+                    for i, time_frame in enumerate(time_frames):
+                        week = f"{time_frame['begin_date']} - {time_frame['end_date']}"
+                        if resumed:
+                            checkpoint = self.ledger.week_checkpoint(self.run_key, time_frame['begin_date'])
+                            if checkpoint and checkpoint['status'] == "done":
+                                self.log(f"[搜索] 续跑：时间段 {week} 已完成，跳过")
+                                continue
+                        self.log(f"[搜索] 第 {i+1}/{len(time_frames)} 个时间段: {week}")
+                        append_progress(f"开始搜索时间段 {i+1}/{len(time_frames)}: {week} 于 {datetime.now()}")
+                        week_count = 0
+                        searched_live = False
+                        try:
+                            for page, page_videos, live in self.iter_week_pages(time_frame):
+                                searched_live = searched_live or live
+                                for video in page_videos:
+                                    week_count += enqueue(video)
+                                self.ledger.mark_page_enqueued(self.run_key, time_frame['begin_date'], page)
+                            # 时间段之间的延迟，避免请求过快（检查点和缓存不发请求，无需等待）
+                            if searched_live and i < len(time_frames) - 1:
+                                self.random_sleep(5, 15)
+                            append_progress(f"  时间段 {week} 搜索完成: 入队 {week_count} 个视频")
+                        except Exception as e:
+                            self.log(f"[搜索] 处理时间段 {week} 时出错: {e}")
+                            traceback.print_exc()
+                            append_progress(f"  处理时间段 {week} 出错: {str(e)}")
+                finally:
+                    for _ in range(self.download_workers):
+                        download_queue.put(None)
+            
+            def download_stage():
+                while True:
+                    video = download_queue.get()
+                    if video is None:
+                        break
+                    bvid = video.get('bvid', '')
+                    staging_dir = os.path.join(self.staging_dir, bvid)
+                    try:
+                        if self._should_skip_video(video):
+                            bump('skip')
+                            continue
+                        target_dir = self._prepare_target_dir(video)
+                        os.makedirs(staging_dir, exist_ok=True)
+                        self.pacer.wait("www.bilibili.com", 3, 6)
+                        self.log(f"[下载] {bvid}: {video.get('title', '')}")
+                        if self.download_video(bvid, video.get('mid', ''), video.get('author', ''),
+                                               staging_dir, video.get('title', ''), process=False,
+                                               pub_date=self._video_pub_date(video)):
+                            process_queue.put((video, staging_dir, target_dir))
+                        else:
+                            shutil.rmtree(staging_dir, ignore_errors=True)
+                            bump('fail')
+                            self.write_to_failed_downloads_csv(video, "下载失败，可能的原因：网络问题、视频被删除或设为私有")
+                    except Exception as e:
+                        self.log(f"[下载] {bvid} 出错: {e}")
+                        traceback.print_exc()
+                        shutil.rmtree(staging_dir, ignore_errors=True)
+                        bump('fail')
+                        self.write_to_failed_downloads_csv(video, f"下载线程异常: {e}")
+            
+            def process_stage():
+                while True:
+                    job = process_queue.get()
+                    if job is None:
+                        break
+                    video, staging_dir, target_dir = job
+                    bvid = video.get('bvid', '')
+                    try:
+                        final_path = self.process_video(staging_dir, bvid)
+                        if final_path:
+                            moved = self._promote_staged_files(staging_dir, target_dir)
+                            self.ledger.mark_processed(bvid, moved[0] if moved else final_path,
+                                                       title=video.get('title', ''))
+                            self.write_to_csv(self._build_video_record(video, target_dir))
+                            bump('success')
+                        else:
+                            bump('fail')
+                            self.write_to_failed_downloads_csv(video, "视频处理失败")
+                    except Exception as e:
+                        self.log(f"[后处理] {bvid} 出错: {e}")
+                        traceback.print_exc()
+                        bump('fail')
+                        self.write_to_failed_downloads_csv(video, f"后处理线程异常: {e}")
+                    finally:
+                        shutil.rmtree(staging_dir, ignore_errors=True)
+                    with stats_lock:
+                        self.log(f"[流水线] 已入队 {stats['found']}，成功 {stats['success']}，跳过 {stats['skip']}，失败 {stats['fail']}")
+            
+            search_thread = threading.Thread(target=search_stage, name="search", daemon=True)
+            download_threads = [threading.Thread(target=download_stage, name=f"download-{n}", daemon=True)
+                                for n in range(self.download_workers)]
+            process_threads = [threading.Thread(target=process_stage, name=f"process-{n}", daemon=True)
+                               for n in range(self.process_workers)]
+            for t in [search_thread] + download_threads + process_threads:
+                t.start()
+            
+            # 搜索结束后会给每个下载线程发送结束标记；下载全部结束后再通知后处理线程
+            search_thread.join()
+            for t in download_threads:
+                t.join()
+            for _ in process_threads:
+                process_queue.put(None)
+            for t in process_threads:
+                t.join()
+            
+            self.log(f"===============================================")
+            self.ledger.finish_run(self.run_key)
+            self.log(f"流水线处理完成")
+            self.log(f"总计找到视频: {stats['found']}")
+            self.log(f"总计下载成功: {stats['success']}，跳过 {stats['skip']}，失败 {stats['fail']}")
+            
+            with open(progress_file, 'a', encoding='utf-8') as f:
+                f.write(f"\n完成时间: {datetime.now()}\n")
+                f.write(f"总计找到视频: {stats['found']}\n")
+                f.write(f"总计下载成功: {stats['success']}\n")
+            
+            return True
+        
         async def process_weekly_videos(self):
             """异步版本的周处理函数(为了保持兼容性)"""
             # 实际上直接调用同步版本
             self.batch_download_all_videos(self.start_date, self.end_date)
             return True
 
+    def parse_workers_arg(argv, flag="--workers", default=1):
+        """解析 --workers N / --process-workers N 之类的并发数参数（未指定时返回 default）"""
+        if flag not in argv:
+            return default
+        idx = argv.index(flag)
+        try:
+            return max(1, int(argv[idx + 1]))
+        except (IndexError, ValueError):
+            print(f"{flag} 参数无效，格式: {flag} 4，将使用 {default}")
+            return default
+
     async def main():
+        crawler = None
         try:
             print("创建爬虫实例...")
             crawler = BilibiliCrawler()
+            crawler.download_workers = parse_workers_arg(sys.argv)
+            crawler.process_workers = parse_workers_arg(sys.argv, "--process-workers")
+            crawler.search_concurrency = parse_workers_arg(sys.argv, "--search-concurrency", crawler.search_concurrency)
+            crawler.resume = "--resume" in sys.argv
             
             # 检查是否有命令行参数提供SESSDATA
             if len(sys.argv) > 1 and sys.argv[1].startswith("SESSDATA="):
@@ -1818,12 +2617,21 @@ try:
                 
                 sys.exit(0)
             
+            # 流水线模式：搜索/下载/后处理并行执行
+            if "--pipeline" in sys.argv:
+                print("流水线模式，开始批量下载...")
+                crawler.run_pipeline(crawler.start_date, crawler.end_date)
+                return
+            
             # 如果没有参数，默认执行批量下载从2022-11-19到2025-06-02的所有视频
             print("无参数模式，开始批量下载...")
             crawler.batch_download_all_videos(crawler.start_date, crawler.end_date)
         except Exception as e:
             print(f"主程序出错: {e}")
             traceback.print_exc()
+        finally:
+            if crawler is not None:
+                crawler.http.close()
 
     def directly_save_sessdata():
         """直接保存提供的SESSDATA到文件"""